@@ -1,12 +1,55 @@
 """Agora RTC and Conversational AI Engine integration."""
+import base64
+import threading
 import time
 import json
 import requests
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
 from agora_token_builder import RtcTokenBuilder
 from datetime import datetime, timedelta
 
 from config import Config
+from http_transport import create_session
+from uid_allocator import uid_allocator
+
+
+class RtcTokenCache:
+    """Issued RTC tokens keyed by (channel, uid, role, lifetime), least recently used evicted first."""
+    
+    def __init__(self, max_entries: int = 1024):
+        """
+        Initialize an empty cache.
+        
+        Args:
+            max_entries: Maximum number of tokens kept
+        """
+        self.max_entries = max_entries
+        # (channel, uid, role, lifetime) -> {"token": ..., "expires_at": ...}
+        self.entries: "OrderedDict[Tuple[str, int, int, int], Dict[str, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, key: Tuple[str, int, int, int], min_remaining_seconds: float = 0) -> Optional[Dict[str, Any]]:
+        """Get a cached token that is valid for at least min_remaining_seconds more."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires_at"] - time.time() <= min_remaining_seconds:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+    
+    def put(self, key: Tuple[str, int, int, int], token: str, expires_at: int) -> Dict[str, Any]:
+        """Cache a newly built token; returns its cache entry."""
+        entry = {"token": token, "expires_at": expires_at}
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
 
 
 class AgoraService:
@@ -19,13 +62,26 @@ class AgoraService:
         self.api_key = Config.AGORA_API_KEY
         self.api_secret = Config.AGORA_API_SECRET
         self.base_url = "https://api.agora.io"
+        
+        # Registry of agent/avatar UIDs in use, shared by all workers
+        self.uid_allocator = uid_allocator
+        
+        # Recently issued RTC tokens, reused while they have enough lifetime left
+        self.token_cache = RtcTokenCache(max_entries=Config.AGORA_TOKEN_CACHE_SIZE)
+        self._testing_mode_warned = False
+        
+        # Pooled connections to the Agora REST API; the auth header is encoded once
+        self.session = create_session(headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Basic {self._get_auth_string()}"
+        })
     
     def generate_rtc_token(
         self,
         channel_name: str,
         uid: int = 0,
         role: int = 1,
-        expiration_seconds: int = 3600
+        expiration_seconds: Optional[int] = None
     ) -> Optional[str]:
         """
         Generate RTC token for joining a channel.
@@ -34,37 +90,70 @@ class AgoraService:
             channel_name: Name of the channel
             uid: User ID (0 for any user)
             role: Role (1=publisher, 2=subscriber)
-            expiration_seconds: Token expiration time in seconds
+            expiration_seconds: Token lifetime in seconds (defaults to AGORA_TOKEN_EXPIRATION_SECONDS)
         
         Returns:
             RTC token string, or None if certificate is not enabled
         """
+        return self.issue_rtc_token(channel_name, uid, role, expiration_seconds)["token"]
+    
+    def issue_rtc_token(
+        self,
+        channel_name: str,
+        uid: int = 0,
+        role: int = 1,
+        expiration_seconds: Optional[int] = None,
+        force_new: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Get an RTC token, reusing a cached one while it has enough lifetime left.
+        
+        Args:
+            channel_name: Name of the channel
+            uid: User ID (0 for any user)
+            role: Role (1=publisher, 2=subscriber)
+            expiration_seconds: Lifetime of a newly built token in seconds
+                (defaults to AGORA_TOKEN_EXPIRATION_SECONDS)
+            force_new: Always build a new token (used for renewal)
+        
+        Returns:
+            {"token": token or None in testing mode, "expires_at": unix time or None}
+        """
         # If no app certificate is set, return None (testing mode - no token required)
         if not self.app_certificate or self.app_certificate == "your-app-certificate":
-            print("⚠️  Warning: No App Certificate configured. Running in testing mode.")
-            print("   For production, enable App Certificate in Agora Console.")
-            return None
+            if not self._testing_mode_warned:
+                print("⚠️  Warning: No App Certificate configured. Running in testing mode.")
+                print("   For production, enable App Certificate in Agora Console.")
+                self._testing_mode_warned = True
+            return {"token": None, "expires_at": None}
+        
+        lifetime = expiration_seconds or Config.AGORA_TOKEN_EXPIRATION_SECONDS
+        # The lifetime is part of the key, so a caller never gets a token of another lifetime
+        key = (channel_name, int(uid), int(role), lifetime)
+        if not force_new:
+            cached = self.token_cache.get(key, min_remaining_seconds=Config.AGORA_TOKEN_MIN_REMAINING_SECONDS)
+            if cached is not None:
+                return cached
         
         try:
             current_timestamp = int(time.time())
-            privilege_expired_ts = current_timestamp + expiration_seconds
+            privilege_expired_ts = current_timestamp + lifetime
             
             token = RtcTokenBuilder.buildTokenWithUid(
                 self.app_id,
                 self.app_certificate,
                 channel_name,
-                uid,
-                role,
+                int(uid),
+                int(role),
                 privilege_expired_ts
             )
-            
-            print(f"✅ Generated Agora token for channel: {channel_name}")
-            return token
         except Exception as e:
             print(f"❌ Error generating Agora token: {e}")
             print(f"   App ID: {self.app_id[:8]}... (masked)")
             print(f"   Certificate set: {bool(self.app_certificate)}")
             raise
+        
+        return self.token_cache.put(key, token, privilege_expired_ts)
     
     def start_conversational_ai(
         self,
@@ -86,9 +175,14 @@ class AgoraService:
         # Use v2 API endpoint
         url = f"{self.base_url}/api/conversational-ai-agent/v2/projects/{self.app_id}/join"
         
-        # Generate UIDs
-        agent_uid = str(int(time.time()))
-        avatar_uid = str(int(time.time()) + 1)  # Different UID for avatar
+        # Claim UIDs that no other agent or avatar in the channel is using
+        try:
+            rtc_uids = self.uid_allocator.allocate(channel_name, count=2 if enable_avatar else 1)
+        except Exception as e:
+            print(f"Error allocating UIDs: {e}")
+            return {"error": f"Failed to allocate UIDs: {str(e)}"}
+        agent_uid = str(rtc_uids[0])
+        avatar_uid = str(rtc_uids[1]) if enable_avatar else None
         
         # Generate tokens
         try:
@@ -96,6 +190,7 @@ class AgoraService:
             avatar_token = self.generate_rtc_token(channel_name, int(avatar_uid), role=1) if enable_avatar else None
         except Exception as e:
             print(f"Error generating tokens: {e}")
+            self.uid_allocator.release(channel_name, rtc_uids)
             return {"error": f"Failed to generate tokens: {str(e)}"}
         
         # Build configuration with HeyGen avatar support
@@ -155,11 +250,6 @@ class AgoraService:
                 if key not in config:
                     config[key] = value
         
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Basic {self._get_auth_string()}"
-        }
-        
         try:
             print(f"🚀 Starting Agora Conversational AI agent...")
             print(f"   Channel: {channel_name}")
@@ -167,10 +257,13 @@ class AgoraService:
             if enable_avatar:
                 print(f"   Avatar enabled (UID: {avatar_uid})")
             
-            response = requests.post(url, json=config, headers=headers)
+            response = self.session.post(url, json=config)
             response.raise_for_status()
             result = response.json()
             
+            # Released by stop_conversational_ai
+            result["rtc_uids"] = rtc_uids
+            
             print(f"✅ Agora Conversational AI agent started successfully")
             return result
             
@@ -179,15 +272,18 @@ class AgoraService:
             response_text = e.response.text if e.response else "No response"
             print(f"❌ Agora API Error: {error_msg}")
             print(f"   Response: {response_text}")
+            self.uid_allocator.release(channel_name, rtc_uids)
             return {"error": error_msg, "details": response_text}
         except Exception as e:
             print(f"❌ Error starting conversational AI: {e}")
+            self.uid_allocator.release(channel_name, rtc_uids)
             return {"error": str(e)}
     
     def stop_conversational_ai(
         self,
         channel_name: str,
-        agent_uid: str
+        agent_uid: str,
+        rtc_uids: Optional[List[int]] = None
     ) -> Dict[str, Any]:
         """
         Stop Agora Conversational AI agent.
@@ -195,6 +291,10 @@ class AgoraService:
         Args:
             channel_name: Name of the channel
             agent_uid: UID of the agent to stop
+            rtc_uids: UIDs claimed by start_conversational_ai, released here once
+                the agent has stopped (after a failed stop the agent may still
+                be in the channel, so they stay claimed until a retry or their
+                lease expires)
         
         Returns:
             Response with status
@@ -202,18 +302,16 @@ class AgoraService:
         # Use v2 API endpoint - interrupt/stop agent
         url = f"{self.base_url}/cn/api/conversational-ai-agent/v2/projects/{self.app_id}/agents/{agent_uid}/interrupt"
         
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Basic {self._get_auth_string()}"
-        }
-        
         try:
-            response = requests.post(url, json={}, headers=headers)
+            response = self.session.post(url, json={})
             response.raise_for_status()
-            return {"status": "stopped", "agent_uid": agent_uid}
         except Exception as e:
             print(f"Error stopping conversational AI: {e}")
             return {"error": str(e)}
+        
+        if rtc_uids:
+            self.uid_allocator.release(channel_name, rtc_uids)
+        return {"status": "stopped", "agent_uid": agent_uid}
     
     def agent_speak(
         self,
@@ -232,17 +330,12 @@ class AgoraService:
         """
         url = f"{self.base_url}/api/conversational-ai-agent/v2/projects/{self.app_id}/agents/{agent_uid}/speak"
         
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Basic {self._get_auth_string()}"
-        }
-        
         payload = {
             "text": text
         }
         
         try:
-            response = requests.post(url, json=payload, headers=headers)
+            response = self.session.post(url, json=payload)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -273,13 +366,8 @@ class AgoraService:
             "metadata": metadata or {}
         }
         
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Basic {self._get_auth_string()}"
-        }
-        
         try:
-            response = requests.post(url, json=payload, headers=headers)
+            response = self.session.post(url, json=payload)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -298,13 +386,8 @@ class AgoraService:
         """
         url = f"{self.base_url}/dev/v1/channel/user/{self.app_id}/{channel_name}"
         
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Basic {self._get_auth_string()}"
-        }
-        
         try:
-            response = requests.get(url, headers=headers)
+            response = self.session.get(url)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -330,11 +413,6 @@ class AgoraService:
         """
         url = f"{self.base_url}/v1/apps/{self.app_id}/cloud_recording/resourceid"
         
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Basic {self._get_auth_string()}"
-        }
-        
         payload = {
             "cname": channel_name,
             "uid": uid,
@@ -346,7 +424,7 @@ class AgoraService:
         
         try:
             # Acquire resource ID
-            response = requests.post(url, json=payload, headers=headers)
+            response = self.session.post(url, json=payload)
             response.raise_for_status()
             resource_data = response.json()
             
@@ -361,7 +439,7 @@ class AgoraService:
                 "clientRequest": recording_config or {}
             }
             
-            start_response = requests.post(start_url, json=start_payload, headers=headers)
+            start_response = self.session.post(start_url, json=start_payload)
             start_response.raise_for_status()
             
             return start_response.json()
@@ -372,7 +450,6 @@ class AgoraService:
     
     def _get_auth_string(self) -> str:
         """Get base64 encoded auth string for API requests."""
-        import base64
         auth_str = f"{self.api_key}:{self.api_secret}"
         return base64.b64encode(auth_str.encode()).decode()
 
@@ -385,8 +462,29 @@ class ConversationalAIAgent:
         self.agora_service = agora_service
         self.channel_name: Optional[str] = None
         self.agent_uid: Optional[str] = None
+        # RTC UIDs claimed for the agent (and avatar), released on stop
+        self.rtc_uids: List[int] = []
         self.is_active = False
     
+    def to_state(self) -> Dict[str, Any]:
+        """JSON-serializable state, for the session registry."""
+        return {
+            "channel_name": self.channel_name,
+            "agent_uid": self.agent_uid,
+            "rtc_uids": self.rtc_uids,
+            "is_active": self.is_active
+        }
+    
+    @classmethod
+    def from_state(cls, agora_service: AgoraService, state: Dict[str, Any]) -> "ConversationalAIAgent":
+        """Rebuild an agent wrapper from to_state() output (possibly from another worker)."""
+        agent = cls(agora_service)
+        agent.channel_name = state.get("channel_name")
+        agent.agent_uid = state.get("agent_uid")
+        agent.rtc_uids = state.get("rtc_uids", [])
+        agent.is_active = state.get("is_active", False)
+        return agent
+    
     def start(
         self,
         channel_name: str,
@@ -417,6 +515,7 @@ class ConversationalAIAgent:
         if "error" not in result:
             self.channel_name = channel_name
             self.agent_uid = result.get("agent_uid") or result.get("uid")
+            self.rtc_uids = result.get("rtc_uids", [])
             self.is_active = True
         
         return result
@@ -424,19 +523,33 @@ class ConversationalAIAgent:
     def stop(self) -> Dict[str, Any]:
         """Stop the conversational AI agent."""
         if not self.is_active or not self.agent_uid:
+            if self.rtc_uids:
+                # Nothing to stop, but the claimed UIDs must not leak
+                self.agora_service.uid_allocator.release(self.channel_name, self.rtc_uids)
+                self.rtc_uids = []
             return {"error": "Agent is not active"}
         
         result = self.agora_service.stop_conversational_ai(
             channel_name=self.channel_name,
-            agent_uid=self.agent_uid
+            agent_uid=self.agent_uid,
+            rtc_uids=self.rtc_uids
         )
         
-        self.is_active = False
-        self.channel_name = None
-        self.agent_uid = None
+        # After a failed stop the agent keeps its state (and UIDs) for a retry
+        if "error" not in result:
+            self.is_active = False
+            self.channel_name = None
+            self.agent_uid = None
+            self.rtc_uids = []
         
         return result
     
+    def release_uids(self):
+        """Release the claimed UIDs of an agent that will not be stopped again."""
+        if self.rtc_uids:
+            self.agora_service.uid_allocator.release(self.channel_name, self.rtc_uids)
+            self.rtc_uids = []
+    
     def send_message(self, message: str) -> Dict[str, Any]:
         """Send a message to the agent."""
         if not self.is_active or not self.agent_uid:
@@ -1,12 +1,91 @@
 """AI Agent powered by Groq for todo management."""
-from groq import Groq
-from typing import List, Dict, Any, Optional
+from groq import AsyncGroq, Groq
+from typing import List, Dict, Any, Optional, AsyncIterator, Iterator, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
 from datetime import datetime
 import json
 
+from async_database import async_db_client
 from config import Config
 from database import db_client
-from models import TodoPriority, ReminderImportance
+from conversation_store import Conversation, create_conversation_store
+from http_transport import PerLoop
+from context_manager import create_context_manager
+from reply_templates import build_fast_reply
+from models import TodoPriority, ReminderImportance, TodoFilter
+
+
+# Tools that act on many documents of a collection at once
+BATCH_TOOLS = frozenset({"create_todos", "complete_todos", "delete_todos"})
+
+# Tool target of a call that creates one new document
+NEW_DOCUMENT = "*new"
+
+
+class StreamedCompletion:
+    """Iterates the text deltas of a streamed Groq completion and collects the rest."""
+    
+    def __init__(self, stream):
+        """Wrap a chat completion stream (created with stream=True)."""
+        self.stream = stream
+        self.content = ""
+        self.tool_calls: List[Dict[str, Any]] = []
+        self._parts: List[str] = []
+        self._calls: Dict[int, Dict[str, Any]] = {}
+    
+    def __iter__(self) -> Iterator[str]:
+        """Yield content deltas; content and tool_calls are set once exhausted."""
+        for chunk in self.stream:
+            content = self._add(chunk)
+            if content:
+                yield content
+        
+        self._finish()
+    
+    def _add(self, chunk) -> Optional[str]:
+        """Collect one chunk, returning its content delta if any."""
+        if not chunk.choices:
+            return None
+        delta = chunk.choices[0].delta
+        
+        if delta.content:
+            self._parts.append(delta.content)
+        
+        # Tool calls may arrive split across chunks, keyed by index
+        for call in delta.tool_calls or []:
+            entry = self._calls.setdefault(call.index, {
+                "id": None,
+                "type": "function",
+                "function": {"name": "", "arguments": ""}
+            })
+            if call.id:
+                entry["id"] = call.id
+            if call.function and call.function.name:
+                entry["function"]["name"] = call.function.name
+            if call.function and call.function.arguments:
+                entry["function"]["arguments"] += call.function.arguments
+        
+        return delta.content
+    
+    def _finish(self):
+        """Set content and tool_calls from the collected chunks."""
+        self.content = "".join(self._parts)
+        self.tool_calls = [self._calls[index] for index in sorted(self._calls)]
+
+
+class AsyncStreamedCompletion(StreamedCompletion):
+    """StreamedCompletion for an AsyncGroq stream."""
+    
+    async def __aiter__(self) -> AsyncIterator[str]:
+        """Yield content deltas; content and tool_calls are set once exhausted."""
+        async for chunk in self.stream:
+            content = self._add(chunk)
+            if content:
+                yield content
+        
+        self._finish()
 
 
 class TodoAgent:
@@ -15,8 +94,18 @@ class TodoAgent:
     def __init__(self):
         """Initialize the AI agent."""
         self.client = Groq(api_key=Config.GROQ_API_KEY)
+        # Async clients for the ASGI app, one per event loop
+        self.async_clients = PerLoop(lambda: AsyncGroq(api_key=Config.GROQ_API_KEY))
         self.model = Config.GROQ_MODEL
-        self.conversation_history: List[Dict[str, str]] = []
+        self.conversations = create_conversation_store()
+        self.context = create_context_manager()
+        self.fast_path = Config.AGENT_FAST_PATH
+        self.skipped_completions = 0
+        self._stats_lock = threading.Lock()
+        self.tool_executor = ThreadPoolExecutor(
+            max_workers=Config.AGENT_TOOL_WORKERS,
+            thread_name_prefix="agent-tools"
+        )
         
         self.system_prompt = """You are Luna, a friendly and efficient personal productivity assistant. 
 You help users manage their todo lists and reminders through natural conversation.
@@ -52,10 +141,27 @@ When listing todos or reminders, present them in a clear, easy-to-understand for
             "complete_todo": self.complete_todo,
             "update_todo": self.update_todo,
             "delete_todo": self.delete_todo,
+            "create_todos": self.create_todos,
+            "complete_todos": self.complete_todos,
+            "delete_todos": self.delete_todos,
             "create_reminder": self.create_reminder,
             "get_reminders": self.get_reminders,
             "delete_reminder": self.delete_reminder,
         }
+        # Coroutine versions of the tools, run on async_db_client by async turns
+        self.async_functions = {
+            "create_todo": self.acreate_todo,
+            "get_todos": self.aget_todos,
+            "complete_todo": self.acomplete_todo,
+            "update_todo": self.aupdate_todo,
+            "delete_todo": self.adelete_todo,
+            "create_todos": self.acreate_todos,
+            "complete_todos": self.acomplete_todos,
+            "delete_todos": self.adelete_todos,
+            "create_reminder": self.acreate_reminder,
+            "get_reminders": self.aget_reminders,
+            "delete_reminder": self.adelete_reminder,
+        }
         
         self.tools = [
             {
@@ -92,13 +198,23 @@ When listing todos or reminders, present them in a clear, easy-to-understand for
                 "type": "function",
                 "function": {
                     "name": "get_todos",
-                    "description": "Get all todos, or filter by completion status. Omit 'completed' parameter to get all todos.",
+                    "description": "Get all todos, or filter by completion status, view or priority. Omit 'completed' parameter to get all todos.",
                     "parameters": {
                         "type": "object",
                         "properties": {
                             "completed": {
                                 "type": "boolean",
                                 "description": "Optional: true for completed todos only, false for active todos only. Do not include this parameter to get all todos."
+                            },
+                            "view": {
+                                "type": "string",
+                                "enum": ["today", "overdue", "upcoming", "important"],
+                                "description": "Optional: active todos due today, overdue, due in the next week, or with high/urgent priority"
+                            },
+                            "min_priority": {
+                                "type": "string",
+                                "enum": ["low", "medium", "high", "urgent"],
+                                "description": "Optional: only todos with at least this priority"
                             }
                         }
                     }
@@ -168,6 +284,74 @@ When listing todos or reminders, present them in a clear, easy-to-understand for
                     }
                 }
             },
+            {
+                "type": "function",
+                "function": {
+                    "name": "create_todos",
+                    "description": "Create several todos at once. Use this instead of repeated create_todo calls.",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "todos": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "title": {"type": "string"},
+                                        "description": {"type": "string"},
+                                        "priority": {
+                                            "type": "string",
+                                            "enum": ["low", "medium", "high", "urgent"]
+                                        },
+                                        "due_date": {"type": "string"}
+                                    },
+                                    "required": ["title"]
+                                }
+                            }
+                        },
+                        "required": ["todos"]
+                    }
+                }
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "complete_todos",
+                    "description": "Mark several todos as completed at once, searching by title.",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "titles": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "description": "Titles of the todos to complete"
+                            }
+                        },
+                        "required": ["titles"]
+                    }
+                }
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "delete_todos",
+                    "description": "Delete several todos at once, by title or all completed todos.",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "titles": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "description": "Titles of the todos to delete"
+                            },
+                            "completed": {
+                                "type": "boolean",
+                                "description": "Set to true to delete every completed todo"
+                            }
+                        }
+                    }
+                }
+            },
             {
                 "type": "function",
                 "function": {
@@ -247,21 +431,20 @@ When listing todos or reminders, present them in a clear, easy-to-understand for
         except Exception as e:
             return f"Error creating todo: {str(e)}"
     
-    def get_todos(self, completed: Optional[bool] = None) -> str:
-        """Get todos."""
+    def get_todos(
+        self,
+        completed: Optional[bool] = None,
+        view: Optional[str] = None,
+        min_priority: Optional[str] = None
+    ) -> str:
+        """Get todos, optionally narrowed by a view or minimum priority."""
         try:
-            todos = db_client.get_todos(completed=completed)
-            
-            if not todos:
-                return "You have no todos."
+            if view or min_priority:
+                todos = db_client.query_todos(self._todo_filter(completed, view, min_priority))
+            else:
+                todos = db_client.get_todos(completed=completed)
             
-            result = []
-            for todo in todos:
-                status = "✓" if todo.completed else "○"
-                due = f" (Due: {todo.due_date.strftime('%Y-%m-%d')})" if todo.due_date else ""
-                result.append(f"{status} {todo.title} - {todo.priority.value} priority{due}")
-            
-            return "\n".join(result)
+            return self._describe_todos(todos)
         except Exception as e:
             return f"Error getting todos: {str(e)}"
     
@@ -270,9 +453,8 @@ When listing todos or reminders, present them in a clear, easy-to-understand for
         try:
             # If no ID provided, try to find by title
             if not todo_id and title:
-                todos = db_client.get_todos(completed=False)
-                # Find todo by title (case-insensitive partial match)
-                matching_todos = [t for t in todos if title.lower() in t.title.lower()]
+                # Find todo by title (indexed match, best first)
+                matching_todos = db_client.find_todos(title, completed=False)
                 
                 if not matching_todos:
                     return f"No active todo found matching '{title}'"
@@ -323,10 +505,10 @@ When listing todos or reminders, present them in a clear, easy-to-understand for
     def delete_todo(self, todo_id: Optional[str] = None, title: Optional[str] = None) -> str:
         """Delete a todo by ID or by searching for a title."""
         try:
+            deleted_title = None
             # If no ID provided, try to find by title
             if not todo_id and title:
-                todos = db_client.get_todos()
-                matching_todos = [t for t in todos if title.lower() in t.title.lower()]
+                matching_todos = db_client.find_todos(title)
                 
                 if not matching_todos:
                     return f"No todo found matching '{title}'"
@@ -335,17 +517,133 @@ When listing todos or reminders, present them in a clear, easy-to-understand for
                     todo_id = matching_todos[0].id
                 else:
                     todo_id = matching_todos[0].id
+                deleted_title = matching_todos[0].title
             
             if not todo_id:
                 return "Please specify either a todo ID or title"
             
             success = db_client.delete_todo(todo_id)
             if success:
+                # Name the todo that was matched, not the words the user said
+                if deleted_title:
+                    return f"Deleted todo: {deleted_title}"
                 return "Todo deleted successfully"
             return "Todo not found"
         except Exception as e:
             return f"Error deleting todo: {str(e)}"
     
+    def create_todos(self, todos: List[Dict[str, Any]]) -> str:
+        """Create several todos concurrently."""
+        try:
+            items = self._todo_items(todos)
+            results = db_client.create_todos(items)
+            return self._describe_batch("Created", results, [item["title"] for item in items])
+        except Exception as e:
+            return f"Error creating todos: {str(e)}"
+    
+    def complete_todos(self, titles: List[str]) -> str:
+        """Complete several todos, each found by title."""
+        try:
+            todo_ids, labels, missing = self._resolve_todo_titles(titles, completed=False)
+            results = db_client.complete_todos(todo_ids)
+            return self._describe_batch("Completed", results, labels, missing)
+        except Exception as e:
+            return f"Error completing todos: {str(e)}"
+    
+    def delete_todos(self, titles: Optional[List[str]] = None, completed: bool = False) -> str:
+        """Delete several todos found by title, or every completed todo."""
+        try:
+            if completed:
+                return self._describe_completed_deletion(db_client.delete_completed_todos())
+            
+            if not titles:
+                return "Please specify the titles of the todos to delete"
+            
+            todo_ids, labels, missing = self._resolve_todo_titles(titles)
+            results = db_client.delete_todos(todo_ids)
+            return self._describe_batch("Deleted", results, labels, missing)
+        except Exception as e:
+            return f"Error deleting todos: {str(e)}"
+    
+    def _resolve_todo_titles(
+        self,
+        titles: List[str],
+        completed: Optional[bool] = None
+    ) -> Tuple[List[str], List[str], List[str]]:
+        """Find the best matching todo for each title; returns (ids, their titles, titles not found)."""
+        todo_ids, labels, missing = [], [], []
+        for title in titles:
+            matching_todos = db_client.find_todos(title, completed=completed)
+            if not matching_todos:
+                missing.append(title)
+            elif matching_todos[0].id not in todo_ids:
+                todo_ids.append(matching_todos[0].id)
+                labels.append(matching_todos[0].title)
+        return todo_ids, labels, missing
+    
+    @staticmethod
+    def _todo_filter(completed: Optional[bool], view: Optional[str], min_priority: Optional[str]) -> TodoFilter:
+        """Build the filter of a get_todos call with a view or minimum priority."""
+        todo_filter = TodoFilter.for_view(view) if view else TodoFilter()
+        if completed is not None:
+            todo_filter.completed = completed
+        if min_priority:
+            todo_filter.min_priority = TodoPriority(min_priority)
+        return todo_filter
+    
+    @staticmethod
+    def _todo_items(todos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Turn create_todos arguments into create_todo keyword arguments."""
+        return [
+            {
+                "title": todo["title"],
+                "description": todo.get("description"),
+                "priority": TodoPriority((todo.get("priority") or "medium").lower()),
+                "due_date": datetime.fromisoformat(todo["due_date"]) if todo.get("due_date") else datetime.now(),
+            }
+            for todo in todos
+        ]
+    
+    @staticmethod
+    def _describe_todos(todos) -> str:
+        """List todos for the LLM."""
+        if not todos:
+            return "You have no todos."
+        
+        result = []
+        for todo in todos:
+            status = "✓" if todo.completed else "○"
+            due = f" (Due: {todo.due_date.strftime('%Y-%m-%d')})" if todo.due_date else ""
+            result.append(f"{status} {todo.title} - {todo.priority.value} priority{due}")
+        
+        return "\n".join(result)
+    
+    @staticmethod
+    def _describe_completed_deletion(results) -> str:
+        """Summarize deleting every completed todo for the LLM."""
+        if not results:
+            return "You have no completed todos."
+        deleted = sum(1 for result in results if result.success)
+        message = f"Deleted {deleted} completed todos"
+        if deleted < len(results):
+            message += f" ({len(results) - deleted} could not be deleted)"
+        return message
+    
+    @staticmethod
+    def _describe_batch(verb: str, results, labels: List[str], missing: Optional[List[str]] = None) -> str:
+        """Summarize bulk operation results for the LLM."""
+        done = [label for result, label in zip(results, labels) if result.success]
+        failed = [f"{label} ({result.error})" for result, label in zip(results, labels) if not result.success]
+        
+        lines = []
+        if done:
+            lines.append(f"{verb} {len(done)} todos: {', '.join(done)}")
+        if failed:
+            lines.append(f"Failed: {', '.join(failed)}")
+        if missing:
+            lines.append(f"No todo found matching: {', '.join(missing)}")
+        return "\n".join(lines) or "Nothing to do"
+    
     def create_reminder(
         self,
         reminder_text: str,
@@ -370,27 +668,29 @@ When listing todos or reminders, present them in a clear, easy-to-understand for
     def get_reminders(self) -> str:
         """Get all reminders."""
         try:
-            reminders = db_client.get_reminders()
-            
-            if not reminders:
-                return "You have no reminders."
-            
-            result = []
-            for reminder in reminders:
-                date_str = f" (Date: {reminder.reminder_date.strftime('%Y-%m-%d')})" if reminder.reminder_date else ""
-                result.append(f"• {reminder.reminder_text} - {reminder.importance.value} importance{date_str}")
-            
-            return "\n".join(result)
+            return self._describe_reminders(db_client.get_reminders())
         except Exception as e:
             return f"Error getting reminders: {str(e)}"
     
+    @staticmethod
+    def _describe_reminders(reminders) -> str:
+        """List reminders for the LLM."""
+        if not reminders:
+            return "You have no reminders."
+        
+        result = []
+        for reminder in reminders:
+            date_str = f" (Date: {reminder.reminder_date.strftime('%Y-%m-%d')})" if reminder.reminder_date else ""
+            result.append(f"• {reminder.reminder_text} - {reminder.importance.value} importance{date_str}")
+        
+        return "\n".join(result)
+    
     def delete_reminder(self, reminder_id: Optional[str] = None, reminder_text: Optional[str] = None) -> str:
         """Delete a reminder by ID or by searching for text."""
         try:
             # If no ID provided, try to find by text
             if not reminder_id and reminder_text:
-                reminders = db_client.get_reminders()
-                matching_reminders = [r for r in reminders if reminder_text.lower() in r.reminder_text.lower()]
+                matching_reminders = db_client.find_reminders(reminder_text)
                 
                 if not matching_reminders:
                     return f"No reminder found matching '{reminder_text}'"
@@ -410,85 +710,590 @@ When listing todos or reminders, present them in a clear, easy-to-understand for
         except Exception as e:
             return f"Error deleting reminder: {str(e)}"
     
-    def process_message(self, user_message: str) -> str:
-        """Process a user message and return a response."""
-        # Add user message to history
-        self.conversation_history.append({
-            "role": "user",
-            "content": user_message
-        })
+    # Async tool functions (same behavior, awaiting async_db_client)
+    
+    async def acreate_todo(
+        self,
+        title: str,
+        description: Optional[str] = None,
+        priority: str = "medium",
+        due_date: Optional[str] = None
+    ) -> str:
+        """Async version of create_todo."""
+        try:
+            todo = await async_db_client.create_todo(
+                title=title,
+                description=description,
+                priority=TodoPriority(priority.lower()),
+                due_date=datetime.fromisoformat(due_date) if due_date else datetime.now()
+            )
+            
+            return f"Created todo: {todo.title} (Priority: {todo.priority.value})"
+        except Exception as e:
+            return f"Error creating todo: {str(e)}"
+    
+    async def aget_todos(
+        self,
+        completed: Optional[bool] = None,
+        view: Optional[str] = None,
+        min_priority: Optional[str] = None
+    ) -> str:
+        """Async version of get_todos."""
+        try:
+            if view or min_priority:
+                todos = await async_db_client.query_todos(self._todo_filter(completed, view, min_priority))
+            else:
+                todos = await async_db_client.get_todos(completed=completed)
+            
+            return self._describe_todos(todos)
+        except Exception as e:
+            return f"Error getting todos: {str(e)}"
+    
+    async def acomplete_todo(self, todo_id: Optional[str] = None, title: Optional[str] = None) -> str:
+        """Async version of complete_todo."""
+        try:
+            if not todo_id and title:
+                matching_todos = await async_db_client.find_todos(title, completed=False)
+                
+                if not matching_todos:
+                    return f"No active todo found matching '{title}'"
+                todo_id = matching_todos[0].id
+            
+            if not todo_id:
+                return "Please specify either a todo ID or title"
+            
+            todo = await async_db_client.complete_todo(todo_id)
+            if todo:
+                return f"Completed todo: {todo.title}"
+            return "Todo not found"
+        except Exception as e:
+            return f"Error completing todo: {str(e)}"
+    
+    async def aupdate_todo(
+        self,
+        todo_id: str,
+        title: Optional[str] = None,
+        description: Optional[str] = None,
+        priority: Optional[str] = None,
+        due_date: Optional[str] = None
+    ) -> str:
+        """Async version of update_todo."""
+        try:
+            todo = await async_db_client.update_todo(
+                todo_id=todo_id,
+                title=title,
+                description=description,
+                priority=TodoPriority(priority.lower()) if priority else None,
+                due_date=datetime.fromisoformat(due_date) if due_date else None
+            )
+            
+            if todo:
+                return f"Updated todo: {todo.title}"
+            return "Todo not found"
+        except Exception as e:
+            return f"Error updating todo: {str(e)}"
+    
+    async def adelete_todo(self, todo_id: Optional[str] = None, title: Optional[str] = None) -> str:
+        """Async version of delete_todo."""
+        try:
+            deleted_title = None
+            if not todo_id and title:
+                matching_todos = await async_db_client.find_todos(title)
+                
+                if not matching_todos:
+                    return f"No todo found matching '{title}'"
+                todo_id = matching_todos[0].id
+                deleted_title = matching_todos[0].title
+            
+            if not todo_id:
+                return "Please specify either a todo ID or title"
+            
+            if await async_db_client.delete_todo(todo_id):
+                if deleted_title:
+                    return f"Deleted todo: {deleted_title}"
+                return "Todo deleted successfully"
+            return "Todo not found"
+        except Exception as e:
+            return f"Error deleting todo: {str(e)}"
+    
+    async def acreate_todos(self, todos: List[Dict[str, Any]]) -> str:
+        """Async version of create_todos."""
+        try:
+            items = self._todo_items(todos)
+            results = await async_db_client.create_todos(items)
+            return self._describe_batch("Created", results, [item["title"] for item in items])
+        except Exception as e:
+            return f"Error creating todos: {str(e)}"
+    
+    async def acomplete_todos(self, titles: List[str]) -> str:
+        """Async version of complete_todos."""
+        try:
+            todo_ids, labels, missing = await self._aresolve_todo_titles(titles, completed=False)
+            results = await async_db_client.complete_todos(todo_ids)
+            return self._describe_batch("Completed", results, labels, missing)
+        except Exception as e:
+            return f"Error completing todos: {str(e)}"
+    
+    async def adelete_todos(self, titles: Optional[List[str]] = None, completed: bool = False) -> str:
+        """Async version of delete_todos."""
+        try:
+            if completed:
+                return self._describe_completed_deletion(await async_db_client.delete_completed_todos())
+            
+            if not titles:
+                return "Please specify the titles of the todos to delete"
+            
+            todo_ids, labels, missing = await self._aresolve_todo_titles(titles)
+            results = await async_db_client.delete_todos(todo_ids)
+            return self._describe_batch("Deleted", results, labels, missing)
+        except Exception as e:
+            return f"Error deleting todos: {str(e)}"
+    
+    async def _aresolve_todo_titles(
+        self,
+        titles: List[str],
+        completed: Optional[bool] = None
+    ) -> Tuple[List[str], List[str], List[str]]:
+        """Async version of _resolve_todo_titles."""
+        todo_ids, labels, missing = [], [], []
+        for title in titles:
+            matching_todos = await async_db_client.find_todos(title, completed=completed)
+            if not matching_todos:
+                missing.append(title)
+            elif matching_todos[0].id not in todo_ids:
+                todo_ids.append(matching_todos[0].id)
+                labels.append(matching_todos[0].title)
+        return todo_ids, labels, missing
+    
+    async def acreate_reminder(
+        self,
+        reminder_text: str,
+        importance: str = "medium",
+        reminder_date: Optional[str] = None
+    ) -> str:
+        """Async version of create_reminder."""
+        try:
+            reminder = await async_db_client.create_reminder(
+                reminder_text=reminder_text,
+                importance=ReminderImportance(importance.lower()),
+                reminder_date=datetime.fromisoformat(reminder_date) if reminder_date else None
+            )
+            
+            return f"Created reminder: {reminder.reminder_text}"
+        except Exception as e:
+            return f"Error creating reminder: {str(e)}"
+    
+    async def aget_reminders(self) -> str:
+        """Async version of get_reminders."""
+        try:
+            return self._describe_reminders(await async_db_client.get_reminders())
+        except Exception as e:
+            return f"Error getting reminders: {str(e)}"
+    
+    async def adelete_reminder(self, reminder_id: Optional[str] = None, reminder_text: Optional[str] = None) -> str:
+        """Async version of delete_reminder."""
+        try:
+            if not reminder_id and reminder_text:
+                matching_reminders = await async_db_client.find_reminders(reminder_text)
+                
+                if not matching_reminders:
+                    return f"No reminder found matching '{reminder_text}'"
+                reminder_id = matching_reminders[0].id
+            
+            if not reminder_id:
+                return "Please specify either a reminder ID or reminder text"
+            
+            if await async_db_client.delete_reminder(reminder_id):
+                return "Reminder deleted successfully"
+            return "Reminder not found"
+        except Exception as e:
+            return f"Error deleting reminder: {str(e)}"
+    
+    def process_message(self, user_message: str, session_id: str = "default") -> str:
+        """Process a user message within a session and return a response."""
+        response = ""
+        for event in self.stream_message(user_message, session_id=session_id):
+            if event["type"] == "done":
+                response = event["response"]
         
-        # Create messages for API call
-        messages = [
-            {"role": "system", "content": self.system_prompt},
-            *self.conversation_history
-        ]
+        return response
+    
+    def stream_message(self, user_message: str, session_id: str = "default") -> Iterator[Dict[str, Any]]:
+        """
+        Process a user message within a session, yielding events as they happen.
+        
+        Args:
+            user_message: The user's message
+            session_id: Conversation session identifier
+        
+        Yields:
+            Event dicts with a "type" of:
+                tool_call: a tool is about to run ("name", "arguments")
+                tool_result: a tool has finished ("name", "result")
+                delta: the next piece of response text ("content")
+                done: the turn is complete ("response", "context")
+        """
+        conversation = self.conversations.get(session_id)
+        
+        with conversation.lock:
+            self.conversations.refresh(conversation)
+            yield from self._run_turn(conversation, user_message)
+            conversation.trim(self.conversations.max_messages)
+            conversation.touch()
+            self.conversations.save(conversation)
+    
+    def _build_messages(self, conversation: Conversation) -> List[Dict[str, Any]]:
+        """Build the prompt for a completion and accumulate its token stats."""
+        messages, stats = self.context.build_messages(self.system_prompt, conversation)
+        
+        totals = conversation.last_context_stats
+        for key, value in stats.items():
+            totals[key] = totals.get(key, 0) + value
+        
+        return messages
+    
+    async def astream_message(self, user_message: str, session_id: str = "default") -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async version of stream_message, for the ASGI app.
+        
+        Completions are awaited on AsyncGroq and, with the Appwrite backend,
+        tools on async_db_client, so a turn waiting on the model or the
+        database holds no thread.
+        """
+        conversation = self.conversations.get(session_id)
+        
+        # Async turns all run on the event loop thread, where the conversation's
+        # re-entrant lock would not keep two turns of a session apart
+        async with conversation.async_lock:
+            await asyncio.to_thread(self._refresh_locked, conversation)
+            async for event in self._arun_turn(conversation, user_message):
+                yield event
+            conversation.trim(self.conversations.max_messages)
+            conversation.touch()
+            await asyncio.to_thread(self._save_locked, conversation)
+    
+    async def aprocess_message(self, user_message: str, session_id: str = "default") -> str:
+        """Async version of process_message."""
+        response = ""
+        async for event in self.astream_message(user_message, session_id=session_id):
+            if event["type"] == "done":
+                response = event["response"]
+        
+        return response
+    
+    def _refresh_locked(self, conversation: Conversation):
+        """Refresh a conversation under its thread lock."""
+        with conversation.lock:
+            self.conversations.refresh(conversation)
+    
+    def _save_locked(self, conversation: Conversation):
+        """Save a conversation under its thread lock."""
+        with conversation.lock:
+            self.conversations.save(conversation)
+    
+    def _run_turn(self, conversation: Conversation, user_message: str) -> Iterator[Dict[str, Any]]:
+        """Run one user turn against a conversation, yielding stream events."""
+        messages = self._begin_turn(conversation, user_message)
         
         # Get response from Groq
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            tools=self.tools,
-            tool_choice="auto",
-            max_tokens=1000,
-            temperature=0.7
-        )
+        completion = StreamedCompletion(self.client.chat.completions.create(
+            **self._completion_args(messages, with_tools=True)
+        ))
         
-        response_message = response.choices[0].message
-        tool_calls = response_message.tool_calls
+        for content in completion:
+            yield {"type": "delta", "content": content}
         
         # Process tool calls if any
-        if tool_calls:
-            for tool_call in tool_calls:
-                function_name = tool_call.function.name
-                function_args = json.loads(tool_call.function.arguments)
+        if completion.tool_calls:
+            calls = self._parse_tool_calls(completion.tool_calls)
+            for _, function_name, function_args in calls:
+                yield {"type": "tool_call", "name": function_name, "arguments": function_args}
+            
+            # Execute functions (independent calls run concurrently)
+            results = self._execute_tool_calls(calls)
+            yield from self._record_tool_results(conversation, calls, results)
+            
+            fast_reply = self._fast_reply(calls, results)
+            if fast_reply is not None:
+                yield {"type": "delta", "content": fast_reply}
+                assistant_message = fast_reply
+            else:
+                # Get final response after tool execution
+                completion = StreamedCompletion(self.client.chat.completions.create(
+                    **self._completion_args(self._build_messages(conversation), with_tools=False)
+                ))
                 
-                # Execute function
-                if function_name in self.available_functions:
-                    function_response = self.available_functions[function_name](**function_args)
-                    
-                    # Add function response to history
-                    self.conversation_history.append({
-                        "role": "assistant",
-                        "content": None,
-                        "tool_calls": [tool_call.model_dump()]
-                    })
-                    
-                    self.conversation_history.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "name": function_name,
-                        "content": function_response
-                    })
-            
-            # Get final response after tool execution
-            messages = [
-                {"role": "system", "content": self.system_prompt},
-                *self.conversation_history
-            ]
-            
-            final_response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=1000,
-                temperature=0.7
-            )
+                for content in completion:
+                    yield {"type": "delta", "content": content}
+                
+                assistant_message = completion.content
+        else:
+            assistant_message = completion.content
+        
+        yield self._end_turn(conversation, assistant_message)
+    
+    async def _arun_turn(self, conversation: Conversation, user_message: str) -> AsyncIterator[Dict[str, Any]]:
+        """Async version of _run_turn."""
+        messages = self._begin_turn(conversation, user_message)
+        client = self.async_clients.get()
+        
+        completion = AsyncStreamedCompletion(await client.chat.completions.create(
+            **self._completion_args(messages, with_tools=True)
+        ))
+        
+        async for content in completion:
+            yield {"type": "delta", "content": content}
+        
+        if completion.tool_calls:
+            calls = self._parse_tool_calls(completion.tool_calls)
+            for _, function_name, function_args in calls:
+                yield {"type": "tool_call", "name": function_name, "arguments": function_args}
             
-            assistant_message = final_response.choices[0].message.content
+            results = await self._aexecute_tool_calls(calls)
+            for event in self._record_tool_results(conversation, calls, results):
+                yield event
+            
+            fast_reply = self._fast_reply(calls, results)
+            if fast_reply is not None:
+                yield {"type": "delta", "content": fast_reply}
+                assistant_message = fast_reply
+            else:
+                completion = AsyncStreamedCompletion(await client.chat.completions.create(
+                    **self._completion_args(self._build_messages(conversation), with_tools=False)
+                ))
+                
+                async for content in completion:
+                    yield {"type": "delta", "content": content}
+                
+                assistant_message = completion.content
         else:
-            assistant_message = response_message.content
+            assistant_message = completion.content
+        
+        yield self._end_turn(conversation, assistant_message)
+    
+    def _begin_turn(self, conversation: Conversation, user_message: str) -> List[Dict[str, Any]]:
+        """Add the user's message to the history and build the first prompt."""
+        conversation.last_context_stats = {}
+        
+        # Add user message to history
+        conversation.messages.append({
+            "role": "user",
+            "content": user_message
+        })
+        
+        return self._build_messages(conversation)
+    
+    def _completion_args(self, messages: List[Dict[str, Any]], with_tools: bool) -> Dict[str, Any]:
+        """Arguments of a streamed chat completion request."""
+        args = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": 1000,
+            "temperature": 0.7,
+            "stream": True
+        }
+        if with_tools:
+            args["tools"] = self.tools
+            args["tool_choice"] = "auto"
+        return args
+    
+    def _parse_tool_calls(self, tool_calls: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], str, Dict[str, Any]]]:
+        """Turn the model's tool calls into (tool_call, function_name, function_args) for known tools."""
+        calls = []
+        for tool_call in tool_calls:
+            function_name = tool_call["function"]["name"]
+            function_args = json.loads(tool_call["function"]["arguments"] or "{}")
+            
+            if function_name in self.available_functions:
+                calls.append((tool_call, function_name, function_args))
         
-        # Add assistant response to history
-        self.conversation_history.append({
+        return calls
+    
+    def _record_tool_results(
+        self,
+        conversation: Conversation,
+        calls: List[Tuple[Dict[str, Any], str, Dict[str, Any]]],
+        results: List[str]
+    ) -> Iterator[Dict[str, Any]]:
+        """Add tool calls and their results to the history, yielding tool_result events."""
+        for (tool_call, function_name, _), function_response in zip(calls, results):
+            # Add function response to history
+            conversation.messages.append({
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [tool_call]
+            })
+            
+            conversation.messages.append({
+                "role": "tool",
+                "tool_call_id": tool_call["id"],
+                "name": function_name,
+                "content": function_response
+            })
+            
+            yield {"type": "tool_result", "name": function_name, "result": function_response}
+    
+    def _fast_reply(
+        self,
+        calls: List[Tuple[Dict[str, Any], str, Dict[str, Any]]],
+        results: List[str]
+    ) -> Optional[str]:
+        """Template reply for simple mutations, saving a second completion (None if not applicable)."""
+        if not self.fast_path:
+            return None
+        
+        fast_reply = build_fast_reply([
+            (function_name, function_args, function_response)
+            for (_, function_name, function_args), function_response in zip(calls, results)
+        ])
+        
+        if fast_reply is not None:
+            with self._stats_lock:
+                self.skipped_completions += 1
+        
+        return fast_reply
+    
+    def _end_turn(self, conversation: Conversation, assistant_message: str) -> Dict[str, Any]:
+        """Add the reply to the history and build the done event."""
+        conversation.messages.append({
             "role": "assistant",
             "content": assistant_message
         })
         
-        return assistant_message
+        stats = conversation.last_context_stats
+        if stats.get("prompt_tokens_saved"):
+            print(f"✂️  Context window saved {stats['prompt_tokens_saved']} prompt tokens "
+                  f"(sent {stats['prompt_tokens']}) for session {conversation.session_id}")
+        
+        return {"type": "done", "response": assistant_message, "context": dict(stats)}
+    
+    def _execute_tool_calls(self, calls: List[Tuple[Dict[str, Any], str, Dict[str, Any]]]) -> List[str]:
+        """
+        Execute tool calls, running independent ones concurrently.
+        
+        Calls that touch the same document (or a whole collection, like
+        get_todos or any call by title) are grouped and run in their original
+        order; the groups run in parallel on the tool executor.
+        
+        Args:
+            calls: (tool_call, function_name, function_args) tuples in model order
+        
+        Returns:
+            Function responses in the same order as calls
+        """
+        results: List[Optional[str]] = [None] * len(calls)
+        groups = self._group_tool_calls(calls)
+        
+        def run_group(indexes: List[int]):
+            for i in indexes:
+                _, function_name, function_args = calls[i]
+                results[i] = self.available_functions[function_name](**function_args)
+        
+        if len(groups) <= 1:
+            for indexes in groups:
+                run_group(indexes)
+        else:
+            futures = [self.tool_executor.submit(run_group, indexes) for indexes in groups]
+            for future in futures:
+                future.result()
+        
+        return results
+    
+    async def _aexecute_tool_calls(self, calls: List[Tuple[Dict[str, Any], str, Dict[str, Any]]]) -> List[str]:
+        """
+        Async version of _execute_tool_calls.
+        
+        Groups of conflicting calls run concurrently as coroutines on
+        async_db_client. Without it (another storage backend) the sync tools
+        run on a worker thread.
+        """
+        if async_db_client is None:
+            return await asyncio.to_thread(self._execute_tool_calls, calls)
+        
+        results: List[Optional[str]] = [None] * len(calls)
+        
+        async def run_group(indexes: List[int]):
+            for i in indexes:
+                _, function_name, function_args = calls[i]
+                results[i] = await self.async_functions[function_name](**function_args)
+        
+        await asyncio.gather(*(run_group(indexes) for indexes in self._group_tool_calls(calls)))
+        return results
+    
+    def _group_tool_calls(self, calls: List[Tuple[Dict[str, Any], str, Dict[str, Any]]]) -> List[List[int]]:
+        """Group the indexes of conflicting calls, each group in call order."""
+        # Group conflicting calls with a union-find over call indexes
+        parent = list(range(len(calls)))
+        
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        targets = [self._tool_target(name, args) for _, name, args in calls]
+        for i in range(len(calls)):
+            for j in range(i):
+                if self._targets_conflict(targets[i], targets[j]):
+                    parent[find(i)] = find(j)
+        
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(calls)):
+            groups.setdefault(find(i), []).append(i)
+        return list(groups.values())
+    
+    @staticmethod
+    def _tool_target(function_name: str, function_args: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+        """
+        Get the (collection, document ID) a tool call touches; None means the whole collection.
+        
+        Only a call naming a document ID is known to touch just that document.
+        Calls by title are resolved fuzzily (see find_todos) and may match any
+        document, including one created or changed by another call of the same
+        turn, so they count as touching the whole collection, like reads and
+        batches. A single create touches only the document it adds
+        (NEW_DOCUMENT), so several creates can run side by side.
+        """
+        collection = "reminders" if "reminder" in function_name else "todos"
+        
+        if function_name.startswith("get_") or function_name in BATCH_TOOLS:
+            return collection, None
+        if function_name.startswith("create_"):
+            return collection, NEW_DOCUMENT
+        
+        doc_id = function_args.get("todo_id") or function_args.get("reminder_id")
+        return collection, doc_id or None
+    
+    @staticmethod
+    def _targets_conflict(a: Tuple[str, Optional[str]], b: Tuple[str, Optional[str]]) -> bool:
+        """Whether two tool call targets may touch the same document."""
+        if a[0] != b[0]:
+            return False
+        if a[1] is None or b[1] is None:
+            return True
+        # A new document is unknown to every other call that is not a whole-collection one
+        if a[1] == NEW_DOCUMENT or b[1] == NEW_DOCUMENT:
+            return False
+        return a[1] == b[1]
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get agent-wide counters."""
+        with self._stats_lock:
+            return {
+                "active_sessions": len(self.conversations),
+                "skipped_completions": self.skipped_completions,
+            }
+    
+    def get_context_stats(self, session_id: str) -> Dict[str, int]:
+        """Get the prompt token stats of the latest turn in a session."""
+        conversation = self.conversations.get(session_id)
+        with conversation.lock:
+            self.conversations.refresh(conversation)
+            return dict(conversation.last_context_stats)
     
-    def reset_conversation(self):
-        """Reset the conversation history."""
-        self.conversation_history = []
+    def reset_conversation(self, session_id: Optional[str] = None):
+        """Reset the conversation history for a session, or for all sessions."""
+        self.conversations.reset(session_id)
 
 
 # Global agent instance
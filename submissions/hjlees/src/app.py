@@ -1,13 +1,23 @@
 """Main Flask application for Agora Todo Assistant."""
 from flask import Flask, request, jsonify, render_template, Response
+import hashlib
 import json
 import os
+import queue
+import threading
 from datetime import datetime
+from typing import Optional
 
 from config import Config
 from ai_agent import agent
 from database import db_client
+from change_feed import change_feed
+from jobs import job_runner
+from session_registry import session_registry
+from models import TodoFilter, TodoPriority, ReminderImportance
+from serialization import json_response, todos_to_json, reminders_to_json
 from tts_service import tts_service
+from speech_pipeline import speech_pipeline
 from agora_service import agora_service, ConversationalAIAgent
 from heygen_service import heygen_service, StreamingAvatarSession
 
@@ -24,9 +34,37 @@ except ValueError as e:
     print("Please check your .env file and ensure all required variables are set.")
 
 
-# Global session management
-active_sessions = {}
-heygen_sessions = {}
+# Global session management: live Agora agents (by channel) and HeyGen avatar
+# sessions (by session ID), kept in the session registry so idle ones are
+# stopped and, with SESSION_STORE=sqlite, every worker sees them
+AGORA_SESSION = "agora"
+HEYGEN_SESSION = "heygen"
+
+session_registry.register_kind(
+    AGORA_SESSION,
+    lambda state: ConversationalAIAgent.from_state(agora_service, state).stop(),
+    abandon=lambda state: ConversationalAIAgent.from_state(agora_service, state).release_uids()
+)
+session_registry.register_kind(
+    HEYGEN_SESSION, lambda state: StreamingAvatarSession.from_state(heygen_service, state).stop()
+)
+session_registry.start_reaper()
+
+
+def get_agora_agent(channel_name: str):
+    """Get the conversational AI agent running in a channel, or None."""
+    state = session_registry.get(AGORA_SESSION, channel_name)
+    return ConversationalAIAgent.from_state(agora_service, state) if state else None
+
+
+def get_heygen_session(session_id: str):
+    """Get a streaming avatar session by ID, or None."""
+    state = session_registry.get(HEYGEN_SESSION, session_id)
+    return StreamingAvatarSession.from_state(heygen_service, state) if state else None
+
+# Page sizes for paged list endpoints
+DEFAULT_PAGE_LIMIT = 25
+MAX_PAGE_LIMIT = 100
 
 
 @app.route('/')
@@ -57,7 +95,8 @@ def chat():
     Returns:
         {
             "response": "agent response text",
-            "session_id": "session identifier"
+            "session_id": "session identifier",
+            "context": {"prompt_tokens": 0, "prompt_tokens_saved": 0}
         }
     """
     try:
@@ -69,11 +108,12 @@ def chat():
             return jsonify({"error": "Missing 'message' field"}), 400
         
         # Process message through agent
-        response = agent.process_message(message)
+        response = agent.process_message(message, session_id=session_id)
         
         return jsonify({
             "response": response,
             "session_id": session_id,
+            "context": agent.get_context_stats(session_id),
             "timestamp": datetime.utcnow().isoformat()
         })
         
@@ -84,35 +124,381 @@ def chat():
         return jsonify({"error": str(e)}), 500
 
 
+def sse_event(event: str, data: dict) -> str:
+    """Format a Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Process a chat message and stream the response as Server-Sent Events.
+    
+    Request body:
+        {
+            "message": "user message text",
+            "session_id": "optional session identifier"
+        }
+    
+    Returns:
+        text/event-stream with events:
+            tool_call   {"name": ..., "arguments": {...}}
+            tool_result {"name": ..., "result": "..."}
+            delta       {"content": "next piece of text"}
+            done        {"response": "full text", "session_id": ..., "context": {...}}
+            error       {"error": "message"}
+    """
+    data = request.get_json() or {}
+    message = data.get('message')
+    session_id = data.get('session_id', 'default')
+    
+    if not message:
+        return jsonify({"error": "Missing 'message' field"}), 400
+    
+    def generate():
+        try:
+            for event in agent.stream_message(message, session_id=session_id):
+                event_type = event.pop("type")
+                if event_type == "done":
+                    event["session_id"] = session_id
+                    event["timestamp"] = datetime.utcnow().isoformat()
+                yield sse_event(event_type, event)
+        except Exception as e:
+            import traceback
+            print(f"Error in chat stream endpoint: {e}")
+            print(f"Traceback: {traceback.format_exc()}")
+            yield sse_event("error", {"error": str(e)})
+    
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
+@app.route('/api/chat/voice', methods=['POST'])
+def chat_voice():
+    """
+    Process a voice turn, streaming the reply text and its audio as Server-Sent Events.
+    
+    Each sentence is sent to ElevenLabs as soon as Groq has finished it, so
+    the first audio segment is ready after about one sentence.
+    
+    Request body:
+        {
+            "message": "user message text",
+            "session_id": "optional session identifier",
+            "voice_id": "optional voice ID"
+        }
+    
+    Returns:
+        text/event-stream with the same events as /api/chat/stream, plus:
+            audio {"index": 0, "text": "sentence", "audio": "base64 MP3 or null"}
+        Audio events arrive in sentence order, before the final done event.
+    """
+    data = request.get_json() or {}
+    message = data.get('message')
+    session_id = data.get('session_id', 'default')
+    voice_id = data.get('voice_id')
+    
+    if not message:
+        return jsonify({"error": "Missing 'message' field"}), 400
+    
+    def generate():
+        try:
+            events = agent.stream_message(message, session_id=session_id)
+            for event in speech_pipeline.stream(events, voice_id=voice_id):
+                event_type = event.pop("type")
+                if event_type == "done":
+                    event["session_id"] = session_id
+                    event["timestamp"] = datetime.utcnow().isoformat()
+                yield sse_event(event_type, event)
+        except Exception as e:
+            import traceback
+            print(f"Error in chat voice endpoint: {e}")
+            print(f"Traceback: {traceback.format_exc()}")
+            yield sse_event("error", {"error": str(e)})
+    
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
+@app.route('/api/chat/stats', methods=['GET'])
+def chat_stats():
+    """Get AI agent counters (active sessions, skipped LLM completions)."""
+    return jsonify(agent.get_stats())
+
+
 @app.route('/api/chat/reset', methods=['POST'])
 def reset_chat():
-    """Reset the conversation history."""
+    """
+    Reset the conversation history for a session.
+    
+    Request body:
+        {
+            "session_id": "optional session identifier"
+        }
+    """
     try:
-        agent.reset_conversation()
+        data = request.get_json(silent=True) or {}
+        session_id = data.get('session_id', 'default')
+        
+        agent.reset_conversation(session_id)
         return jsonify({"status": "reset", "message": "Conversation history cleared"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+# ===== Change Feed =====
+
+# Open /api/events streams of this process, capped so that subscribers only use
+# the threads gunicorn.conf.py adds for them
+event_streams = threading.BoundedSemaphore(Config.CHANGE_FEED_MAX_STREAMS)
+
+
+@app.route('/api/events', methods=['GET'])
+def events():
+    """
+    Stream todo and reminder changes as Server-Sent Events.
+    
+    Returns:
+        text/event-stream with events:
+            change {"collection": "todos", "todos": [...], "deleted": [...], "version": ..., "full": false}
+                   Changed items and deleted IDs, coalesced over CHANGE_FEED_COALESCE_MS.
+                   With "full": true the client should reload that collection.
+            change {"resync": true}
+                   The client fell behind; reload both collections.
+        503 if CHANGE_FEED_MAX_STREAMS streams are already open
+    """
+    if not event_streams.acquire(blocking=False):
+        response = jsonify({"error": "Too many open event streams, retry later"})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    
+    subscription = change_feed.subscribe()
+    
+    def generate():
+        try:
+            # Reconnect quickly if the connection drops
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    payload = subscription.get(timeout=Config.CHANGE_FEED_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    # Keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: change\ndata: {payload}\n\n"
+        finally:
+            change_feed.unsubscribe(subscription)
+    
+    response = Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+    # Runs even if the stream is closed before it started
+    response.call_on_close(event_streams.release)
+    return response
+
+
 # ===== Todo Endpoints =====
 
+TODO_FILTER_PARAMS = ('view', 'priority_min', 'due_after', 'due_before', 'q', 'sort', 'order')
+
+
+def parse_todo_filter(args) -> TodoFilter:
+    """
+    Build a TodoFilter from request query parameters.
+    
+    Raises:
+        ValueError: If a parameter has an invalid value
+    """
+    view = args.get('view')
+    todo_filter = TodoFilter.for_view(view) if view else TodoFilter()
+    
+    updates = {}
+    if args.get('priority_min'):
+        updates['min_priority'] = args['priority_min'].lower()
+    if args.get('due_after'):
+        updates['due_after'] = datetime.fromisoformat(args['due_after'])
+    if args.get('due_before'):
+        updates['due_before'] = datetime.fromisoformat(args['due_before'])
+    if args.get('q'):
+        updates['search'] = args['q']
+    if args.get('sort'):
+        updates['sort_by'] = args['sort']
+    if args.get('order'):
+        if args['order'] not in ('asc', 'desc'):
+            raise ValueError("order must be 'asc' or 'desc'")
+        updates['descending'] = args['order'] == 'desc'
+    
+    return TodoFilter(**{**todo_filter.model_dump(), **updates})
+
+
+def list_etag(version: str) -> str:
+    """ETag of a list response: the collection version plus the query that shaped it."""
+    key = f"{version}?{request.query_string.decode()}"
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def conditional_response(etag, build_response) -> Response:
+    """
+    Answer a conditional GET.
+    
+    Args:
+        etag: Current ETag of the resource, or None if it cannot be cached
+        build_response: Called to build the response when the client's copy is stale
+    
+    Returns:
+        304 Not Modified if If-None-Match matches etag, otherwise the built response
+    """
+    if etag is not None and request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = build_response()
+    
+    if etag is not None and response.status_code in (200, 304):
+        response.set_etag(etag)
+        # Clients may keep the list but must revalidate before using it
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def delta_response(key: str, changes, since: str, get_item, to_json, build_full) -> Response:
+    """
+    Answer a ?since= delta request.
+    
+    Args:
+        key: Response key holding the items ("todos" or "reminders")
+        changes: The collection's ChangeLog
+        since: Version token the client already has
+        get_item: Fetches one item by ID
+        to_json: Converts items to JSON-ready dicts
+        build_full: Returns (items, version) of the whole collection, used
+            when the change log can no longer answer since
+    
+    Returns:
+        Changed items and deleted IDs, or the full list with "full": true
+    """
+    delta = changes.changes_since(since)
+    if delta is None:
+        items, version = build_full()
+        return json_response({key: to_json(items), "deleted": [], "version": version, "full": True})
+    
+    changed_ids, deleted_ids, version = delta
+    items = []
+    for item_id in changed_ids:
+        item = get_item(item_id)
+        if item is not None:
+            items.append(item)
+        else:
+            deleted_ids.append(item_id)
+    
+    return json_response({key: to_json(items), "deleted": deleted_ids, "version": version, "full": False})
+
+
 @app.route('/api/todos', methods=['GET'])
 def get_todos():
-    """Get all todos."""
+    """
+    Get all todos.
+    
+    Query parameters:
+        completed: Optional true/false filter
+        view: Optional preset (today, overdue, upcoming, important)
+        priority_min: Only todos with at least this priority
+        due_after, due_before: ISO due date range (after is inclusive)
+        q: Text to search for in titles
+        sort: created_at, updated_at, due_date, priority or title
+        order: asc or desc (default desc)
+        refresh: true to bypass the in-process cache
+        cursor, limit: Return one page instead of the whole list; pass the
+            response's next_cursor as cursor to get the following page
+        since: Version token from an earlier response; returns only the todos
+            changed and the IDs deleted since then (no other parameters allowed)
+    
+    Responses carry an ETag; send it back as If-None-Match to get a 304 when
+    nothing changed. Views depend on the current time and are never cached.
+    """
     try:
-        completed = request.args.get('completed')
-        if completed is not None:
-            completed = completed.lower() == 'true'
+        if request.args.get('refresh', '').lower() == 'true':
+            db_client.invalidate_cache()
         
-        todos = db_client.get_todos(completed=completed)
-        return jsonify({
-            "todos": [todo.model_dump() for todo in todos],
-            "count": len(todos)
-        })
+        version = db_client.todos_version()
+        etag = None if request.args.get('view') else list_etag(version)
+        
+        since = request.args.get('since')
+        if since is not None:
+            if any(param not in ('since', 'refresh') for param in request.args):
+                return jsonify({"error": "since cannot be combined with other parameters"}), 400
+            return conditional_response(etag, lambda: delta_response(
+                "todos", db_client.todo_changes, since, db_client.get_todo, todos_to_json,
+                lambda: (db_client.get_todos(), db_client.todos_version())
+            ))
+        
+        return conditional_response(etag, lambda: build_todos_response(version))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def build_todos_response(version: str) -> Response:
+    """Build the /api/todos response for the current request's query parameters."""
+    completed = request.args.get('completed')
+    if completed is not None:
+        completed = completed.lower() == 'true'
+    
+    todo_filter = None
+    if any(request.args.get(param) for param in TODO_FILTER_PARAMS):
+        try:
+            todo_filter = parse_todo_filter(request.args)
+        except ValueError as e:
+            return json_response({"error": f"Invalid filter: {e}"}, 400)
+        if completed is not None:
+            todo_filter.completed = completed
+    
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit', type=int)
+    if cursor or limit:
+        try:
+            todos, next_cursor, total = db_client.list_todos_page(
+                completed=completed,
+                cursor=cursor,
+                limit=max(1, min(limit or DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT)),
+                todo_filter=todo_filter
+            )
+        except ValueError as e:
+            return json_response({"error": str(e)}, 400)
+        return json_response({
+            "todos": todos_to_json(todos),
+            "count": len(todos),
+            "total": total,
+            "next_cursor": next_cursor,
+            "version": version
+        })
+    
+    if todo_filter is not None:
+        todos = db_client.query_todos(todo_filter)
+    else:
+        todos = db_client.get_todos(completed=completed)
+    return json_response({
+        "todos": todos_to_json(todos),
+        "count": len(todos),
+        "version": version
+    })
+
+
 @app.route('/api/todos/<todo_id>', methods=['GET'])
 def get_todo(todo_id):
     """Get a specific todo."""
@@ -125,60 +511,283 @@ def get_todo(todo_id):
         return jsonify({"error": str(e)}), 500
 
 
+def batch_response(action: str, results) -> dict:
+    """Build the response body for a bulk operation."""
+    succeeded = sum(1 for result in results if result.success)
+    return {
+        "action": action,
+        "results": [result.model_dump() for result in results],
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded
+    }
+
+
+def parse_todo_fields(item: dict) -> dict:
+    """Convert a JSON todo into create_todo/update_todo keyword arguments."""
+    fields = {}
+    for key in ('title', 'description'):
+        if key in item:
+            fields[key] = item[key]
+    if item.get('priority'):
+        fields['priority'] = TodoPriority(item['priority'].lower())
+    if item.get('due_date'):
+        fields['due_date'] = datetime.fromisoformat(item['due_date'])
+    return fields
+
+
+@app.route('/api/todos/batch', methods=['POST'])
+def batch_todos():
+    """
+    Create, update, complete or delete many todos at once.
+    
+    Request body:
+        {
+            "action": "create" | "update" | "complete" | "delete" | "delete_completed",
+            "items": [...]  # create: todos; update: todos with "id"
+            "ids": [...]    # complete/delete: todo IDs
+        }
+    
+    Returns:
+        Per-item results in request order, plus succeeded/failed counts
+    """
+    try:
+        data = request.get_json() or {}
+        action = data.get('action')
+        items = data.get('items') or []
+        ids = data.get('ids') or []
+        
+        if len(items) > Config.DB_BATCH_MAX_ITEMS or len(ids) > Config.DB_BATCH_MAX_ITEMS:
+            return jsonify({"error": f"At most {Config.DB_BATCH_MAX_ITEMS} items per batch"}), 400
+        
+        try:
+            if action == 'create':
+                if any(not item.get('title') for item in items):
+                    return jsonify({"error": "Every item needs a 'title'"}), 400
+                results = db_client.create_todos([parse_todo_fields(item) for item in items])
+            elif action == 'update':
+                if any(not item.get('id') for item in items):
+                    return jsonify({"error": "Every item needs an 'id'"}), 400
+                results = db_client.update_todos([
+                    {"todo_id": item['id'], "completed": item.get('completed'), **parse_todo_fields(item)}
+                    for item in items
+                ])
+            elif action == 'complete':
+                results = db_client.complete_todos(ids)
+            elif action == 'delete':
+                results = db_client.delete_todos(ids)
+            elif action == 'delete_completed':
+                results = db_client.delete_completed_todos()
+            else:
+                return jsonify({"error": f"Unknown action '{action}'"}), 400
+        except ValueError as e:
+            return jsonify({"error": f"Invalid item: {e}"}), 400
+        
+        return jsonify(batch_response(action, results))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/api/reminders', methods=['GET'])
 def get_reminders():
-    """Get all reminders."""
+    """
+    Get all reminders.
+    
+    Query parameters:
+        refresh: true to bypass the in-process cache
+        cursor, limit: Return one page instead of the whole list
+        since: Version token from an earlier response; returns only the
+            reminders changed and the IDs deleted since then
+    
+    Responses carry an ETag for conditional requests (If-None-Match).
+    """
     try:
-        reminders = db_client.get_reminders()
-        return jsonify({
-            "reminders": [reminder.model_dump() for reminder in reminders],
-            "count": len(reminders)
-        })
+        if request.args.get('refresh', '').lower() == 'true':
+            db_client.invalidate_cache()
+        
+        version = db_client.reminders_version()
+        etag = list_etag(version)
+        
+        since = request.args.get('since')
+        if since is not None:
+            if any(param not in ('since', 'refresh') for param in request.args):
+                return jsonify({"error": "since cannot be combined with other parameters"}), 400
+            return conditional_response(etag, lambda: delta_response(
+                "reminders", db_client.reminder_changes, since, db_client.get_reminder, reminders_to_json,
+                lambda: (db_client.get_reminders(), db_client.reminders_version())
+            ))
+        
+        cursor = request.args.get('cursor')
+        limit = request.args.get('limit', type=int)
+        if cursor or limit:
+            def build_page():
+                reminders, next_cursor, total = db_client.list_reminders_page(
+                    cursor=cursor,
+                    limit=max(1, min(limit or DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT))
+                )
+                return json_response({
+                    "reminders": reminders_to_json(reminders),
+                    "count": len(reminders),
+                    "total": total,
+                    "next_cursor": next_cursor,
+                    "version": version
+                })
+            return conditional_response(etag, build_page)
+        
+        def build_list():
+            reminders = db_client.get_reminders()
+            return json_response({
+                "reminders": reminders_to_json(reminders),
+                "count": len(reminders),
+                "version": version
+            })
+        return conditional_response(etag, build_list)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/reminders/batch', methods=['POST'])
+def batch_reminders():
+    """
+    Create or delete many reminders at once.
+    
+    Request body:
+        {
+            "action": "create" | "delete",
+            "items": [...]  # create: reminders
+            "ids": [...]    # delete: reminder IDs
+        }
+    """
+    try:
+        data = request.get_json() or {}
+        action = data.get('action')
+        items = data.get('items') or []
+        ids = data.get('ids') or []
+        
+        if len(items) > Config.DB_BATCH_MAX_ITEMS or len(ids) > Config.DB_BATCH_MAX_ITEMS:
+            return jsonify({"error": f"At most {Config.DB_BATCH_MAX_ITEMS} items per batch"}), 400
+        
+        if action == 'create':
+            try:
+                reminders = []
+                for item in items:
+                    if not item.get('reminder_text'):
+                        return jsonify({"error": "Every item needs a 'reminder_text'"}), 400
+                    reminders.append({
+                        "reminder_text": item['reminder_text'],
+                        "importance": ReminderImportance((item.get('importance') or 'medium').lower()),
+                        "reminder_date": datetime.fromisoformat(item['reminder_date']) if item.get('reminder_date') else None
+                    })
+            except ValueError as e:
+                return jsonify({"error": f"Invalid item: {e}"}), 400
+            results = db_client.create_reminders(reminders)
+        elif action == 'delete':
+            results = db_client.delete_reminders(ids)
+        else:
+            return jsonify({"error": f"Unknown action '{action}'"}), 400
+        
+        return jsonify(batch_response(action, results))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 # ===== TTS Endpoints =====
 
-@app.route('/api/tts', methods=['POST'])
+def parse_tts_request(data):
+    """Get (text, voice_id, stream) from a JSON body or a query string."""
+    stream = data.get('stream', False)
+    if isinstance(stream, str):
+        stream = stream.lower() in ('1', 'true')
+    return data.get('text'), data.get('voice_id'), bool(stream)
+
+
+# Extra response headers of streamed TTS audio, so proxies pass chunks on
+# as they arrive instead of buffering the whole response
+TTS_STREAM_HEADERS = {
+    'X-Accel-Buffering': 'no'
+}
+
+
+def tts_cache_headers(key: str, hit: bool) -> dict:
+    """
+    Cache headers of a TTS response.
+    
+    Audio is addressed by its cache key, so the same URL always returns the
+    same audio and browsers may keep it for TTS_CACHE_MAX_AGE_SECONDS.
+    """
+    return {
+        'ETag': f'"{key}"',
+        'Cache-Control': f'public, max-age={Config.TTS_CACHE_MAX_AGE_SECONDS}, immutable',
+        'X-Cache': 'HIT' if hit else 'MISS'
+    }
+
+
+@app.route('/api/tts', methods=['GET', 'POST'])
 def text_to_speech():
     """
     Convert text to speech.
     
-    Request body:
+    Request body (POST) or query string (GET):
         {
             "text": "text to convert",
             "voice_id": "optional voice ID",
             "stream": false
         }
     
+    With "stream" the audio comes from ElevenLabs' streaming endpoint and
+    is sent chunk by chunk, so playback can start before synthesis ends.
+    
     Returns:
-        Audio data (audio/mpeg)
+        Audio data (audio/mpeg). Audio is cached by text, voice and settings;
+        X-Cache tells whether it was, and a request whose If-None-Match
+        matches the ETag gets 304 without synthesis. Use GET so the browser
+        cache can answer repeated phrases itself.
     """
     try:
-        data = request.get_json()
-        text = data.get('text')
-        voice_id = data.get('voice_id')
-        stream = data.get('stream', False)
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+        else:
+            data = request.args
+        text, voice_id, stream = parse_tts_request(data)
         
         if not text:
             return jsonify({"error": "Missing 'text' field"}), 400
         
+        key = tts_service.cache_key(text, voice_id=voice_id, streamed=stream)
+        if request.if_none_match.contains(key):
+            return Response(status=304, headers=tts_cache_headers(key, hit=True))
+        headers = tts_cache_headers(key, hit=tts_service.is_cached(key))
+        
         if stream:
             def generate():
+                # Each chunk is written to the client as soon as ElevenLabs sends it
                 for chunk in tts_service.text_to_speech_stream(text, voice_id=voice_id):
                     yield chunk
             
-            return Response(generate(), mimetype='audio/mpeg')
+            headers.update(TTS_STREAM_HEADERS)
+            return Response(generate(), mimetype='audio/mpeg', headers=headers)
         else:
             audio_data = tts_service.text_to_speech(text, voice_id=voice_id)
-            return Response(audio_data, mimetype='audio/mpeg')
+            return Response(audio_data, mimetype='audio/mpeg', headers=headers)
         
     except Exception as e:
         print(f"Error in TTS endpoint: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/tts/stats', methods=['GET'])
+def tts_stats():
+    """Audio cache counters: memory/disk hits, misses, evictions, sizes and hit rate."""
+    if tts_service.cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **tts_service.cache.get_stats()})
+
+
+@app.route('/api/tts/latency', methods=['GET'])
+def tts_latency():
+    """Time to the first audio byte of ElevenLabs streams: count, last, mean, p50, p95 and max (ms)."""
+    return jsonify(tts_service.first_byte_latency.get_stats())
+
+
 @app.route('/api/tts/voices', methods=['GET'])
 def get_voices():
     """Get available TTS voices."""
@@ -201,11 +810,128 @@ def get_voices():
 
 # ===== Agora RTC Endpoints =====
 
+# Most tokens issued by one /api/agora/token/batch request
+MAX_TOKEN_BATCH = 100
+
+
+AGORA_NOT_CONFIGURED = {
+    "error": "Agora App ID not configured. Please set AGORA_APP_ID in your .env file"
+}
+
+
+def agora_configured() -> bool:
+    """Whether the Agora App ID is set."""
+    return bool(Config.AGORA_APP_ID) and Config.AGORA_APP_ID != "your-app-id"
+
+
+def agora_not_configured():
+    """Error response if the Agora App ID is missing, else None."""
+    if not agora_configured():
+        return jsonify(AGORA_NOT_CONFIGURED), 500
+    return None
+
+
+# Agora RTC UIDs are unsigned 32-bit integers
+AGORA_MAX_UID = 2 ** 32 - 1
+
+
+def parse_agora_uid(value) -> Optional[int]:
+    """
+    Parse a client-supplied Agora UID.
+    
+    Args:
+        value: UID from the request body (int or numeric string)
+    
+    Returns:
+        The UID as an int, or None if it is not an integer in 0..AGORA_MAX_UID
+    """
+    if isinstance(value, bool):
+        return None
+    try:
+        uid = int(value)
+    except (TypeError, ValueError):
+        return None
+    return uid if 0 <= uid <= AGORA_MAX_UID else None
+
+
+def parse_agora_role(value) -> Optional[int]:
+    """Parse a client-supplied Agora role: 1 (publisher) or 2 (subscriber), else None."""
+    if isinstance(value, bool):
+        return None
+    try:
+        role = int(value)
+    except (TypeError, ValueError):
+        return None
+    return role if role in (1, 2) else None
+
+
+def issue_agora_token(data: dict, force_new: bool = False):
+    """
+    Issue a token for the channel/uid/role in a request body.
+    
+    Shared by the token and renew endpoints of the Flask and ASGI apps.
+    
+    Returns:
+        Tuple of (response body, status code)
+    """
+    try:
+        channel_name = data.get('channel_name')
+        
+        if not channel_name:
+            return {"error": "Missing 'channel_name' field"}, 400
+        
+        uid = parse_agora_uid(data.get('uid', 0))
+        if uid is None:
+            return {"error": f"'uid' must be an integer between 0 and {AGORA_MAX_UID}"}, 400
+        role = parse_agora_role(data.get('role', 1))
+        if role is None:
+            return {"error": "'role' must be 1 (publisher) or 2 (subscriber)"}, 400
+        
+        # Validate Agora credentials
+        if not agora_configured():
+            return AGORA_NOT_CONFIGURED, 500
+        
+        issued = agora_service.issue_rtc_token(
+            channel_name=channel_name,
+            uid=uid,
+            role=role,
+            force_new=force_new
+        )
+        
+        # Testing mode: no certificate enabled
+        testing_mode = issued["token"] is None
+        
+        return {
+            "token": issued["token"],
+            "expires_at": issued["expires_at"],
+            "channel_name": channel_name,
+            "uid": uid,
+            "app_id": Config.AGORA_APP_ID,
+            "testing_mode": testing_mode
+        }, 200
+        
+    except Exception as e:
+        print(f"Error in generate_agora_token: {e}")
+        return {
+            "error": f"Failed to generate token: {str(e)}",
+            "hint": "Check your AGORA_APP_ID and AGORA_APP_CERTIFICATE in .env file"
+        }, 500
+
+
+def agora_token_response(force_new: bool = False):
+    """Issue a token for the channel/uid/role in the request body (shared by token and renew)."""
+    body, status = issue_agora_token(request.get_json() or {}, force_new=force_new)
+    return jsonify(body), status
+
+
 @app.route('/api/agora/token', methods=['POST'])
 def generate_agora_token():
     """
     Generate Agora RTC token.
     
+    A cached token for the same channel, uid and role is returned while it has
+    more than AGORA_TOKEN_MIN_REMAINING_SECONDS of lifetime left.
+    
     Request body:
         {
             "channel_name": "channel name",
@@ -216,57 +942,123 @@ def generate_agora_token():
     Returns:
         {
             "token": "rtc token" or null (for testing mode),
+            "expires_at": unix timestamp or null,
             "channel_name": "channel name",
             "uid": uid,
             "app_id": "app id",
             "testing_mode": boolean
         }
     """
+    return agora_token_response()
+
+
+@app.route('/api/agora/token/renew', methods=['POST'])
+def renew_agora_token():
+    """
+    Issue a fresh Agora RTC token with a full lifetime.
+    
+    Call this from the client's token-privilege-will-expire handler and pass
+    the token to renewToken(). Same request body and response as /api/agora/token.
+    """
+    return agora_token_response(force_new=True)
+
+
+@app.route('/api/agora/token/batch', methods=['POST'])
+def generate_agora_tokens():
+    """
+    Generate Agora RTC tokens for several uids in one channel.
+    
+    Request body:
+        {
+            "channel_name": "channel name",
+            "uids": [1001, 1002],
+            "role": 1
+        }
+    
+    Returns:
+        {
+            "tokens": [{"uid": 1001, "token": "rtc token" or null, "expires_at": ...}, ...],
+            "channel_name": "channel name",
+            "app_id": "app id",
+            "testing_mode": boolean
+        }
+    """
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         channel_name = data.get('channel_name')
-        uid = data.get('uid', 0)
-        role = data.get('role', 1)
+        uids = data.get('uids')
+        role = parse_agora_role(data.get('role', 1))
         
         if not channel_name:
             return jsonify({"error": "Missing 'channel_name' field"}), 400
+        if not isinstance(uids, list) or not uids:
+            return jsonify({"error": "'uids' must be a non-empty list"}), 400
+        if len(uids) > MAX_TOKEN_BATCH:
+            return jsonify({"error": f"At most {MAX_TOKEN_BATCH} uids per request"}), 400
+        if role is None:
+            return jsonify({"error": "'role' must be 1 (publisher) or 2 (subscriber)"}), 400
+        parsed = [parse_agora_uid(uid) for uid in uids]
+        if None in parsed:
+            return jsonify({"error": f"Every uid must be an integer between 0 and {AGORA_MAX_UID}"}), 400
+        uids = parsed
         
-        # Validate Agora credentials
-        if not Config.AGORA_APP_ID or Config.AGORA_APP_ID == "your-app-id":
-            return jsonify({
-                "error": "Agora App ID not configured. Please set AGORA_APP_ID in your .env file"
-            }), 500
-        
-        token = agora_service.generate_rtc_token(
-            channel_name=channel_name,
-            uid=uid,
-            role=role
-        )
+        error = agora_not_configured()
+        if error:
+            return error
         
-        # Testing mode: no certificate enabled
-        testing_mode = token is None
+        tokens = []
+        for uid in uids:
+            issued = agora_service.issue_rtc_token(channel_name=channel_name, uid=uid, role=role)
+            tokens.append({"uid": uid, "token": issued["token"], "expires_at": issued["expires_at"]})
         
         return jsonify({
-            "token": token,
+            "tokens": tokens,
             "channel_name": channel_name,
-            "uid": uid,
             "app_id": Config.AGORA_APP_ID,
-            "testing_mode": testing_mode
+            "testing_mode": tokens[0]["token"] is None
         })
         
     except Exception as e:
-        print(f"Error in generate_agora_token: {e}")
+        print(f"Error in generate_agora_tokens: {e}")
         return jsonify({
-            "error": f"Failed to generate token: {str(e)}",
+            "error": f"Failed to generate tokens: {str(e)}",
             "hint": "Check your AGORA_APP_ID and AGORA_APP_CERTIFICATE in .env file"
         }), 500
 
 
+def job_response(job) -> dict:
+    """JSON body describing a background job."""
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "channel_name": job.key,
+        "status": job.status.value,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "updated_at": job.updated_at.isoformat()
+    }
+
+
+def active_agent_body(channel_name: str, conv_agent) -> dict:
+    """Response body for a start request on a channel whose agent is already running."""
+    return {
+        "status": "active",
+        "channel_name": channel_name,
+        "agent_uid": conv_agent.agent_uid
+    }
+
+
 @app.route('/api/agora/conversational-ai/start', methods=['POST'])
 def start_conversational_ai():
     """
     Start Agora Conversational AI agent with optional HeyGen video avatar.
     
+    The agent is started by a background job; poll /api/jobs/<job_id> or
+    listen for "job" events on /api/events for the outcome. Starting a
+    channel that is already starting returns the same job, and starting a
+    channel with a running agent launches nothing.
+    
     Request body:
         {
             "channel_name": "channel name",
@@ -275,7 +1067,9 @@ def start_conversational_ai():
         }
     
     Returns:
-        Agent details including channel info and UIDs
+        202 with the job (its result holds the agent details and UIDs, or
+        {"status": "active", ...} if another start got there first), or
+        200 {"status": "active", ...} if an agent is already running
     """
     try:
         data = request.get_json() or {}
@@ -300,18 +1094,32 @@ def start_conversational_ai():
                     "hint": "HeyGen avatars require ElevenLabs TTS. Set ELEVENLABS_API_KEY in .env"
                 }), 400
         
-        # Create new conversational AI session
-        conv_agent = ConversationalAIAgent(agora_service)
-        result = conv_agent.start(
-            channel_name=channel_name,
-            greeting=greeting,
-            enable_avatar=enable_avatar
-        )
+        existing = get_agora_agent(channel_name)
+        if existing and existing.is_active:
+            return jsonify(active_agent_body(channel_name, existing))
         
-        if "error" not in result:
-            active_sessions[channel_name] = conv_agent
+        def run_start():
+            # A start that finished after the check above (e.g. a double-click)
+            # must not launch a second agent and overwrite the first one's session
+            existing = get_agora_agent(channel_name)
+            if existing and existing.is_active:
+                return active_agent_body(channel_name, existing)
+            
+            # Create new conversational AI session
+            conv_agent = ConversationalAIAgent(agora_service)
+            result = conv_agent.start(
+                channel_name=channel_name,
+                greeting=greeting,
+                enable_avatar=enable_avatar
+            )
+            
+            if "error" not in result:
+                session_registry.put(AGORA_SESSION, channel_name, conv_agent.to_state())
+            
+            return result
         
-        return jsonify(result)
+        job, _ = job_runner.submit("start", channel_name, run_start)
+        return jsonify(job_response(job)), 202
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -322,10 +1130,16 @@ def stop_conversational_ai():
     """
     Stop Agora Conversational AI agent.
     
+    Runs as a background job like start; a stop sent while the channel is
+    still starting runs once the start has finished.
+    
     Request body:
         {
             "channel_name": "channel name"
         }
+    
+    Returns:
+        202 with the job
     """
     try:
         data = request.get_json()
@@ -334,16 +1148,79 @@ def stop_conversational_ai():
         if not channel_name:
             return jsonify({"error": "Missing 'channel_name' field"}), 400
         
-        conv_agent = active_sessions.get(channel_name)
-        if not conv_agent:
+        if not get_agora_agent(channel_name) and not job_runner.active_job("start", channel_name):
             return jsonify({"error": "No active session found"}), 404
         
-        result = conv_agent.stop()
+        def run_stop():
+            conv_agent = get_agora_agent(channel_name)
+            if not conv_agent:
+                return {"error": "No active session found"}
+            
+            result = conv_agent.stop()
+            
+            if "error" not in result:
+                session_registry.remove(AGORA_SESSION, channel_name)
+            
+            return result
         
-        if "error" not in result:
-            del active_sessions[channel_name]
+        job, _ = job_runner.submit("stop", channel_name, run_stop)
+        return jsonify(job_response(job)), 202
         
-        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Get the status of a background job.
+    
+    Returns:
+        {"job_id", "kind", "channel_name", "status" (pending, running,
+        succeeded or failed), "result", "error", "created_at", "updated_at"}
+    """
+    job = job_runner.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job_response(job))
+
+
+@app.route('/api/sessions', methods=['GET'])
+def get_sessions():
+    """Number of live Agora agent and HeyGen avatar sessions."""
+    try:
+        return jsonify({
+            "agora": session_registry.count(AGORA_SESSION),
+            "heygen": session_registry.count(HEYGEN_SESSION),
+            "idle_timeout_seconds": Config.SESSION_IDLE_SECONDS
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/sessions/heartbeat', methods=['POST'])
+def session_heartbeat():
+    """
+    Keep a session from being stopped as idle.
+    
+    Request body:
+        {
+            "type": "agora" or "heygen",
+            "id": "channel name (agora) or session ID (heygen)"
+        }
+    """
+    try:
+        data = request.get_json() or {}
+        session_type = data.get('type')
+        session_key = data.get('id')
+        
+        if session_type not in (AGORA_SESSION, HEYGEN_SESSION) or not session_key:
+            return jsonify({"error": "'type' must be 'agora' or 'heygen' and 'id' is required"}), 400
+        
+        if not session_registry.touch(session_type, session_key):
+            return jsonify({"error": "Session not found"}), 404
+        
+        return jsonify({"status": "ok"})
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -351,6 +1228,18 @@ def stop_conversational_ai():
 
 # ===== HeyGen Video Avatar Endpoints =====
 
+HEYGEN_NOT_CONFIGURED = {
+    "error": "HeyGen is not configured",
+    "hint": "Video Avatar is an optional feature. Set HEYGEN_API_KEY in .env to enable it, or use Voice Chat instead.",
+    "status": "not_configured"
+}
+
+
+def heygen_configured() -> bool:
+    """Whether the HeyGen API key is set."""
+    return bool(Config.HEYGEN_API_KEY) and Config.HEYGEN_API_KEY != "your-heygen-api-key"
+
+
 @app.route('/api/heygen/avatars', methods=['GET'])
 def get_avatars():
     """Get available HeyGen avatars."""
@@ -424,12 +1313,8 @@ def start_streaming_avatar():
     """
     try:
         # Check if HeyGen is configured
-        if not Config.HEYGEN_API_KEY or Config.HEYGEN_API_KEY == "your-heygen-api-key":
-            return jsonify({
-                "error": "HeyGen is not configured",
-                "hint": "Video Avatar is an optional feature. Set HEYGEN_API_KEY in .env to enable it, or use Voice Chat instead.",
-                "status": "not_configured"
-            }), 400
+        if not heygen_configured():
+            return jsonify(HEYGEN_NOT_CONFIGURED), 400
         
         data = request.get_json() or {}
         avatar_id = data.get('avatar_id')
@@ -446,7 +1331,7 @@ def start_streaming_avatar():
         
         session_id = result.get("data", {}).get("session_id")
         if session_id:
-            heygen_sessions[session_id] = session
+            session_registry.put(HEYGEN_SESSION, session_id, session.to_state())
         
         return jsonify(result)
         
@@ -477,7 +1362,7 @@ def streaming_avatar_speak():
         if not session_id or not text:
             return jsonify({"error": "Missing 'session_id' or 'text' field"}), 400
         
-        session = heygen_sessions.get(session_id)
+        session = get_heygen_session(session_id)
         if not session:
             return jsonify({"error": "Session not found"}), 404
         
@@ -505,14 +1390,14 @@ def stop_streaming_avatar():
         if not session_id:
             return jsonify({"error": "Missing 'session_id' field"}), 400
         
-        session = heygen_sessions.get(session_id)
+        session = get_heygen_session(session_id)
         if not session:
             return jsonify({"error": "Session not found"}), 404
         
         result = session.stop()
         
         if "error" not in result:
-            del heygen_sessions[session_id]
+            session_registry.remove(HEYGEN_SESSION, session_id)
         
         return jsonify(result)
         
@@ -537,7 +1422,7 @@ def get_streaming_ice_servers():
         if not session_id:
             return jsonify({"error": "Missing 'session_id' field"}), 400
         
-        session = heygen_sessions.get(session_id)
+        session = get_heygen_session(session_id)
         if not session:
             return jsonify({"error": "Session not found"}), 404
         
@@ -0,0 +1,348 @@
+"""
+ASGI entry point: async chat, TTS, token, avatar and event endpoints.
+
+    hypercorn asgi:app --bind 0.0.0.0:5000
+
+The endpoints below are Quart views that await Groq, ElevenLabs and HeyGen
+instead of blocking a thread, so one process can hold hundreds of concurrent
+voice sessions. Every other route is served by the Flask app from app.py on
+ASYNC_WSGI_THREADS threads.
+"""
+import asyncio
+import queue
+import time
+from datetime import datetime
+
+from a2wsgi import WSGIMiddleware
+from quart import Quart, request, jsonify, Response
+from werkzeug.exceptions import MethodNotAllowed, NotFound
+
+from app import (
+    app as flask_app,
+    HEYGEN_NOT_CONFIGURED,
+    HEYGEN_SESSION,
+    get_heygen_session,
+    heygen_configured,
+    issue_agora_token,
+    parse_tts_request,
+    sse_event,
+    tts_cache_headers,
+    TTS_STREAM_HEADERS,
+)
+from ai_agent import agent
+from async_database import async_db_client
+from change_feed import change_feed
+from config import Config
+from heygen_service import heygen_service, StreamingAvatarSession
+from session_registry import session_registry
+from speech_pipeline import speech_pipeline
+from tts_service import tts_service
+
+
+# Initialize Quart app
+# (static files and pages stay with the Flask app)
+async_app = Quart(__name__, static_folder=None)
+async_app.config.from_object(Config)
+
+# Response headers of Server-Sent Events streams
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'
+}
+
+
+@async_app.after_serving
+async def close_clients():
+    """Close the event loop's pooled upstream connections."""
+    await agent.async_clients.aclose()
+    await heygen_service.async_clients.aclose()
+    if tts_service.async_clients:
+        await tts_service.async_clients.aclose()
+    if async_db_client is not None:
+        await async_db_client.aclose()
+
+
+# ===== AI Agent Endpoints =====
+
+@async_app.route('/api/chat', methods=['POST'])
+async def chat():
+    """Async version of app.chat."""
+    try:
+        data = await request.get_json() or {}
+        message = data.get('message')
+        session_id = data.get('session_id', 'default')
+        
+        if not message:
+            return jsonify({"error": "Missing 'message' field"}), 400
+        
+        response = await agent.aprocess_message(message, session_id=session_id)
+        
+        return jsonify({
+            "response": response,
+            "session_id": session_id,
+            "context": await asyncio.to_thread(agent.get_context_stats, session_id),
+            "timestamp": datetime.utcnow().isoformat()
+        })
+    
+    except Exception as e:
+        import traceback
+        print(f"Error in chat endpoint: {e}")
+        print(f"Traceback: {traceback.format_exc()}")
+        return jsonify({"error": str(e)}), 500
+
+
+def sse_response(events, session_id: str, endpoint: str) -> Response:
+    """Stream agent events as Server-Sent Events, like the Flask chat stream endpoints."""
+    async def generate():
+        try:
+            async for event in events:
+                event_type = event.pop("type")
+                if event_type == "done":
+                    event["session_id"] = session_id
+                    event["timestamp"] = datetime.utcnow().isoformat()
+                yield sse_event(event_type, event)
+        except Exception as e:
+            import traceback
+            print(f"Error in {endpoint} endpoint: {e}")
+            print(f"Traceback: {traceback.format_exc()}")
+            yield sse_event("error", {"error": str(e)})
+    
+    return Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+
+@async_app.route('/api/chat/stream', methods=['POST'])
+async def chat_stream():
+    """Async version of app.chat_stream."""
+    data = await request.get_json() or {}
+    message = data.get('message')
+    session_id = data.get('session_id', 'default')
+    
+    if not message:
+        return jsonify({"error": "Missing 'message' field"}), 400
+    
+    events = agent.astream_message(message, session_id=session_id)
+    return sse_response(events, session_id, "chat stream")
+
+
+@async_app.route('/api/chat/voice', methods=['POST'])
+async def chat_voice():
+    """Async version of app.chat_voice."""
+    data = await request.get_json() or {}
+    message = data.get('message')
+    session_id = data.get('session_id', 'default')
+    voice_id = data.get('voice_id')
+    
+    if not message:
+        return jsonify({"error": "Missing 'message' field"}), 400
+    
+    events = speech_pipeline.astream(agent.astream_message(message, session_id=session_id), voice_id=voice_id)
+    return sse_response(events, session_id, "chat voice")
+
+
+# ===== Change Feed =====
+
+@async_app.route('/api/events', methods=['GET'])
+async def events():
+    """
+    Async version of app.events.
+    
+    The subscription queue is checked every CHANGE_FEED_COALESCE_MS instead
+    of blocking a thread on it.
+    """
+    subscription = change_feed.subscribe()
+    poll_seconds = max(Config.CHANGE_FEED_COALESCE_MS / 1000, 0.05)
+    
+    async def generate():
+        try:
+            # Reconnect quickly if the connection drops
+            yield "retry: 3000\n\n"
+            last_sent = time.monotonic()
+            while True:
+                try:
+                    payload = subscription.get_nowait()
+                except queue.Empty:
+                    if time.monotonic() - last_sent >= Config.CHANGE_FEED_KEEPALIVE_SECONDS:
+                        # Keeps proxies from closing an idle connection
+                        yield ": keepalive\n\n"
+                        last_sent = time.monotonic()
+                    await asyncio.sleep(poll_seconds)
+                    continue
+                yield f"event: change\ndata: {payload}\n\n"
+                last_sent = time.monotonic()
+        finally:
+            change_feed.unsubscribe(subscription)
+    
+    return Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+
+# ===== TTS Endpoints =====
+
+@async_app.route('/api/tts', methods=['GET', 'POST'])
+async def text_to_speech():
+    """Async version of app.text_to_speech."""
+    try:
+        if request.method == 'POST':
+            data = await request.get_json(silent=True) or {}
+        else:
+            data = request.args
+        text, voice_id, stream = parse_tts_request(data)
+        
+        if not text:
+            return jsonify({"error": "Missing 'text' field"}), 400
+        
+        key = tts_service.cache_key(text, voice_id=voice_id, streamed=stream)
+        if request.if_none_match.contains(key):
+            return Response("", status=304, headers=tts_cache_headers(key, hit=True))
+        headers = tts_cache_headers(key, hit=await asyncio.to_thread(tts_service.is_cached, key))
+        
+        if stream:
+            headers.update(TTS_STREAM_HEADERS)
+            return Response(
+                tts_service.atext_to_speech_stream(text, voice_id=voice_id),
+                mimetype='audio/mpeg',
+                headers=headers
+            )
+        else:
+            audio_data = await tts_service.atext_to_speech(text, voice_id=voice_id)
+            return Response(audio_data, mimetype='audio/mpeg', headers=headers)
+        
+    except Exception as e:
+        print(f"Error in TTS endpoint: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+# ===== Agora RTC Endpoints =====
+
+@async_app.route('/api/agora/token', methods=['POST'])
+async def generate_agora_token():
+    """Async version of app.generate_agora_token (tokens are signed locally, without I/O)."""
+    body, status = issue_agora_token(await request.get_json() or {})
+    return jsonify(body), status
+
+
+@async_app.route('/api/agora/token/renew', methods=['POST'])
+async def renew_agora_token():
+    """Async version of app.renew_agora_token."""
+    body, status = issue_agora_token(await request.get_json() or {}, force_new=True)
+    return jsonify(body), status
+
+
+# ===== HeyGen Streaming Avatar Endpoints =====
+
+@async_app.route('/api/heygen/streaming/start', methods=['POST'])
+async def start_streaming_avatar():
+    """Async version of app.start_streaming_avatar."""
+    try:
+        if not heygen_configured():
+            return jsonify(HEYGEN_NOT_CONFIGURED), 400
+        
+        data = await request.get_json() or {}
+        
+        session = StreamingAvatarSession(heygen_service)
+        result = await session.astart(
+            avatar_id=data.get('avatar_id'),
+            voice_id=data.get('voice_id'),
+            quality=data.get('quality', 'high')
+        )
+        
+        if "error" in result:
+            return jsonify(result), result.get("status_code", 500)
+        
+        session_id = result.get("data", {}).get("session_id")
+        if session_id:
+            await asyncio.to_thread(session_registry.put, HEYGEN_SESSION, session_id, session.to_state())
+        
+        return jsonify(result)
+    
+    except Exception as e:
+        print(f"Error in start_streaming_avatar: {e}")
+        return jsonify({
+            "error": str(e),
+            "hint": "Video Avatar requires HeyGen Streaming API access. This is an optional feature."
+        }), 500
+
+
+@async_app.route('/api/heygen/streaming/speak', methods=['POST'])
+async def streaming_avatar_speak():
+    """Async version of app.streaming_avatar_speak."""
+    try:
+        data = await request.get_json() or {}
+        session_id = data.get('session_id')
+        text = data.get('text')
+        
+        if not session_id or not text:
+            return jsonify({"error": "Missing 'session_id' or 'text' field"}), 400
+        
+        session = await asyncio.to_thread(get_heygen_session, session_id)
+        if not session:
+            return jsonify({"error": "Session not found"}), 404
+        
+        return jsonify(await session.aspeak(text))
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@async_app.route('/api/heygen/streaming/stop', methods=['POST'])
+async def stop_streaming_avatar():
+    """Async version of app.stop_streaming_avatar."""
+    try:
+        data = await request.get_json() or {}
+        session_id = data.get('session_id')
+        
+        if not session_id:
+            return jsonify({"error": "Missing 'session_id' field"}), 400
+        
+        session = await asyncio.to_thread(get_heygen_session, session_id)
+        if not session:
+            return jsonify({"error": "Session not found"}), 404
+        
+        result = await session.astop()
+        
+        if "error" not in result:
+            await asyncio.to_thread(session_registry.remove, HEYGEN_SESSION, session_id)
+        
+        return jsonify(result)
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@async_app.route('/api/heygen/streaming/ice', methods=['POST'])
+async def get_streaming_ice_servers():
+    """Async version of app.get_streaming_ice_servers."""
+    try:
+        data = await request.get_json() or {}
+        session_id = data.get('session_id')
+        
+        if not session_id:
+            return jsonify({"error": "Missing 'session_id' field"}), 400
+        
+        session = await asyncio.to_thread(get_heygen_session, session_id)
+        if not session:
+            return jsonify({"error": "Session not found"}), 404
+        
+        return jsonify(await session.aget_ice_servers())
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# ===== Dispatch =====
+
+# Flask app for every other route, run on a thread pool
+wsgi_app = WSGIMiddleware(flask_app, workers=Config.ASYNC_WSGI_THREADS)
+async_routes = async_app.url_map.bind("localhost")
+
+
+async def app(scope, receive, send):
+    """Send requests for the async endpoints to Quart and everything else to Flask."""
+    if scope["type"] == "http":
+        try:
+            async_routes.match(scope["path"], method=scope["method"])
+        except (NotFound, MethodNotAllowed):
+            await wsgi_app(scope, receive, send)
+            return
+    
+    # Async endpoints, plus lifespan events so Quart can close its clients
+    await async_app(scope, receive, send)
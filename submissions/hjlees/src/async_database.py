@@ -0,0 +1,453 @@
+"""Asyncio Appwrite client that talks to the REST API over a pooled HTTP connection."""
+import asyncio
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple, Callable, Awaitable, AsyncIterator
+
+from appwrite.exception import AppwriteException
+from appwrite.id import ID
+from appwrite.query import Query
+
+from config import Config
+from database import AppwriteClient, CollectionCache, db_client
+from http_transport import PerLoop, create_async_client
+from models import Todo, Reminder, TodoPriority, ReminderImportance, TodoFilter, BatchItemResult
+
+
+class AsyncAppwriteClient:
+    """Non-blocking counterpart of AppwriteClient with the same operations."""
+    
+    def __init__(
+        self,
+        todo_cache: Optional[CollectionCache] = None,
+        reminder_cache: Optional[CollectionCache] = None,
+        max_connections: int = 100,
+        timeout: float = 10.0
+    ):
+        """
+        Initialize the async client.
+        
+        Args:
+            todo_cache: Todo cache to use (shared with the sync client by default,
+                so both see each other's writes)
+            reminder_cache: Reminder cache to use
+            max_connections: Maximum pooled connections to Appwrite
+            timeout: Request timeout in seconds
+        """
+        self.base_url = Config.APPWRITE_ENDPOINT.rstrip("/")
+        self.database_id = Config.APPWRITE_DATABASE_ID
+        self.headers = {
+            "Content-Type": "application/json",
+            "X-Appwrite-Project": Config.APPWRITE_PROJECT_ID or "",
+            "X-Appwrite-Key": Config.APPWRITE_API_KEY or "",
+        }
+        # httpx connections belong to the event loop that opened them
+        self.async_clients = PerLoop(lambda: create_async_client(
+            headers=self.headers, max_connections=max_connections, read_timeout=timeout
+        ))
+        
+        self.todo_cache = (
+            todo_cache if todo_cache is not None
+            else CollectionCache("title", ttl_seconds=Config.DB_CACHE_TTL_SECONDS)
+        )
+        self.reminder_cache = (
+            reminder_cache if reminder_cache is not None
+            else CollectionCache("reminder_text", ttl_seconds=Config.DB_CACHE_TTL_SECONDS)
+        )
+    
+    async def aclose(self):
+        """Close the connection pool of the running event loop."""
+        await self.async_clients.aclose()
+    
+    # Todo operations
+    
+    async def create_todo(
+        self,
+        title: str,
+        description: Optional[str] = None,
+        priority: TodoPriority = TodoPriority.MEDIUM,
+        due_date: Optional[datetime] = None,
+    ) -> Todo:
+        """Create a new todo item."""
+        now = datetime.utcnow()
+        data = {
+            "title": title,
+            "description": description,
+            "completed": False,
+            "priority": priority.value,
+            "due_date": due_date.isoformat() if due_date else None,
+            "created_at": now.isoformat(),
+            "updated_at": now.isoformat(),
+        }
+        
+        result = await self._request(
+            "POST", self._documents_path(Config.APPWRITE_TODOS_COLLECTION_ID),
+            json={"documentId": ID.unique(), "data": data}
+        )
+        
+        todo = AppwriteClient._document_to_todo(result)
+        self.todo_cache.put(todo)
+        return todo
+    
+    async def get_todos(self, completed: Optional[bool] = None) -> List[Todo]:
+        """Get all todos, optionally filtered by completion status."""
+        if self.todo_cache.is_fresh():
+            todos = self.todo_cache.values()
+        else:
+            generation = self.todo_cache.begin_load()
+            todos = [todo async for todo in self.iter_todos()]
+            self.todo_cache.finish_load(todos, generation)
+        
+        if completed is not None:
+            todos = [todo for todo in todos if todo.completed == completed]
+        
+        return sorted(todos, key=lambda todo: todo.created_at, reverse=True)
+    
+    async def query_todos(self, todo_filter: TodoFilter) -> List[Todo]:
+        """Get all todos matching a filter, sorted by its sort options."""
+        if self.todo_cache.is_fresh():
+            todos = [todo for todo in self.todo_cache.values() if todo_filter.matches(todo)]
+        else:
+            queries = AppwriteClient._todo_queries(todo_filter, server_sort=False)
+            todos = [
+                AppwriteClient._document_to_todo(doc)
+                async for doc in self._iter_documents(Config.APPWRITE_TODOS_COLLECTION_ID, queries)
+            ]
+        
+        return todo_filter.sort(todos)
+    
+    async def iter_todos(self, completed: Optional[bool] = None, page_size: Optional[int] = None) -> AsyncIterator[Todo]:
+        """Stream all todos from Appwrite page by page, newest first."""
+        queries = [Query.order_desc("created_at")]
+        if completed is not None:
+            queries.append(Query.equal("completed", completed))
+        
+        async for doc in self._iter_documents(Config.APPWRITE_TODOS_COLLECTION_ID, queries, page_size):
+            yield AppwriteClient._document_to_todo(doc)
+    
+    async def list_todos_page(
+        self,
+        completed: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        limit: int = 25,
+        todo_filter: Optional[TodoFilter] = None,
+    ) -> Tuple[List[Todo], Optional[str], int]:
+        """Get one page of todos. Returns (todos, next_cursor, total)."""
+        if todo_filter is None:
+            todo_filter = TodoFilter(completed=completed)
+        elif completed is not None:
+            todo_filter = todo_filter.model_copy(update={"completed": completed})
+        
+        queries = AppwriteClient._todo_queries(todo_filter, server_sort=True)
+        documents, next_cursor, total = await self._list_page(
+            Config.APPWRITE_TODOS_COLLECTION_ID, queries, cursor, limit
+        )
+        return [AppwriteClient._document_to_todo(doc) for doc in documents], next_cursor, total
+    
+    async def find_todos(self, title: str, completed: Optional[bool] = None) -> List[Todo]:
+        """Find todos by title using the in-memory search index, best match first."""
+        if not self.todo_cache.is_fresh():
+            await self.get_todos()
+        
+        todos = self.todo_cache.search(title)
+        if completed is not None:
+            todos = [todo for todo in todos if todo.completed == completed]
+        return todos
+    
+    async def get_todo(self, todo_id: str) -> Optional[Todo]:
+        """Get a specific todo by ID."""
+        cached = self.todo_cache.get(todo_id) if self.todo_cache.is_fresh() else None
+        if cached:
+            return cached
+        
+        try:
+            result = await self._request("GET", self._document_path(Config.APPWRITE_TODOS_COLLECTION_ID, todo_id))
+            return AppwriteClient._document_to_todo(result)
+        except Exception as e:
+            print(f"Error getting todo {todo_id}: {e}")
+            return None
+    
+    async def update_todo(
+        self,
+        todo_id: str,
+        title: Optional[str] = None,
+        description: Optional[str] = None,
+        completed: Optional[bool] = None,
+        priority: Optional[TodoPriority] = None,
+        due_date: Optional[datetime] = None,
+    ) -> Optional[Todo]:
+        """Update a todo item."""
+        data = {"updated_at": datetime.utcnow().isoformat()}
+        
+        if title is not None:
+            data["title"] = title
+        if description is not None:
+            data["description"] = description
+        if completed is not None:
+            data["completed"] = completed
+        if priority is not None:
+            data["priority"] = priority.value
+        if due_date is not None:
+            data["due_date"] = due_date.isoformat()
+        
+        try:
+            result = await self._request(
+                "PATCH", self._document_path(Config.APPWRITE_TODOS_COLLECTION_ID, todo_id),
+                json={"data": data}
+            )
+            todo = AppwriteClient._document_to_todo(result)
+            self.todo_cache.put(todo)
+            return todo
+        except Exception as e:
+            print(f"Error updating todo {todo_id}: {e}")
+            return None
+    
+    async def complete_todo(self, todo_id: str) -> Optional[Todo]:
+        """Mark a todo as completed."""
+        return await self.update_todo(todo_id, completed=True)
+    
+    async def delete_todo(self, todo_id: str) -> bool:
+        """Delete a todo item."""
+        try:
+            await self._request("DELETE", self._document_path(Config.APPWRITE_TODOS_COLLECTION_ID, todo_id))
+            self.todo_cache.remove(todo_id)
+            return True
+        except Exception as e:
+            print(f"Error deleting todo {todo_id}: {e}")
+            return False
+    
+    # Bulk todo operations
+    
+    async def create_todos(self, items: List[Dict[str, Any]]) -> List[BatchItemResult]:
+        """Create several todos concurrently from create_todo keyword arguments."""
+        return await self._run_batch(lambda item: self.create_todo(**item), items, [None] * len(items))
+    
+    async def update_todos(self, updates: List[Dict[str, Any]]) -> List[BatchItemResult]:
+        """Update several todos concurrently from update_todo keyword arguments."""
+        return await self._run_batch(
+            lambda update: self.update_todo(**update),
+            updates,
+            [update.get("todo_id") for update in updates],
+            "Todo not found or could not be updated"
+        )
+    
+    async def complete_todos(self, todo_ids: List[str]) -> List[BatchItemResult]:
+        """Mark several todos as completed concurrently."""
+        return await self._run_batch(self.complete_todo, todo_ids, todo_ids, "Todo not found or could not be updated")
+    
+    async def delete_todos(self, todo_ids: List[str]) -> List[BatchItemResult]:
+        """Delete several todos concurrently."""
+        return await self._run_batch(self.delete_todo, todo_ids, todo_ids, "Todo not found or could not be deleted")
+    
+    async def delete_completed_todos(self) -> List[BatchItemResult]:
+        """Delete every completed todo."""
+        return await self.delete_todos([todo.id for todo in await self.get_todos(completed=True)])
+    
+    # Reminder operations
+    
+    async def create_reminder(
+        self,
+        reminder_text: str,
+        importance: ReminderImportance = ReminderImportance.MEDIUM,
+        reminder_date: Optional[datetime] = None,
+    ) -> Reminder:
+        """Create a new reminder."""
+        now = datetime.utcnow()
+        data = {
+            "reminder_text": reminder_text,
+            "importance": importance.value,
+            "reminder_date": reminder_date.isoformat() if reminder_date else None,
+            "created_at": now.isoformat(),
+            "updated_at": now.isoformat(),
+        }
+        
+        result = await self._request(
+            "POST", self._documents_path(Config.APPWRITE_REMINDERS_COLLECTION_ID),
+            json={"documentId": ID.unique(), "data": data}
+        )
+        
+        reminder = AppwriteClient._document_to_reminder(result)
+        self.reminder_cache.put(reminder)
+        return reminder
+    
+    async def get_reminders(self) -> List[Reminder]:
+        """Get all reminders."""
+        if self.reminder_cache.is_fresh():
+            reminders = self.reminder_cache.values()
+        else:
+            generation = self.reminder_cache.begin_load()
+            reminders = [reminder async for reminder in self.iter_reminders()]
+            self.reminder_cache.finish_load(reminders, generation)
+        
+        return sorted(reminders, key=lambda reminder: reminder.created_at, reverse=True)
+    
+    async def iter_reminders(self, page_size: Optional[int] = None) -> AsyncIterator[Reminder]:
+        """Stream all reminders from Appwrite page by page, newest first."""
+        queries = [Query.order_desc("created_at")]
+        
+        async for doc in self._iter_documents(Config.APPWRITE_REMINDERS_COLLECTION_ID, queries, page_size):
+            yield AppwriteClient._document_to_reminder(doc)
+    
+    async def list_reminders_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 25,
+    ) -> Tuple[List[Reminder], Optional[str], int]:
+        """Get one page of reminders, newest first. Returns (reminders, next_cursor, total)."""
+        documents, next_cursor, total = await self._list_page(
+            Config.APPWRITE_REMINDERS_COLLECTION_ID, [Query.order_desc("created_at")], cursor, limit
+        )
+        return [AppwriteClient._document_to_reminder(doc) for doc in documents], next_cursor, total
+    
+    async def find_reminders(self, reminder_text: str) -> List[Reminder]:
+        """Find reminders by text using the in-memory search index, best match first."""
+        if not self.reminder_cache.is_fresh():
+            await self.get_reminders()
+        
+        return self.reminder_cache.search(reminder_text)
+    
+    async def get_reminder(self, reminder_id: str) -> Optional[Reminder]:
+        """Get a specific reminder by ID."""
+        cached = self.reminder_cache.get(reminder_id) if self.reminder_cache.is_fresh() else None
+        if cached:
+            return cached
+        
+        try:
+            result = await self._request(
+                "GET", self._document_path(Config.APPWRITE_REMINDERS_COLLECTION_ID, reminder_id)
+            )
+            return AppwriteClient._document_to_reminder(result)
+        except Exception as e:
+            print(f"Error getting reminder {reminder_id}: {e}")
+            return None
+    
+    async def delete_reminder(self, reminder_id: str) -> bool:
+        """Delete a reminder."""
+        try:
+            await self._request(
+                "DELETE", self._document_path(Config.APPWRITE_REMINDERS_COLLECTION_ID, reminder_id)
+            )
+            self.reminder_cache.remove(reminder_id)
+            return True
+        except Exception as e:
+            print(f"Error deleting reminder {reminder_id}: {e}")
+            return False
+    
+    # Bulk reminder operations
+    
+    async def create_reminders(self, items: List[Dict[str, Any]]) -> List[BatchItemResult]:
+        """Create several reminders concurrently from create_reminder keyword arguments."""
+        return await self._run_batch(lambda item: self.create_reminder(**item), items, [None] * len(items))
+    
+    async def delete_reminders(self, reminder_ids: List[str]) -> List[BatchItemResult]:
+        """Delete several reminders concurrently."""
+        return await self._run_batch(
+            self.delete_reminder, reminder_ids, reminder_ids, "Reminder not found or could not be deleted"
+        )
+    
+    # Helper methods
+    
+    def _documents_path(self, collection_id: str) -> str:
+        """REST path of a collection's documents."""
+        return f"/databases/{self.database_id}/collections/{collection_id}/documents"
+    
+    def _document_path(self, collection_id: str, document_id: str) -> str:
+        """REST path of a single document."""
+        return f"{self._documents_path(collection_id)}/{document_id}"
+    
+    async def _request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        """
+        Send a request to Appwrite.
+        
+        Raises:
+            AppwriteException: If Appwrite returns an error status (same as the sync SDK)
+        """
+        response = await self.async_clients.get().request(method, f"{self.base_url}{path}", **kwargs)
+        
+        if response.status_code >= 400:
+            try:
+                body = response.json()
+            except ValueError:
+                body = {"message": response.text}
+            raise AppwriteException(body.get("message"), response.status_code, body.get("type"), response.text)
+        
+        if response.status_code == 204 or not response.content:
+            return {}
+        return response.json()
+    
+    async def _list_page(
+        self,
+        collection_id: str,
+        queries: List[str],
+        cursor: Optional[str],
+        limit: int,
+    ) -> Tuple[List[dict], Optional[str], int]:
+        """Fetch one page of documents using cursor pagination."""
+        page_queries = [*queries, Query.limit(limit)]
+        if cursor:
+            page_queries.append(Query.cursor_after(cursor))
+        
+        result = await self._request(
+            "GET", self._documents_path(collection_id),
+            params=[("queries[]", query) for query in page_queries]
+        )
+        
+        documents = result["documents"]
+        next_cursor = documents[-1]["$id"] if len(documents) == limit else None
+        return documents, next_cursor, result.get("total", len(documents))
+    
+    async def _iter_documents(
+        self,
+        collection_id: str,
+        queries: List[str],
+        page_size: Optional[int] = None,
+    ) -> AsyncIterator[dict]:
+        """Yield every document matching queries, one page at a time."""
+        page_size = page_size or Config.DB_PAGE_SIZE
+        cursor = None
+        
+        while True:
+            documents, cursor, _ = await self._list_page(collection_id, queries, cursor, page_size)
+            for doc in documents:
+                yield doc
+            if not cursor:
+                return
+    
+    async def _run_batch(
+        self,
+        operation: Callable[[Any], Awaitable[Any]],
+        items: List[Any],
+        item_ids: List[Optional[str]],
+        failure_message: str = "Operation failed",
+    ) -> List[BatchItemResult]:
+        """Run a single-item coroutine for every item, at most DB_BATCH_WORKERS at a time."""
+        semaphore = asyncio.Semaphore(Config.DB_BATCH_WORKERS)
+        
+        async def run(item):
+            async with semaphore:
+                return await operation(item)
+        
+        values = await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
+        results = []
+        
+        for index, (value, item_id) in enumerate(zip(values, item_ids)):
+            if isinstance(value, Exception):
+                print(f"Error in bulk operation (item {index}): {value}")
+                results.append(BatchItemResult(index=index, success=False, id=item_id, error=str(value)))
+            elif not value:
+                results.append(BatchItemResult(index=index, success=False, id=item_id, error=failure_message))
+            elif value is True:
+                results.append(BatchItemResult(index=index, success=True, id=item_id))
+            else:
+                results.append(BatchItemResult(index=index, success=True, id=value.id, item=value))
+        
+        return results
+
+
+# Global async database client instance, sharing db_client's caches (and so its
+# change logs); None when another storage backend is configured
+async_db_client = AsyncAppwriteClient(
+    todo_cache=db_client.todo_cache,
+    reminder_cache=db_client.reminder_cache,
+    max_connections=Config.APPWRITE_HTTP_MAX_CONNECTIONS,
+    timeout=Config.APPWRITE_HTTP_TIMEOUT
+) if isinstance(db_client, AppwriteClient) else None
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Microbenchmark: Appwrite document -> Todo -> response JSON, per row.
+
+Usage:
+    python bench_serialization.py [rows]
+
+Runs offline on synthetic documents and compares the original conversion
+(fromisoformat, then a validated Todo) and jsonify with the conversion the
+storage backends use (a validated Todo built from the raw ISO strings) and the
+plain-dict encoder of the list endpoints.
+"""
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+from flask import Flask, jsonify
+
+from database import AppwriteClient
+from models import Todo, TodoPriority
+from serialization import todos_to_json, dumps, orjson
+
+
+def make_documents(count):
+    """Build Appwrite-style todo documents."""
+    now = datetime.utcnow()
+    priorities = [priority.value for priority in TodoPriority]
+    return [
+        {
+            "$id": f"todo{i}",
+            "$collectionId": "todos",
+            "$databaseId": "db",
+            "title": f"Todo number {i}",
+            "description": "Something to do" if i % 2 else None,
+            "completed": i % 3 == 0,
+            "priority": priorities[i % len(priorities)],
+            "due_date": (now + timedelta(days=i % 30)).isoformat() if i % 4 else None,
+            "created_at": (now - timedelta(minutes=i)).isoformat(),
+            "updated_at": (now - timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def validated_todo(doc):
+    """The original conversion: full pydantic validation."""
+    return Todo(
+        id=doc["$id"],
+        title=doc["title"],
+        description=doc.get("description"),
+        completed=doc.get("completed", False),
+        priority=TodoPriority(doc.get("priority", "medium")),
+        due_date=datetime.fromisoformat(doc["due_date"]) if doc.get("due_date") else None,
+        created_at=datetime.fromisoformat(doc["created_at"]),
+        updated_at=datetime.fromisoformat(doc["updated_at"]),
+    )
+
+
+def per_row(func, rows, repeat=5):
+    """Best time per row in microseconds."""
+    best = min(timeit.repeat(func, number=1, repeat=repeat))
+    return best / rows * 1e6
+
+
+def report(name, before, after):
+    """Print one comparison line."""
+    print(f"{name:<28} {before:8.2f} µs/row -> {after:8.2f} µs/row  ({before / after:4.1f}x)")
+
+
+def main():
+    """Run the benchmark."""
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    documents = make_documents(rows)
+    app = Flask(__name__)
+    
+    print(f"📊 {rows} rows, JSON encoder: {'orjson' if orjson else 'json'}\n")
+    
+    convert_before = per_row(lambda: [validated_todo(doc) for doc in documents], rows)
+    convert_after = per_row(lambda: [AppwriteClient._document_to_todo(doc) for doc in documents], rows)
+    report("document -> Todo", convert_before, convert_after)
+    
+    todos = [AppwriteClient._document_to_todo(doc) for doc in documents]
+    with app.app_context():
+        # Same output either way, so the fast path is a drop-in replacement
+        assert jsonify({"todos": todos_to_json(todos)}).get_json() == jsonify(
+            {"todos": [todo.model_dump() for todo in todos]}
+        ).get_json()
+        
+        serialize_before = per_row(lambda: jsonify({"todos": [todo.model_dump() for todo in todos]}), rows)
+        serialize_after = per_row(lambda: dumps({"todos": todos_to_json(todos)}), rows)
+    report("Todo -> response JSON", serialize_before, serialize_after)
+    
+    report("total", convert_before + serialize_before, convert_after + serialize_after)
+
+
+if __name__ == "__main__":
+    main()
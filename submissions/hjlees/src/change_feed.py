@@ -0,0 +1,152 @@
+"""Change feed: pushes coalesced todo/reminder changes to connected clients."""
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Set
+
+from change_log import ChangeLog
+from config import Config
+from database import db_client
+from serialization import dumps, todos_to_json, reminders_to_json
+
+
+class ChangeFeed:
+    """
+    Publishes changes recorded in collection change logs to subscribers.
+    
+    Changes are coalesced: a burst of writes (e.g. a batch, or several agent
+    tool calls) becomes one event per collection holding each changed item
+    once, serialized once and shared by every subscriber.
+    """
+    
+    def __init__(self, coalesce_seconds: float = 0.2, max_queued_events: int = 100, poll_seconds: float = 1.0):
+        """
+        Initialize the feed.
+        
+        Args:
+            coalesce_seconds: How long to collect changes before publishing them
+            max_queued_events: Events buffered per subscriber before it is told to resync
+            poll_seconds: How often change logs are checked for changes this
+                process was not told about, i.e. writes by other workers to a
+                shared store (0 disables polling)
+        """
+        self.coalesce_seconds = coalesce_seconds
+        self.max_queued_events = max_queued_events
+        self.poll_seconds = poll_seconds
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        self.subscribers: Set["queue.Queue[str]"] = set()
+        self.lock = threading.Lock()
+        self.dirty = threading.Event()
+        self._thread = None
+    
+    def watch(
+        self,
+        collection: str,
+        changes: ChangeLog,
+        get_item: Callable[[str], Any],
+        to_json: Callable[[List[Any]], List[Dict[str, Any]]],
+    ):
+        """
+        Publish the changes of a collection.
+        
+        Args:
+            collection: Name used in events and as the key of the changed items
+            changes: The collection's change log
+            get_item: Fetches one item by ID
+            to_json: Converts items to JSON-ready dicts
+        """
+        self.sources[collection] = {
+            "changes": changes,
+            "get_item": get_item,
+            "to_json": to_json,
+            "version": changes.token(),
+        }
+        changes.add_listener(self.dirty.set)
+    
+    def subscribe(self) -> "queue.Queue[str]":
+        """Register a subscriber; returns the queue its JSON event payloads arrive on."""
+        subscription: "queue.Queue[str]" = queue.Queue(maxsize=self.max_queued_events)
+        with self.lock:
+            self.subscribers.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+                self._thread.start()
+        return subscription
+    
+    def unsubscribe(self, subscription: "queue.Queue[str]"):
+        """Remove a subscriber."""
+        with self.lock:
+            self.subscribers.discard(subscription)
+    
+    def flush(self):
+        """Publish everything recorded since the last flush, one event per collection."""
+        with self.lock:
+            has_subscribers = bool(self.subscribers)
+        
+        for collection, source in self.sources.items():
+            delta = source["changes"].changes_since(source["version"])
+            if delta is None:
+                # More changes than the log keeps: clients reload the collection
+                source["version"] = source["changes"].token()
+                event = {"collection": collection, "version": source["version"], "full": True}
+            else:
+                changed_ids, deleted_ids, version = delta
+                if version == source["version"]:
+                    continue
+                source["version"] = version
+                if not has_subscribers:
+                    continue
+                
+                items = []
+                for item_id in changed_ids:
+                    item = source["get_item"](item_id)
+                    if item is not None:
+                        items.append(item)
+                    else:
+                        deleted_ids.append(item_id)
+                event = {
+                    "collection": collection,
+                    collection: source["to_json"](items),
+                    "deleted": deleted_ids,
+                    "version": version,
+                    "full": False,
+                }
+            
+            if has_subscribers:
+                self.publish(dumps(event).decode("utf-8"))
+    
+    def publish(self, payload: str):
+        """Queue a JSON event payload for every subscriber."""
+        with self.lock:
+            subscribers = list(self.subscribers)
+        
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(payload)
+            except queue.Full:
+                # A subscriber that fell behind drops its backlog and reloads everything
+                with subscription.mutex:
+                    subscription.queue.clear()
+                subscription.put_nowait(dumps({"resync": True}).decode("utf-8"))
+    
+    def _run(self):
+        """Flush changes in the background, waiting coalesce_seconds after the first one."""
+        while True:
+            # Local writes wake the feed; other workers' writes are found by polling
+            if self.dirty.wait(self.poll_seconds or None):
+                time.sleep(self.coalesce_seconds)
+            self.dirty.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error publishing changes: {e}")
+
+
+# Global change feed instance
+change_feed = ChangeFeed(
+    coalesce_seconds=Config.CHANGE_FEED_COALESCE_MS / 1000,
+    max_queued_events=Config.CHANGE_FEED_MAX_QUEUED_EVENTS,
+    poll_seconds=Config.CHANGE_FEED_POLL_MS / 1000
+)
+change_feed.watch("todos", db_client.todo_changes, db_client.get_todo, todos_to_json)
+change_feed.watch("reminders", db_client.reminder_changes, db_client.get_reminder, reminders_to_json)
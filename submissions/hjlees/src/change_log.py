@@ -0,0 +1,206 @@
+"""Per-collection change log: a version counter plus recent changes and deletions."""
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+
+class ChangeLog:
+    """Tracks which items of a collection changed, for ETags and delta sync."""
+    
+    def __init__(self, max_entries: int = 10000):
+        """
+        Initialize an empty change log.
+        
+        Args:
+            max_entries: Number of changed items remembered; older deltas
+                cannot be answered and clients fall back to a full reload
+        """
+        self.max_entries = max_entries
+        # Versions from another process run are meaningless, so tokens carry an epoch
+        self.epoch = uuid.uuid4().hex[:8]
+        self.version = 0
+        # Oldest version that changes_since can still answer
+        self.floor = 0
+        # item_id -> (version, deleted), ordered by version
+        self.entries: "OrderedDict[str, Tuple[int, bool]]" = OrderedDict()
+        self.lock = threading.Lock()
+        # Called after every record (see change_feed.ChangeFeed)
+        self.listeners: List[Callable[[], None]] = []
+    
+    def add_listener(self, listener: Callable[[], None]):
+        """Call listener after every recorded change; it must return quickly."""
+        self.listeners.append(listener)
+    
+    def record(self, item_id: str, deleted: bool = False):
+        """Record that an item was created, changed or deleted."""
+        with self.lock:
+            self.version += 1
+            self.entries.pop(item_id, None)
+            self.entries[item_id] = (self.version, deleted)
+            
+            while len(self.entries) > self.max_entries:
+                _, (evicted_version, _) = self.entries.popitem(last=False)
+                self.floor = evicted_version
+        
+        self.notify()
+    
+    def notify(self):
+        """Call the listeners after a change."""
+        for listener in self.listeners:
+            listener()
+    
+    def token(self) -> str:
+        """Opaque version token of the collection's current state."""
+        with self.lock:
+            return f"{self.epoch}.{self.version}"
+    
+    def changes_since(self, token: str) -> Optional[Tuple[List[str], List[str], str]]:
+        """
+        Get the items that changed after a version token.
+        
+        Args:
+            token: A token previously returned by token()
+        
+        Returns:
+            Tuple of (changed_ids, deleted_ids, current_token), or None if the
+            token is unknown or too old and the client must reload everything
+        """
+        epoch, _, version = (token or "").partition(".")
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        since = int(version)
+        
+        with self.lock:
+            if since < self.floor or since > self.version:
+                return None
+            
+            changed, deleted = [], []
+            for item_id, (item_version, is_deleted) in reversed(self.entries.items()):
+                if item_version <= since:
+                    break
+                (deleted if is_deleted else changed).append(item_id)
+            
+            return changed, deleted, f"{self.epoch}.{self.version}"
+
+
+class SQLiteChangeLog(ChangeLog):
+    """
+    Change log kept in the SQLite database of its collection.
+    
+    Writers record changes in the same transaction as the write itself, so
+    every worker process using the database sees the same versions and
+    deltas, whichever worker made the change.
+    """
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS change_versions (
+        collection TEXT PRIMARY KEY,
+        epoch TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        floor INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS changes (
+        collection TEXT NOT NULL,
+        item_id TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        deleted INTEGER NOT NULL,
+        PRIMARY KEY (collection, item_id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_changes_version ON changes (collection, version);
+    """
+    
+    def __init__(self, collection: str, connection: Callable[[], sqlite3.Connection], max_entries: int = 10000):
+        """
+        Initialize the log, creating its tables if needed.
+        
+        Args:
+            collection: Name of the collection whose changes are logged
+            connection: Returns the calling thread's connection to the database
+            max_entries: Number of changed items remembered
+        """
+        super().__init__(max_entries)
+        self.collection = collection
+        self._connection = connection
+        
+        conn = connection()
+        conn.executescript(self.SCHEMA)
+        with conn:
+            # The epoch is kept with the data, so tokens stay valid across restarts
+            conn.execute(
+                "INSERT OR IGNORE INTO change_versions (collection, epoch, version, floor) VALUES (?, ?, 0, 0)",
+                (collection, self.epoch),
+            )
+    
+    def record(self, item_id: str, deleted: bool = False):
+        """Record a change in a transaction of its own."""
+        with self._connection() as conn:
+            self.record_in(conn, item_id, deleted)
+        self.notify()
+    
+    def record_in(self, conn: sqlite3.Connection, item_id: str, deleted: bool = False):
+        """
+        Record a change as part of the caller's transaction.
+        
+        The caller calls notify() once the transaction is committed.
+        """
+        conn.execute("UPDATE change_versions SET version = version + 1 WHERE collection = ?", (self.collection,))
+        version = conn.execute(
+            "SELECT version FROM change_versions WHERE collection = ?", (self.collection,)
+        ).fetchone()[0]
+        conn.execute(
+            "INSERT OR REPLACE INTO changes (collection, item_id, version, deleted) VALUES (?, ?, ?, ?)",
+            (self.collection, item_id, version, int(deleted)),
+        )
+        
+        # Forget the oldest changes beyond max_entries
+        oldest_kept = conn.execute(
+            "SELECT version FROM changes WHERE collection = ? ORDER BY version DESC LIMIT 1 OFFSET ?",
+            (self.collection, self.max_entries),
+        ).fetchone()
+        if oldest_kept is not None:
+            conn.execute(
+                "DELETE FROM changes WHERE collection = ? AND version <= ?", (self.collection, oldest_kept[0])
+            )
+            conn.execute(
+                "UPDATE change_versions SET floor = ? WHERE collection = ?", (oldest_kept[0], self.collection)
+            )
+    
+    def token(self) -> str:
+        """Opaque version token of the collection's current state."""
+        epoch, version, _ = self._state(self._connection())
+        return f"{epoch}.{version}"
+    
+    def changes_since(self, token: str) -> Optional[Tuple[List[str], List[str], str]]:
+        """Get the items that changed after a version token (see ChangeLog.changes_since)."""
+        token_epoch, _, token_version = (token or "").partition(".")
+        if not token_version.isdigit():
+            return None
+        since = int(token_version)
+        
+        conn = self._connection()
+        epoch, version, floor = self._state(conn)
+        if token_epoch != epoch or since < floor or since > version:
+            return None
+        
+        # Changes recorded after the version was read are left for the next delta
+        rows = conn.execute(
+            "SELECT item_id, deleted FROM changes WHERE collection = ? AND version > ? AND version <= ?"
+            " ORDER BY version DESC",
+            (self.collection, since, version),
+        ).fetchall()
+        
+        changed, deleted = [], []
+        for item_id, is_deleted in rows:
+            (deleted if is_deleted else changed).append(item_id)
+        return changed, deleted, f"{epoch}.{version}"
+    
+    # Helper methods
+    
+    def _state(self, conn: sqlite3.Connection) -> Tuple[str, int, int]:
+        """(epoch, version, floor) of the collection."""
+        row = conn.execute(
+            "SELECT epoch, version, floor FROM change_versions WHERE collection = ?", (self.collection,)
+        ).fetchone()
+        return row[0], row[1], row[2]
@@ -13,6 +13,20 @@ class Config:
     ENV = os.getenv("FLASK_ENV", "development")
     DEBUG = ENV == "development"
     
+    # Production server (gunicorn.conf.py): bind address, worker processes
+    # (0 = one per CPU core with the SQLite backend, otherwise one), threads per
+    # worker for ordinary requests, and request timeout in seconds
+    WEB_BIND = os.getenv("WEB_BIND", "0.0.0.0:5000")
+    WEB_WORKERS = int(os.getenv("WEB_WORKERS", "0"))
+    WEB_THREADS = int(os.getenv("WEB_THREADS", "16"))
+    WEB_TIMEOUT = int(os.getenv("WEB_TIMEOUT", "120"))
+    # Async server (asgi.py): threads serving the routes that are not async
+    ASYNC_WSGI_THREADS = int(os.getenv("ASYNC_WSGI_THREADS", "16"))
+    
+    # Storage backend: "appwrite" or "sqlite" (local file at SQLITE_PATH)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "appwrite").lower()
+    SQLITE_PATH = os.getenv("SQLITE_PATH", "todos.db")
+    
     # Appwrite
     APPWRITE_ENDPOINT = os.getenv("APPWRITE_ENDPOINT", "https://cloud.appwrite.io/v1")
     APPWRITE_PROJECT_ID = os.getenv("APPWRITE_PROJECT_ID")
@@ -20,21 +34,109 @@ class Config:
     APPWRITE_DATABASE_ID = os.getenv("APPWRITE_DATABASE_ID")
     APPWRITE_TODOS_COLLECTION_ID = os.getenv("APPWRITE_TODOS_COLLECTION_ID")
     APPWRITE_REMINDERS_COLLECTION_ID = os.getenv("APPWRITE_REMINDERS_COLLECTION_ID")
+    # Seconds a cached collection is served before it is reloaded (0 disables caching)
+    DB_CACHE_TTL_SECONDS = float(os.getenv("DB_CACHE_TTL_SECONDS", "30"))
+    # Documents fetched per Appwrite list request when paging through a collection
+    DB_PAGE_SIZE = int(os.getenv("DB_PAGE_SIZE", "100"))
+    # Concurrent Appwrite requests per bulk operation, and the largest batch accepted
+    DB_BATCH_WORKERS = int(os.getenv("DB_BATCH_WORKERS", "10"))
+    DB_BATCH_MAX_ITEMS = int(os.getenv("DB_BATCH_MAX_ITEMS", "100"))
+    # Connection pool size and request timeout of the async Appwrite client
+    APPWRITE_HTTP_MAX_CONNECTIONS = int(os.getenv("APPWRITE_HTTP_MAX_CONNECTIONS", "100"))
+    APPWRITE_HTTP_TIMEOUT = float(os.getenv("APPWRITE_HTTP_TIMEOUT", "10"))
+    # Milliseconds of changes collected into one /api/events push, events buffered
+    # per client before it is told to resync, and seconds between keepalives
+    CHANGE_FEED_COALESCE_MS = int(os.getenv("CHANGE_FEED_COALESCE_MS", "200"))
+    CHANGE_FEED_MAX_QUEUED_EVENTS = int(os.getenv("CHANGE_FEED_MAX_QUEUED_EVENTS", "100"))
+    CHANGE_FEED_KEEPALIVE_SECONDS = float(os.getenv("CHANGE_FEED_KEEPALIVE_SECONDS", "15"))
+    # /api/events streams one Flask process keeps open; gunicorn adds this many
+    # threads to each worker, so subscribers never take the WEB_THREADS ones
+    CHANGE_FEED_MAX_STREAMS = int(os.getenv("CHANGE_FEED_MAX_STREAMS", "100"))
+    # How often the feed checks the store for changes made by other worker
+    # processes (milliseconds; 0 only publishes this process's writes)
+    CHANGE_FEED_POLL_MS = int(os.getenv("CHANGE_FEED_POLL_MS", "1000"))
     
     # Groq
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
     GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
     
+    # Conversation store: "memory" (this process) or "sqlite" (shared by workers
+    # and kept across restarts, at CONVERSATION_DB_PATH)
+    CONVERSATION_STORE = os.getenv("CONVERSATION_STORE", "memory").lower()
+    CONVERSATION_DB_PATH = os.getenv("CONVERSATION_DB_PATH", "conversations.db")
+    CONVERSATION_MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "1000"))
+    CONVERSATION_TTL_SECONDS = int(os.getenv("CONVERSATION_TTL_SECONDS", "3600"))
+    CONVERSATION_MAX_MESSAGES = int(os.getenv("CONVERSATION_MAX_MESSAGES", "100"))
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+    CONTEXT_KEEP_RECENT_TURNS = int(os.getenv("CONTEXT_KEEP_RECENT_TURNS", "3"))
+    CONTEXT_SUMMARY_MAX_CHARS = int(os.getenv("CONTEXT_SUMMARY_MAX_CHARS", "1500"))
+    AGENT_TOOL_WORKERS = int(os.getenv("AGENT_TOOL_WORKERS", "8"))
+    AGENT_FAST_PATH = os.getenv("AGENT_FAST_PATH", "true").lower() == "true"
+    
     # ElevenLabs
     ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
     ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")  # Default: Rachel
     ELEVENLABS_MODEL = os.getenv("ELEVENLABS_MODEL", "eleven_turbo_v2_5")
+    # Sentences of one voice reply synthesized at once, and threads shared by all replies
+    TTS_PIPELINE_WORKERS = int(os.getenv("TTS_PIPELINE_WORKERS", "3"))
+    TTS_PIPELINE_POOL_SIZE = int(os.getenv("TTS_PIPELINE_POOL_SIZE", "32"))
+    TTS_MIN_SENTENCE_CHARS = int(os.getenv("TTS_MIN_SENTENCE_CHARS", "20"))
+    # Cache of synthesized audio: memory tier size (MB), disk tier directory
+    # (shared by workers; empty disables it) and size (MB), and how long
+    # browsers may reuse /api/tts responses (seconds)
+    TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+    TTS_CACHE_MEMORY_MB = float(os.getenv("TTS_CACHE_MEMORY_MB", "32"))
+    TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+    TTS_CACHE_DISK_MB = float(os.getenv("TTS_CACHE_DISK_MB", "512"))
+    TTS_CACHE_MAX_AGE_SECONDS = int(os.getenv("TTS_CACHE_MAX_AGE_SECONDS", "86400"))
+    # Audio format (an mp3_samplerate_bitrate format, as audio is served as
+    # audio/mpeg), and for /api/tts streams the
+    # ElevenLabs latency optimization (0 = none to 4 = most, which also skips
+    # text normalization) and the size of each chunk sent on (bytes)
+    TTS_OUTPUT_FORMAT = os.getenv("TTS_OUTPUT_FORMAT", "mp3_44100_128")
+    TTS_STREAM_LATENCY = int(os.getenv("TTS_STREAM_LATENCY", "3"))
+    TTS_STREAM_CHUNK_BYTES = int(os.getenv("TTS_STREAM_CHUNK_BYTES", "1024"))
+    
+    # Outbound HTTP (Agora and HeyGen REST calls): pooled connections per host and
+    # connect/read timeouts in seconds
+    HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
     
     # Agora
     AGORA_APP_ID = os.getenv("AGORA_APP_ID")
     AGORA_APP_CERTIFICATE = os.getenv("AGORA_APP_CERTIFICATE")
     AGORA_API_KEY = os.getenv("AGORA_API_KEY")
     AGORA_API_SECRET = os.getenv("AGORA_API_SECRET")
+    # RTC token lifetime, minimum lifetime a cached token must have left to be
+    # reused, and number of cached tokens (seconds, seconds, entries)
+    AGORA_TOKEN_EXPIRATION_SECONDS = int(os.getenv("AGORA_TOKEN_EXPIRATION_SECONDS", "3600"))
+    AGORA_TOKEN_MIN_REMAINING_SECONDS = int(os.getenv("AGORA_TOKEN_MIN_REMAINING_SECONDS", "600"))
+    AGORA_TOKEN_CACHE_SIZE = int(os.getenv("AGORA_TOKEN_CACHE_SIZE", "1024"))
+    # Registry of agent/avatar RTC UIDs in use (share the file between workers),
+    # the UID range handed out, and seconds before an unreleased UID is reused
+    AGORA_UID_REGISTRY_PATH = os.getenv("AGORA_UID_REGISTRY_PATH", "agora_uids.db")
+    AGORA_UID_MIN = int(os.getenv("AGORA_UID_MIN", "100000"))
+    AGORA_UID_MAX = int(os.getenv("AGORA_UID_MAX", "999999999"))
+    AGORA_UID_LEASE_SECONDS = float(os.getenv("AGORA_UID_LEASE_SECONDS", "86400"))
+    # Background jobs (conversational AI start/stop): concurrent jobs, and seconds
+    # a finished job stays available at /api/jobs/<job_id>
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "600"))
+    # Where job status is kept: "memory" (polls must reach the worker running the
+    # job) or "sqlite" (any worker can answer, via JOB_DB_PATH, and a job in
+    # flight on one worker is not started again by another). A worker's claim
+    # on an unfinished job lapses after JOB_CLAIM_SECONDS (e.g. if it crashed)
+    JOB_STORE = os.getenv("JOB_STORE", "memory").lower()
+    JOB_DB_PATH = os.getenv("JOB_DB_PATH", "jobs.db")
+    JOB_CLAIM_SECONDS = float(os.getenv("JOB_CLAIM_SECONDS", "300"))
+    # Live agent/avatar sessions: "memory" (this process) or "sqlite" (shared by
+    # workers and kept across restarts), seconds of inactivity before a session
+    # is stopped (0 disables), and seconds between idle checks
+    SESSION_STORE = os.getenv("SESSION_STORE", "memory").lower()
+    SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+    SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "1800"))
+    SESSION_REAP_INTERVAL_SECONDS = float(os.getenv("SESSION_REAP_INTERVAL_SECONDS", "60"))
     
     # HeyGen
     HEYGEN_API_KEY = os.getenv("HEYGEN_API_KEY")
@@ -45,12 +147,15 @@ class Config:
     def validate(cls):
         """Validate required configuration."""
         required = [
-            "APPWRITE_PROJECT_ID",
-            "APPWRITE_API_KEY",
-            "APPWRITE_DATABASE_ID",
             "GROQ_API_KEY",
             "AGORA_APP_ID",
         ]
+        if cls.STORAGE_BACKEND == "appwrite":
+            required += [
+                "APPWRITE_PROJECT_ID",
+                "APPWRITE_API_KEY",
+                "APPWRITE_DATABASE_ID",
+            ]
         
         missing = [key for key in required if not getattr(cls, key)]
         
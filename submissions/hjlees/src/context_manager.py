@@ -0,0 +1,164 @@
+"""Token-budgeted prompt construction for the AI agent."""
+import json
+from typing import List, Dict, Any, Tuple
+
+from config import Config
+from conversation_store import Conversation
+
+
+# Rough per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(message: Dict[str, Any]) -> int:
+    """Estimate the prompt tokens of a chat message (~4 characters per token)."""
+    chars = len(message.get("content") or "")
+    if message.get("tool_calls"):
+        chars += len(json.dumps(message["tool_calls"]))
+    return MESSAGE_OVERHEAD_TOKENS + (chars + 3) // 4
+
+
+def split_turns(messages: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Split a history into turns, each starting at a user message."""
+    turns: List[List[Dict[str, Any]]] = []
+    for message in messages:
+        if message.get("role") == "user" or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _is_tool_message(message: Dict[str, Any]) -> bool:
+    """Whether a message is part of a tool-call/tool-result pair."""
+    return message.get("role") == "tool" or bool(message.get("tool_calls"))
+
+
+class ContextManager:
+    """Keeps the prompt sent to Groq under a token budget."""
+    
+    def __init__(
+        self,
+        token_budget: int = 3000,
+        keep_recent_turns: int = 3,
+        summary_max_chars: int = 1500
+    ):
+        """
+        Initialize the context manager.
+        
+        Args:
+            token_budget: Maximum estimated prompt tokens for system prompt and history
+            keep_recent_turns: Number of latest turns that are always sent verbatim
+            summary_max_chars: Maximum length of the rolling conversation summary
+        """
+        self.token_budget = token_budget
+        self.keep_recent_turns = max(1, keep_recent_turns)
+        self.summary_max_chars = summary_max_chars
+    
+    def build_messages(
+        self,
+        system_prompt: str,
+        conversation: Conversation
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """
+        Build the messages for a completion request within the token budget.
+        
+        Old tool-call/tool-result pairs are dropped from the prompt first. If
+        that is not enough, the oldest turns are folded into the conversation's
+        cached summary and removed from its history.
+        
+        Args:
+            system_prompt: The agent's system prompt
+            conversation: Conversation to build the prompt from (caller holds its lock)
+        
+        Returns:
+            Tuple of (messages, stats) where stats has prompt_tokens and prompt_tokens_saved
+        """
+        system_message = {"role": "system", "content": system_prompt}
+        turns = split_turns(conversation.messages)
+        recent = turns[-self.keep_recent_turns:]
+        old = turns[:-self.keep_recent_turns] if len(turns) > self.keep_recent_turns else []
+        
+        # What the prompt would cost without any windowing
+        full_tokens = (
+            estimate_tokens(system_message)
+            + conversation.folded_tokens
+            + sum(estimate_tokens(m) for m in conversation.messages)
+        )
+        
+        fixed_tokens = estimate_tokens(system_message) + sum(
+            estimate_tokens(m) for turn in recent for m in turn
+        )
+        old_tokens = [sum(estimate_tokens(m) for m in turn) for turn in old]
+        
+        def total() -> int:
+            summary_tokens = estimate_tokens(self._summary_message(conversation)) if conversation.summary else 0
+            return fixed_tokens + summary_tokens + sum(old_tokens)
+        
+        # Step 1: drop tool-call/tool-result pairs from old turns
+        if total() > self.token_budget:
+            old = [[m for m in turn if not _is_tool_message(m)] for turn in old]
+            old_tokens = [sum(estimate_tokens(m) for m in turn) for turn in old]
+        
+        # Step 2: fold the oldest turns into the rolling summary
+        folded = 0
+        while old and total() > self.token_budget:
+            old.pop(0)
+            old_tokens.pop(0)
+            folded += 1
+            self._fold_turn(conversation, turns[folded - 1])
+        
+        if folded:
+            del conversation.messages[:sum(len(turn) for turn in turns[:folded])]
+        
+        messages = [system_message]
+        if conversation.summary:
+            messages.append(self._summary_message(conversation))
+        messages.extend(m for turn in old for m in turn)
+        messages.extend(m for turn in recent for m in turn)
+        
+        prompt_tokens = sum(estimate_tokens(m) for m in messages)
+        stats = {
+            "prompt_tokens": prompt_tokens,
+            "prompt_tokens_saved": max(0, full_tokens - prompt_tokens),
+        }
+        return messages, stats
+    
+    def _fold_turn(self, conversation: Conversation, turn: List[Dict[str, Any]]):
+        """Fold a turn into the conversation's rolling summary."""
+        conversation.folded_tokens += sum(estimate_tokens(m) for m in turn)
+        
+        parts = []
+        for message in turn:
+            content = (message.get("content") or "").strip().replace("\n", " ")
+            if not content or _is_tool_message(message):
+                continue
+            speaker = "User" if message["role"] == "user" else "Luna"
+            if len(content) > 160:
+                content = content[:157] + "..."
+            parts.append(f"{speaker}: {content}")
+        
+        if not parts:
+            return
+        
+        summary = "\n".join(filter(None, [conversation.summary, " | ".join(parts)]))
+        if len(summary) > self.summary_max_chars:
+            # Keep the most recent part of the summary, starting at a whole line
+            summary = summary[-self.summary_max_chars:]
+            summary = summary[summary.find("\n") + 1:] if "\n" in summary else summary
+        conversation.summary = summary
+    
+    def _summary_message(self, conversation: Conversation) -> Dict[str, str]:
+        """Render the rolling summary as a system message."""
+        return {
+            "role": "system",
+            "content": f"Summary of the earlier conversation:\n{conversation.summary}"
+        }
+
+
+def create_context_manager() -> ContextManager:
+    """Create a context manager from application configuration."""
+    return ContextManager(
+        token_budget=Config.CONTEXT_TOKEN_BUDGET,
+        keep_recent_turns=Config.CONTEXT_KEEP_RECENT_TURNS,
+        summary_max_chars=Config.CONTEXT_SUMMARY_MAX_CHARS
+    )
@@ -0,0 +1,318 @@
+"""Session-keyed conversation storage for the AI agent."""
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+from config import Config
+from sqlite_util import ThreadConnections
+
+
+class Conversation:
+    """Conversation history and lock for a single session."""
+    
+    def __init__(self, session_id: str):
+        """Initialize an empty conversation."""
+        self.session_id = session_id
+        self.messages: List[Dict[str, Any]] = []
+        self.lock = threading.RLock()
+        # Serializes turns of the async agent, which all run on one thread
+        self.async_lock = asyncio.Lock()
+        self.last_active = time.monotonic()
+        # Rolling summary of turns folded out of the history
+        self.summary = ""
+        self.folded_tokens = 0
+        self.last_context_stats: Dict[str, int] = {}
+        # Revision of the saved copy this conversation was loaded from or saved as
+        self.revision = ""
+        # Messages of that saved copy (kept alive so their ids stay unique)
+        self._saved_messages: List[Dict[str, Any]] = []
+    
+    def touch(self):
+        """Record activity on this conversation."""
+        self.last_active = time.monotonic()
+    
+    def trim(self, max_messages: int):
+        """
+        Drop the oldest messages so at most max_messages remain.
+        
+        The history is cut at a user turn so that tool results are never
+        separated from the assistant message that requested them.
+        """
+        if max_messages <= 0 or len(self.messages) <= max_messages:
+            return
+        
+        start = len(self.messages) - max_messages
+        while start < len(self.messages) and self.messages[start].get("role") != "user":
+            start += 1
+        
+        del self.messages[:start]
+    
+    def mark_saved(self):
+        """Record the current messages as those of the saved copy."""
+        self._saved_messages = list(self.messages)
+    
+    def unsaved_messages(self) -> List[Dict[str, Any]]:
+        """Messages added since the conversation was last loaded or saved."""
+        saved = {id(message) for message in self._saved_messages}
+        return [message for message in self.messages if id(message) not in saved]
+    
+    def to_state(self) -> Dict[str, Any]:
+        """Serializable state of the conversation."""
+        return {
+            "messages": self.messages,
+            "summary": self.summary,
+            "folded_tokens": self.folded_tokens,
+            "last_context_stats": self.last_context_stats,
+        }
+    
+    def load_state(self, state: Dict[str, Any]):
+        """Replace the conversation with state from to_state()."""
+        self.messages = state.get("messages", [])
+        self.summary = state.get("summary", "")
+        self.folded_tokens = state.get("folded_tokens", 0)
+        self.last_context_stats = state.get("last_context_stats", {})
+
+
+class ConversationStore:
+    """Bounded conversation store with LRU and idle-TTL eviction."""
+    
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        ttl_seconds: int = 3600,
+        max_messages: int = 100
+    ):
+        """
+        Initialize the conversation store.
+        
+        Args:
+            max_sessions: Maximum number of conversations kept in memory
+            ttl_seconds: Idle time after which a conversation is evicted
+            max_messages: Maximum number of messages kept per conversation
+        """
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self._sessions: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, session_id: str) -> Conversation:
+        """Get the conversation for a session, creating it if needed."""
+        with self._lock:
+            self._evict_expired()
+            
+            conversation = self._sessions.get(session_id)
+            if conversation is None:
+                conversation = Conversation(session_id)
+                self._sessions[session_id] = conversation
+                
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            
+            conversation.touch()
+            return conversation
+    
+    def refresh(self, conversation: Conversation):
+        """
+        Bring a conversation up to date with its saved copy (caller holds its lock).
+        
+        Conversations kept only in this process are always up to date.
+        """
+    
+    def save(self, conversation: Conversation):
+        """Save a conversation after a turn (caller holds its lock)."""
+    
+    def reset(self, session_id: Optional[str] = None):
+        """Forget one conversation, or all of them if no session is given."""
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_id, None)
+    
+    def __len__(self) -> int:
+        """Number of conversations currently held."""
+        with self._lock:
+            return len(self._sessions)
+    
+    def _evict_expired(self):
+        """Evict idle conversations. Caller must hold the store lock."""
+        if self.ttl_seconds <= 0:
+            return
+        
+        cutoff = time.monotonic() - self.ttl_seconds
+        # Entries are kept in access order, so expired ones are at the front
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_active >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+
+
+class SQLiteConversationStore(ConversationStore):
+    """
+    Conversation store that saves every conversation to a SQLite file.
+    
+    Conversations survive restarts and crashes, and every worker process using
+    the file sees the same history: a turn handled by one worker continues
+    from the turn another worker saved. The in-memory store of the parent
+    class still holds each conversation's lock and a copy of its state, which
+    is reloaded only when another worker has saved a newer revision. Two
+    turns of one session running on different workers at the same time are
+    merged on save (see save).
+    """
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS conversations (
+        session_id TEXT PRIMARY KEY,
+        state TEXT NOT NULL,
+        revision TEXT NOT NULL,
+        last_active REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_conversations_last_active ON conversations (last_active);
+    """
+    
+    def __init__(
+        self,
+        path: str = "conversations.db",
+        max_sessions: int = 1000,
+        ttl_seconds: int = 3600,
+        max_messages: int = 100,
+        busy_timeout_ms: int = 5000,
+        max_save_attempts: int = 5
+    ):
+        """
+        Open (and create if needed) the store.
+        
+        Args:
+            path: Database file shared by all workers, or ":memory:" for a
+                store private to this process
+            max_sessions: Maximum number of conversations kept in memory
+            ttl_seconds: Idle time after which a conversation is deleted
+            max_messages: Maximum number of messages kept per conversation
+            busy_timeout_ms: How long a writer waits for another worker's lock
+            max_save_attempts: Saves tried when other workers keep saving the
+                same session in between
+        """
+        super().__init__(max_sessions=max_sessions, ttl_seconds=ttl_seconds, max_messages=max_messages)
+        self.max_save_attempts = max_save_attempts
+        
+        self._connection = ThreadConnections(path, "conversations", busy_timeout_ms, schema=self.SCHEMA)
+    
+    def refresh(self, conversation: Conversation):
+        """Reload a conversation if another worker saved, reset or expired it."""
+        row = self._connection().execute(
+            "SELECT state, revision FROM conversations WHERE session_id = ? AND last_active >= ?",
+            (conversation.session_id, self._cutoff()),
+        ).fetchone()
+        
+        if row is None:
+            if conversation.revision:
+                # Saved copy was reset or expired: start over
+                conversation.load_state({})
+                conversation.revision = ""
+        elif row[1] != conversation.revision:
+            conversation.load_state(json.loads(row[0]))
+            conversation.revision = row[1]
+        conversation.mark_saved()
+    
+    def save(self, conversation: Conversation):
+        """
+        Save a conversation as a new revision and delete expired ones.
+        
+        The save only succeeds if the saved copy is still the revision the
+        conversation was loaded from. If another worker saved a turn of the
+        same session in the meantime, that turn is loaded, this turn's
+        messages are appended to it and the save is retried, so neither turn
+        is lost.
+        
+        Raises:
+            RuntimeError: If the session kept changing for max_save_attempts saves
+        """
+        for _ in range(self.max_save_attempts):
+            if self._save_revision(conversation):
+                return
+            
+            print(f"🔁 Conversation {conversation.session_id} changed since this turn began; merging it")
+            unsaved = conversation.unsaved_messages()
+            self.refresh(conversation)
+            conversation.messages.extend(unsaved)
+            conversation.trim(self.max_messages)
+        
+        raise RuntimeError(f"Conversation {conversation.session_id} changed too often to be saved")
+    
+    def reset(self, session_id: Optional[str] = None):
+        """Forget one conversation, or all of them if no session is given."""
+        with self._connection() as conn:
+            if session_id is None:
+                conn.execute("DELETE FROM conversations")
+            else:
+                conn.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+        super().reset(session_id)
+    
+    def __len__(self) -> int:
+        """Number of saved conversations that have not expired."""
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM conversations WHERE last_active >= ?", (self._cutoff(),)
+        ).fetchone()[0]
+    
+    # Helper methods
+    
+    def _save_revision(self, conversation: Conversation) -> bool:
+        """Save a conversation if its saved copy is unchanged. Returns False on a conflict."""
+        revision = uuid.uuid4().hex
+        state = json.dumps(conversation.to_state())
+        now = time.time()
+        
+        with self._connection() as conn:
+            if conversation.revision:
+                saved = conn.execute(
+                    "UPDATE conversations SET state = ?, revision = ?, last_active = ?"
+                    " WHERE session_id = ? AND revision = ?",
+                    (state, revision, now, conversation.session_id, conversation.revision),
+                ).rowcount
+            else:
+                # New conversation: only an expired saved copy may be replaced
+                saved = conn.execute(
+                    "INSERT INTO conversations (session_id, state, revision, last_active) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT (session_id) DO UPDATE SET state = excluded.state,"
+                    " revision = excluded.revision, last_active = excluded.last_active"
+                    " WHERE conversations.last_active < ?",
+                    (conversation.session_id, state, revision, now, self._cutoff()),
+                ).rowcount
+            
+            if saved:
+                conn.execute("DELETE FROM conversations WHERE last_active < ?", (self._cutoff(),))
+        
+        if not saved:
+            return False
+        conversation.revision = revision
+        conversation.mark_saved()
+        return True
+    
+    def _cutoff(self) -> float:
+        """Last activity time before which a saved conversation has expired."""
+        return time.time() - self.ttl_seconds if self.ttl_seconds > 0 else 0
+    
+
+
+def create_conversation_store() -> ConversationStore:
+    """Create a conversation store from application configuration."""
+    if Config.CONVERSATION_STORE == "sqlite":
+        return SQLiteConversationStore(
+            path=Config.CONVERSATION_DB_PATH,
+            max_sessions=Config.CONVERSATION_MAX_SESSIONS,
+            ttl_seconds=Config.CONVERSATION_TTL_SECONDS,
+            max_messages=Config.CONVERSATION_MAX_MESSAGES
+        )
+    return ConversationStore(
+        max_sessions=Config.CONVERSATION_MAX_SESSIONS,
+        ttl_seconds=Config.CONVERSATION_TTL_SECONDS,
+        max_messages=Config.CONVERSATION_MAX_MESSAGES
+    )
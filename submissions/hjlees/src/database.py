@@ -3,15 +3,125 @@ from appwrite.client import Client
 from appwrite.services.databases import Databases
 from appwrite.query import Query
 from appwrite.id import ID
-from typing import List, Optional
+from typing import List, Optional, Dict, Union, Iterator, Tuple, Any, Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import threading
+import time
 import json
 
+from change_log import ChangeLog
 from config import Config
-from models import Todo, Reminder, TodoPriority, ReminderImportance
+from models import Todo, Reminder, TodoPriority, ReminderImportance, TodoFilter, TodoSortField
+from search_index import TextIndex
+from storage import StorageBackend
+from sqlite_storage import SQLiteStorage
 
 
-class AppwriteClient:
+class CollectionCache:
+    """In-process copy of a collection, kept current by write-through updates."""
+    
+    def __init__(self, text_field: str, ttl_seconds: float = 30, changes: Optional[ChangeLog] = None):
+        """
+        Initialize an empty cache.
+        
+        Args:
+            text_field: Item attribute kept in the search index (e.g. "title")
+            ttl_seconds: Seconds before a full reload is required (0 disables the cache)
+            changes: Change log that writes and reloads are recorded in
+        """
+        self.text_field = text_field
+        self.ttl_seconds = ttl_seconds
+        self.changes = changes
+        self.loaded = False
+        self.items: Dict[str, Union[Todo, Reminder]] = {}
+        self.index = TextIndex()
+        self.loaded_at: Optional[float] = None
+        self.generation = 0
+        self.lock = threading.Lock()
+    
+    def is_fresh(self) -> bool:
+        """Whether the cache holds the whole collection and is within its TTL."""
+        return (
+            self.ttl_seconds > 0
+            and self.loaded_at is not None
+            and time.monotonic() - self.loaded_at < self.ttl_seconds
+        )
+    
+    def begin_load(self) -> int:
+        """Start a full reload; returns the generation to pass to finish_load."""
+        with self.lock:
+            return self.generation
+    
+    def finish_load(self, items: List[Union[Todo, Reminder]], generation: int):
+        """Replace the cached collection, unless a write happened during the reload."""
+        with self.lock:
+            if generation != self.generation:
+                return
+            
+            items_by_id = {item.id: item for item in items}
+            if self.changes is not None and self.loaded:
+                # Report changes made outside this process since the last load
+                for item_id, item in items_by_id.items():
+                    previous = self.items.get(item_id)
+                    if previous is None or previous.updated_at != item.updated_at:
+                        self.changes.record(item_id)
+                for item_id in self.items.keys() - items_by_id.keys():
+                    self.changes.record(item_id, deleted=True)
+            
+            self.items = items_by_id
+            self.loaded = True
+            self.index.clear()
+            for item in items:
+                self.index.add(item.id, getattr(item, self.text_field))
+            self.loaded_at = time.monotonic()
+    
+    def values(self) -> List[Union[Todo, Reminder]]:
+        """Snapshot of the cached items."""
+        with self.lock:
+            return list(self.items.values())
+    
+    def get(self, item_id: str) -> Optional[Union[Todo, Reminder]]:
+        """Get a cached item by ID."""
+        with self.lock:
+            return self.items.get(item_id)
+    
+    def put(self, item: Union[Todo, Reminder]):
+        """Insert or replace an item after a successful write."""
+        with self.lock:
+            self.generation += 1
+            self.items[item.id] = item
+            self.index.add(item.id, getattr(item, self.text_field))
+            if self.changes is not None:
+                self.changes.record(item.id)
+    
+    def remove(self, item_id: str):
+        """Remove an item after a successful delete."""
+        with self.lock:
+            self.generation += 1
+            self.items.pop(item_id, None)
+            self.index.remove(item_id)
+            if self.changes is not None:
+                self.changes.record(item_id, deleted=True)
+    
+    def search(self, text: str) -> List[Union[Todo, Reminder]]:
+        """Find cached items by text, best match first (newest first on ties)."""
+        with self.lock:
+            matches = self.index.search(text)
+            ranked = [(score, self.items[item_id]) for item_id, score in matches]
+        
+        ranked.sort(key=lambda match: (match[0], match[1].created_at), reverse=True)
+        return [item for _, item in ranked]
+    
+    def invalidate(self):
+        """Mark the cached collection stale so the next read reloads it."""
+        with self.lock:
+            self.generation += 1
+            # Items are kept (but no longer served) so the reload can be diffed
+            self.loaded_at = None
+
+
+class AppwriteClient(StorageBackend):
     """Appwrite database client wrapper."""
     
     def __init__(self):
@@ -23,6 +133,39 @@ class AppwriteClient:
         
         self.databases = Databases(self.client)
         self.database_id = Config.APPWRITE_DATABASE_ID
+        
+        super().__init__()
+        
+        # Write-through caches of each collection
+        self.todo_cache = CollectionCache(
+            "title", ttl_seconds=Config.DB_CACHE_TTL_SECONDS, changes=self.todo_changes
+        )
+        self.reminder_cache = CollectionCache(
+            "reminder_text", ttl_seconds=Config.DB_CACHE_TTL_SECONDS, changes=self.reminder_changes
+        )
+        
+        # Bulk operations send their requests concurrently on this pool
+        self.batch_executor = ThreadPoolExecutor(
+            max_workers=Config.DB_BATCH_WORKERS,
+            thread_name_prefix="db-batch"
+        )
+    
+    def invalidate_cache(self):
+        """Drop all cached collections so the next reads go to Appwrite."""
+        self.todo_cache.invalidate()
+        self.reminder_cache.invalidate()
+    
+    def todos_version(self) -> str:
+        """Version token of the todo collection, after picking up outside changes if the cache is stale."""
+        if not self.todo_cache.is_fresh():
+            self.get_todos()
+        return super().todos_version()
+    
+    def reminders_version(self) -> str:
+        """Version token of the reminder collection, after picking up outside changes if the cache is stale."""
+        if not self.reminder_cache.is_fresh():
+            self.get_reminders()
+        return super().reminders_version()
     
     # Todo operations
     
@@ -54,26 +197,123 @@ class AppwriteClient:
             data=data,
         )
         
-        return self._document_to_todo(result)
+        todo = self._document_to_todo(result)
+        self.todo_cache.put(todo)
+        return todo
     
     def get_todos(self, completed: Optional[bool] = None) -> List[Todo]:
         """Get all todos, optionally filtered by completion status."""
-        queries = []
+        if self.todo_cache.is_fresh():
+            todos = self.todo_cache.values()
+        else:
+            generation = self.todo_cache.begin_load()
+            todos = list(self.iter_todos())
+            self.todo_cache.finish_load(todos, generation)
+        
+        if completed is not None:
+            todos = [todo for todo in todos if todo.completed == completed]
+        
+        return sorted(todos, key=lambda todo: todo.created_at, reverse=True)
+    
+    def query_todos(self, todo_filter: TodoFilter) -> List[Todo]:
+        """
+        Get all todos matching a filter, sorted by its sort options.
+        
+        Served from the cache when it is fresh; otherwise the filter is
+        pushed down to Appwrite so only matching documents are transferred.
+        
+        Args:
+            todo_filter: Filter and sort options
+        
+        Returns:
+            Matching todos in the requested order
+        """
+        if self.todo_cache.is_fresh():
+            todos = [todo for todo in self.todo_cache.values() if todo_filter.matches(todo)]
+        else:
+            queries = self._todo_queries(todo_filter, server_sort=False)
+            todos = [
+                self._document_to_todo(doc)
+                for doc in self._iter_documents(Config.APPWRITE_TODOS_COLLECTION_ID, queries)
+            ]
+        
+        return todo_filter.sort(todos)
+    
+    def iter_todos(self, completed: Optional[bool] = None, page_size: Optional[int] = None) -> Iterator[Todo]:
+        """
+        Stream all todos from Appwrite page by page, newest first.
+        
+        Args:
+            completed: Optional completion status filter
+            page_size: Documents fetched per request (defaults to DB_PAGE_SIZE)
+        
+        Yields:
+            Todos, holding only one page in memory at a time
+        """
+        queries = [Query.order_desc("created_at")]
         if completed is not None:
             queries.append(Query.equal("completed", completed))
         
-        queries.append(Query.order_desc("created_at"))
+        for doc in self._iter_documents(Config.APPWRITE_TODOS_COLLECTION_ID, queries, page_size):
+            yield self._document_to_todo(doc)
+    
+    def list_todos_page(
+        self,
+        completed: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        limit: int = 25,
+        todo_filter: Optional[TodoFilter] = None,
+    ) -> Tuple[List[Todo], Optional[str], int]:
+        """
+        Get one page of todos, newest first unless todo_filter sorts otherwise.
+        
+        Args:
+            completed: Optional completion status filter
+            cursor: ID of the last todo of the previous page
+            limit: Maximum number of todos in the page
+            todo_filter: Optional filter and sort options (sorting by priority
+                is not supported for pages)
         
-        result = self.databases.list_documents(
-            database_id=self.database_id,
-            collection_id=Config.APPWRITE_TODOS_COLLECTION_ID,
-            queries=queries,
+        Returns:
+            Tuple of (todos, next_cursor, total); next_cursor is None on the last page
+        """
+        if todo_filter is None:
+            todo_filter = TodoFilter(completed=completed)
+        elif completed is not None:
+            todo_filter = todo_filter.model_copy(update={"completed": completed})
+        
+        queries = self._todo_queries(todo_filter, server_sort=True)
+        
+        documents, next_cursor, total = self._list_page(
+            Config.APPWRITE_TODOS_COLLECTION_ID, queries, cursor, limit
         )
+        return [self._document_to_todo(doc) for doc in documents], next_cursor, total
+    
+    def find_todos(self, title: str, completed: Optional[bool] = None) -> List[Todo]:
+        """
+        Find todos by title using the in-memory search index.
         
-        return [self._document_to_todo(doc) for doc in result["documents"]]
+        Args:
+            title: Title (or part of it) to look for
+            completed: Optional completion status filter
+        
+        Returns:
+            Matching todos, best match first
+        """
+        if not self.todo_cache.is_fresh():
+            self.get_todos()
+        
+        todos = self.todo_cache.search(title)
+        if completed is not None:
+            todos = [todo for todo in todos if todo.completed == completed]
+        return todos
     
     def get_todo(self, todo_id: str) -> Optional[Todo]:
         """Get a specific todo by ID."""
+        cached = self.todo_cache.get(todo_id) if self.todo_cache.is_fresh() else None
+        if cached:
+            return cached
+        
         try:
             result = self.databases.get_document(
                 database_id=self.database_id,
@@ -115,7 +355,9 @@ class AppwriteClient:
                 document_id=todo_id,
                 data=data,
             )
-            return self._document_to_todo(result)
+            todo = self._document_to_todo(result)
+            self.todo_cache.put(todo)
+            return todo
         except Exception as e:
             print(f"Error updating todo {todo_id}: {e}")
             return None
@@ -132,6 +374,7 @@ class AppwriteClient:
                 collection_id=Config.APPWRITE_TODOS_COLLECTION_ID,
                 document_id=todo_id,
             )
+            self.todo_cache.remove(todo_id)
             return True
         except Exception as e:
             print(f"Error deleting todo {todo_id}: {e}")
@@ -164,20 +407,52 @@ class AppwriteClient:
             data=data,
         )
         
-        return self._document_to_reminder(result)
+        reminder = self._document_to_reminder(result)
+        self.reminder_cache.put(reminder)
+        return reminder
     
     def get_reminders(self) -> List[Reminder]:
         """Get all reminders."""
-        result = self.databases.list_documents(
-            database_id=self.database_id,
-            collection_id=Config.APPWRITE_REMINDERS_COLLECTION_ID,
-            queries=[Query.order_desc("created_at")],
+        if self.reminder_cache.is_fresh():
+            reminders = self.reminder_cache.values()
+        else:
+            generation = self.reminder_cache.begin_load()
+            reminders = list(self.iter_reminders())
+            self.reminder_cache.finish_load(reminders, generation)
+        
+        return sorted(reminders, key=lambda reminder: reminder.created_at, reverse=True)
+    
+    def iter_reminders(self, page_size: Optional[int] = None) -> Iterator[Reminder]:
+        """Stream all reminders from Appwrite page by page, newest first."""
+        queries = [Query.order_desc("created_at")]
+        
+        for doc in self._iter_documents(Config.APPWRITE_REMINDERS_COLLECTION_ID, queries, page_size):
+            yield self._document_to_reminder(doc)
+    
+    def list_reminders_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 25,
+    ) -> Tuple[List[Reminder], Optional[str], int]:
+        """Get one page of reminders, newest first. Returns (reminders, next_cursor, total)."""
+        documents, next_cursor, total = self._list_page(
+            Config.APPWRITE_REMINDERS_COLLECTION_ID, [Query.order_desc("created_at")], cursor, limit
         )
+        return [self._document_to_reminder(doc) for doc in documents], next_cursor, total
+    
+    def find_reminders(self, reminder_text: str) -> List[Reminder]:
+        """Find reminders by text using the in-memory search index, best match first."""
+        if not self.reminder_cache.is_fresh():
+            self.get_reminders()
         
-        return [self._document_to_reminder(doc) for doc in result["documents"]]
+        return self.reminder_cache.search(reminder_text)
     
     def get_reminder(self, reminder_id: str) -> Optional[Reminder]:
         """Get a specific reminder by ID."""
+        cached = self.reminder_cache.get(reminder_id) if self.reminder_cache.is_fresh() else None
+        if cached:
+            return cached
+        
         try:
             result = self.databases.get_document(
                 database_id=self.database_id,
@@ -197,6 +472,7 @@ class AppwriteClient:
                 collection_id=Config.APPWRITE_REMINDERS_COLLECTION_ID,
                 document_id=reminder_id,
             )
+            self.reminder_cache.remove(reminder_id)
             return True
         except Exception as e:
             print(f"Error deleting reminder {reminder_id}: {e}")
@@ -204,31 +480,138 @@ class AppwriteClient:
     
     # Helper methods
     
-    def _document_to_todo(self, doc: dict) -> Todo:
-        """Convert Appwrite document to Todo model."""
-        return Todo(
-            id=doc["$id"],
-            title=doc["title"],
-            description=doc.get("description"),
-            completed=doc.get("completed", False),
-            priority=TodoPriority(doc.get("priority", "medium")),
-            due_date=datetime.fromisoformat(doc["due_date"]) if doc.get("due_date") else None,
-            created_at=datetime.fromisoformat(doc["created_at"]) if doc.get("created_at") else datetime.utcnow(),
-            updated_at=datetime.fromisoformat(doc["updated_at"]) if doc.get("updated_at") else datetime.utcnow(),
-        )
+    def _execute_batch(self, operation: Callable[[Any], Any], items: List[Any]) -> List[Any]:
+        """Run operation for every item concurrently on the batch pool (one round trip of wall time)."""
+        futures = [self.batch_executor.submit(operation, item) for item in items]
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
     
-    def _document_to_reminder(self, doc: dict) -> Reminder:
-        """Convert Appwrite document to Reminder model."""
-        return Reminder(
-            id=doc["$id"],
-            reminder_text=doc["reminder_text"],
-            importance=ReminderImportance(doc.get("importance", "medium")),
-            reminder_date=datetime.fromisoformat(doc["reminder_date"]) if doc.get("reminder_date") else None,
-            created_at=datetime.fromisoformat(doc["created_at"]) if doc.get("created_at") else datetime.utcnow(),
-            updated_at=datetime.fromisoformat(doc["updated_at"]) if doc.get("updated_at") else datetime.utcnow(),
+    @staticmethod
+    def _todo_queries(todo_filter: TodoFilter, server_sort: bool) -> List[str]:
+        """
+        Translate a todo filter into Appwrite queries.
+        
+        Args:
+            todo_filter: Filter and sort options
+            server_sort: Whether Appwrite must return documents in the
+                filter's order (needed for cursor pages)
+        
+        Returns:
+            List of Query strings (see setup_appwrite.py for the matching indexes)
+        """
+        queries = []
+        
+        if todo_filter.completed is not None:
+            queries.append(Query.equal("completed", todo_filter.completed))
+        
+        priorities = todo_filter.priorities()
+        if priorities is not None:
+            queries.append(Query.equal("priority", [priority.value for priority in priorities]))
+        
+        if todo_filter.due_after is not None:
+            queries.append(Query.greater_than_equal("due_date", todo_filter.due_after.isoformat()))
+        if todo_filter.due_before is not None:
+            queries.append(Query.less_than("due_date", todo_filter.due_before.isoformat()))
+        
+        if todo_filter.search:
+            queries.append(Query.search("title", todo_filter.search))
+        
+        sort_field = todo_filter.sort_by
+        if sort_field == TodoSortField.PRIORITY:
+            # Priority is stored as a string, so its order only exists client-side
+            if server_sort:
+                raise ValueError("Sorting by priority is not supported with cursor pagination")
+            sort_field = TodoSortField.CREATED_AT
+        
+        order = Query.order_desc if todo_filter.descending else Query.order_asc
+        queries.append(order(sort_field.value))
+        
+        return queries
+    
+    def _list_page(
+        self,
+        collection_id: str,
+        queries: List[str],
+        cursor: Optional[str],
+        limit: int,
+    ) -> Tuple[List[dict], Optional[str], int]:
+        """Fetch one page of documents using cursor pagination."""
+        page_queries = [*queries, Query.limit(limit)]
+        if cursor:
+            page_queries.append(Query.cursor_after(cursor))
+        
+        result = self.databases.list_documents(
+            database_id=self.database_id,
+            collection_id=collection_id,
+            queries=page_queries,
         )
+        
+        documents = result["documents"]
+        next_cursor = documents[-1]["$id"] if len(documents) == limit else None
+        return documents, next_cursor, result.get("total", len(documents))
+    
+    def _iter_documents(
+        self,
+        collection_id: str,
+        queries: List[str],
+        page_size: Optional[int] = None,
+    ) -> Iterator[dict]:
+        """Yield every document matching queries, one page at a time."""
+        page_size = page_size or Config.DB_PAGE_SIZE
+        cursor = None
+        
+        while True:
+            documents, cursor, _ = self._list_page(collection_id, queries, cursor, page_size)
+            yield from documents
+            if not cursor:
+                return
+    
+    @staticmethod
+    def _document_to_todo(doc: dict) -> Todo:
+        """
+        Convert Appwrite document to Todo model.
+        
+        ISO date strings are passed to pydantic as they are: its validator
+        parses them natively, which is faster than fromisoformat followed by
+        validating the datetime objects.
+        """
+        return Todo.model_validate({
+            "id": doc["$id"],
+            "title": doc["title"],
+            "description": doc.get("description"),
+            "completed": doc.get("completed", False),
+            "priority": doc.get("priority", "medium"),
+            "due_date": doc.get("due_date") or None,
+            "created_at": doc.get("created_at") or datetime.utcnow(),
+            "updated_at": doc.get("updated_at") or datetime.utcnow(),
+        })
+    
+    @staticmethod
+    def _document_to_reminder(doc: dict) -> Reminder:
+        """Convert Appwrite document to Reminder model (see _document_to_todo)."""
+        return Reminder.model_validate({
+            "id": doc["$id"],
+            "reminder_text": doc["reminder_text"],
+            "importance": doc.get("importance", "medium"),
+            "reminder_date": doc.get("reminder_date") or None,
+            "created_at": doc.get("created_at") or datetime.utcnow(),
+            "updated_at": doc.get("updated_at") or datetime.utcnow(),
+        })
+
+
+def create_storage_backend() -> StorageBackend:
+    """Create the storage backend selected by STORAGE_BACKEND."""
+    if Config.STORAGE_BACKEND == "sqlite":
+        print(f"🗄️  Using SQLite storage at {Config.SQLITE_PATH}")
+        return SQLiteStorage(Config.SQLITE_PATH)
+    return AppwriteClient()
 
 
 # Global database client instance
-db_client = AppwriteClient()
+db_client = create_storage_backend()
 
@@ -0,0 +1,61 @@
+"""
+Gunicorn settings for running the app with several worker processes.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Each worker imports the app itself (no preload), so the background threads
+started at import (session reaper, change feed, job pool) run in every worker.
+Several workers require STORAGE_BACKEND=sqlite (the default is one worker per
+CPU core with it, and a single worker with Appwrite); use the sqlite stores
+(SESSION_STORE, CONVERSATION_STORE, JOB_STORE) so that workers also share
+sessions, conversations and job status.
+"""
+import multiprocessing
+
+from config import Config
+
+
+bind = Config.WEB_BIND
+# Only the SQLite backend shares list versions and the change log between workers
+workers = Config.WEB_WORKERS or (multiprocessing.cpu_count() if Config.STORAGE_BACKEND == "sqlite" else 1)
+# Threads, not processes, serve the requests of a worker: streaming chat
+# replies and /api/events subscribers each hold a thread while they are open.
+# Subscribers get threads of their own (app.events caps them at
+# CHANGE_FEED_MAX_STREAMS), so open tabs cannot starve ordinary requests
+worker_class = "gthread"
+threads = Config.WEB_THREADS + Config.CHANGE_FEED_MAX_STREAMS
+timeout = Config.WEB_TIMEOUT
+graceful_timeout = 30
+keepalive = 5
+# Background threads do not survive a fork, so the app must load in each worker
+preload_app = False
+
+
+def on_starting(server):
+    """Refuse or warn about state that is not shared between workers."""
+    if workers <= 1:
+        return
+    
+    if Config.STORAGE_BACKEND != "sqlite":
+        # List ETags, ?since= deltas and /api/events come from a per-process
+        # change log with Appwrite: a worker that did not make a write would
+        # keep answering 304 for a list another worker changed
+        raise RuntimeError(
+            f"{workers} workers need STORAGE_BACKEND=sqlite, whose change log is shared "
+            f"by every worker; use WEB_WORKERS=1 with {Config.STORAGE_BACKEND}"
+        )
+    
+    per_process = [
+        name for name, value in (
+            ("SESSION_STORE", Config.SESSION_STORE),
+            ("CONVERSATION_STORE", Config.CONVERSATION_STORE),
+            ("JOB_STORE", Config.JOB_STORE),
+        )
+        if value != "sqlite"
+    ]
+    if Config.AGORA_UID_REGISTRY_PATH == ":memory:":
+        per_process.append("AGORA_UID_REGISTRY_PATH")
+    
+    if per_process:
+        print(f"⚠️  {workers} workers, but {', '.join(per_process)} keep state per worker; "
+              f"requests reaching another worker will not see it")
@@ -1,9 +1,11 @@
 """HeyGen Video Avatar integration."""
+import httpx
 import requests
 import time
 from typing import Optional, Dict, Any, List
 
 from config import Config
+from http_transport import PerLoop, create_async_client, create_session
 
 
 class HeyGenService:
@@ -18,6 +20,10 @@ class HeyGenService:
             "X-Api-Key": self.api_key,
             "Content-Type": "application/json"
         }
+        # Pooled connections to the HeyGen API (api.heygen.com for v1 and v2)
+        self.session = create_session(headers=self.headers)
+        # Async clients for the ASGI app, one per event loop
+        self.async_clients = PerLoop(lambda: create_async_client(headers=self.headers))
     
     def list_avatars(self) -> List[Dict[str, Any]]:
         """
@@ -29,7 +35,7 @@ class HeyGenService:
         url = f"{self.base_url}/avatars"
         
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self.session.get(url)
             response.raise_for_status()
             data = response.json()
             return data.get("data", {}).get("avatars", [])
@@ -47,7 +53,7 @@ class HeyGenService:
         url = f"{self.base_url}/voices"
         
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self.session.get(url)
             response.raise_for_status()
             data = response.json()
             return data.get("data", {}).get("voices", [])
@@ -111,7 +117,7 @@ class HeyGenService:
             payload["title"] = title
         
         try:
-            response = requests.post(url, json=payload, headers=self.headers)
+            response = self.session.post(url, json=payload)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -131,7 +137,7 @@ class HeyGenService:
         url = f"{self.base_url}/video/status/{video_id}"
         
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self.session.get(url)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -194,65 +200,23 @@ class HeyGenService:
         """
         # Use v1 endpoint for streaming (works with free tier)
         url = "https://api.heygen.com/v1/streaming.new"
-        
-        avatar_id = avatar_id or self.avatar_id
-        
-        payload = {
-            "quality": quality,
-        }
-        
-        # Only add avatar_id if it's configured and not the placeholder
-        if avatar_id and avatar_id != "your-avatar-id":
-            payload["avatar_id"] = avatar_id
-        
-        if voice_id:
-            payload["voice_id"] = voice_id
+        payload = self._streaming_payload(avatar_id, voice_id, quality)
         
         try:
             print(f"🎬 Attempting to create HeyGen streaming session at: {url}")
             print(f"   Payload: {payload}")
-            response = requests.post(url, json=payload, headers=self.headers)
+            response = self.session.post(url, json=payload)
             response.raise_for_status()
             result = response.json()
             print(f"✅ HeyGen streaming session created successfully")
             return result
         except requests.exceptions.HTTPError as e:
-            error_msg = str(e)
             status_code = e.response.status_code if e.response else None
             response_text = e.response.text if e.response else "No response"
-            
-            print(f"❌ HeyGen API Error ({status_code}): {error_msg}")
-            print(f"   Response: {response_text}")
-            
-            # Provide helpful error messages
-            if status_code == 404:
-                return {
-                    "error": "HeyGen Streaming API endpoint not found. This feature may require a HeyGen Enterprise account or the API structure may have changed.",
-                    "hint": "The video avatar feature is optional. You can use voice chat instead.",
-                    "status_code": 404
-                }
-            elif status_code == 401 or status_code == 403:
-                return {
-                    "error": "HeyGen API authentication failed. Please check your HEYGEN_API_KEY in .env",
-                    "hint": "Make sure your HeyGen account has access to the Streaming API feature.",
-                    "status_code": status_code
-                }
-            elif status_code == 429:
-                return {
-                    "error": "HeyGen API rate limit exceeded. Please wait and try again.",
-                    "status_code": 429
-                }
-            else:
-                return {
-                    "error": f"HeyGen API error: {error_msg}",
-                    "status_code": status_code
-                }
+            return self._streaming_error(status_code, str(e), response_text)
         except Exception as e:
             print(f"❌ Error creating streaming avatar: {e}")
-            return {
-                "error": str(e),
-                "hint": "The video avatar feature requires a HeyGen account with Streaming API access. This feature is optional."
-            }
+            return self._streaming_failure(e)
     
     def streaming_avatar_speak(
         self,
@@ -280,7 +244,7 @@ class HeyGenService:
         }
         
         try:
-            response = requests.post(url, json=payload, headers=self.headers)
+            response = self.session.post(url, json=payload)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -304,7 +268,7 @@ class HeyGenService:
         }
         
         try:
-            response = requests.post(url, json=payload, headers=self.headers)
+            response = self.session.post(url, json=payload)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -328,12 +292,138 @@ class HeyGenService:
         }
         
         try:
-            response = requests.post(url, json=payload, headers=self.headers)
+            response = self.session.post(url, json=payload)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            print(f"Error getting ICE servers: {e}")
+            return {"error": str(e)}
+    
+    # Async streaming operations (for the ASGI app)
+    
+    async def acreate_streaming_avatar(
+        self,
+        avatar_id: Optional[str] = None,
+        voice_id: Optional[str] = None,
+        quality: str = "low"
+    ) -> Dict[str, Any]:
+        """Async version of create_streaming_avatar."""
+        url = "https://api.heygen.com/v1/streaming.new"
+        payload = self._streaming_payload(avatar_id, voice_id, quality)
+        
+        try:
+            print(f"🎬 Attempting to create HeyGen streaming session at: {url}")
+            response = await self.async_clients.get().post(url, json=payload)
+            response.raise_for_status()
+            print(f"✅ HeyGen streaming session created successfully")
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            return self._streaming_error(e.response.status_code, str(e), e.response.text)
+        except Exception as e:
+            print(f"❌ Error creating streaming avatar: {e}")
+            return self._streaming_failure(e)
+    
+    async def astreaming_avatar_speak(self, session_id: str, text: str, task_type: str = "talk") -> Dict[str, Any]:
+        """Async version of streaming_avatar_speak."""
+        payload = {
+            "session_id": session_id,
+            "text": text,
+            "task_type": task_type
+        }
+        
+        try:
+            response = await self.async_clients.get().post("https://api.heygen.com/v1/streaming.task", json=payload)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            print(f"Error making avatar speak: {e}")
+            return {"error": str(e)}
+    
+    async def astop_streaming_avatar(self, session_id: str) -> Dict[str, Any]:
+        """Async version of stop_streaming_avatar."""
+        try:
+            response = await self.async_clients.get().post(
+                "https://api.heygen.com/v1/streaming.stop", json={"session_id": session_id}
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            print(f"Error stopping streaming avatar: {e}")
+            return {"error": str(e)}
+    
+    async def aget_streaming_ice_servers(self, session_id: str) -> Dict[str, Any]:
+        """Async version of get_streaming_ice_servers."""
+        try:
+            response = await self.async_clients.get().post(
+                "https://api.heygen.com/v1/streaming.ice", json={"session_id": session_id}
+            )
             response.raise_for_status()
             return response.json()
         except Exception as e:
             print(f"Error getting ICE servers: {e}")
             return {"error": str(e)}
+    
+    # Helper methods
+    
+    def _streaming_payload(
+        self,
+        avatar_id: Optional[str],
+        voice_id: Optional[str],
+        quality: str
+    ) -> Dict[str, Any]:
+        """Request body for creating a streaming session."""
+        avatar_id = avatar_id or self.avatar_id
+        
+        payload = {
+            "quality": quality,
+        }
+        
+        # Only add avatar_id if it's configured and not the placeholder
+        if avatar_id and avatar_id != "your-avatar-id":
+            payload["avatar_id"] = avatar_id
+        
+        if voice_id:
+            payload["voice_id"] = voice_id
+        
+        return payload
+    
+    @staticmethod
+    def _streaming_error(status_code: Optional[int], error_msg: str, response_text: str) -> Dict[str, Any]:
+        """Error result for an HTTP error from the streaming API."""
+        print(f"❌ HeyGen API Error ({status_code}): {error_msg}")
+        print(f"   Response: {response_text}")
+        
+        # Provide helpful error messages
+        if status_code == 404:
+            return {
+                "error": "HeyGen Streaming API endpoint not found. This feature may require a HeyGen Enterprise account or the API structure may have changed.",
+                "hint": "The video avatar feature is optional. You can use voice chat instead.",
+                "status_code": 404
+            }
+        elif status_code == 401 or status_code == 403:
+            return {
+                "error": "HeyGen API authentication failed. Please check your HEYGEN_API_KEY in .env",
+                "hint": "Make sure your HeyGen account has access to the Streaming API feature.",
+                "status_code": status_code
+            }
+        elif status_code == 429:
+            return {
+                "error": "HeyGen API rate limit exceeded. Please wait and try again.",
+                "status_code": 429
+            }
+        else:
+            return {
+                "error": f"HeyGen API error: {error_msg}",
+                "status_code": status_code
+            }
+    
+    @staticmethod
+    def _streaming_failure(error: Exception) -> Dict[str, Any]:
+        """Error result for a streaming session that could not be created."""
+        return {
+            "error": str(error),
+            "hint": "The video avatar feature requires a HeyGen account with Streaming API access. This feature is optional."
+        }
 
 
 class StreamingAvatarSession:
@@ -346,6 +436,23 @@ class StreamingAvatarSession:
         self.is_active = False
         self.avatar_id: Optional[str] = None
     
+    def to_state(self) -> Dict[str, Any]:
+        """JSON-serializable state, for the session registry."""
+        return {
+            "session_id": self.session_id,
+            "avatar_id": self.avatar_id,
+            "is_active": self.is_active
+        }
+    
+    @classmethod
+    def from_state(cls, heygen_service: HeyGenService, state: Dict[str, Any]) -> "StreamingAvatarSession":
+        """Rebuild a session wrapper from to_state() output (possibly from another worker)."""
+        session = cls(heygen_service)
+        session.session_id = state.get("session_id")
+        session.avatar_id = state.get("avatar_id")
+        session.is_active = state.get("is_active", False)
+        return session
+    
     def start(
         self,
         avatar_id: Optional[str] = None,
@@ -369,11 +476,23 @@ class StreamingAvatarSession:
             quality=quality
         )
         
-        if "error" not in result:
-            self.session_id = result.get("data", {}).get("session_id")
-            self.avatar_id = avatar_id
-            self.is_active = True
+        self._started(result, avatar_id)
+        return result
+    
+    async def astart(
+        self,
+        avatar_id: Optional[str] = None,
+        voice_id: Optional[str] = None,
+        quality: str = "low"
+    ) -> Dict[str, Any]:
+        """Async version of start."""
+        result = await self.heygen_service.acreate_streaming_avatar(
+            avatar_id=avatar_id,
+            voice_id=voice_id,
+            quality=quality
+        )
         
+        self._started(result, avatar_id)
         return result
     
     def speak(self, text: str) -> Dict[str, Any]:
@@ -393,10 +512,27 @@ class StreamingAvatarSession:
         
         result = self.heygen_service.stop_streaming_avatar(self.session_id)
         
-        self.is_active = False
-        self.session_id = None
-        self.avatar_id = None
+        self._stopped()
+        return result
+    
+    async def aspeak(self, text: str) -> Dict[str, Any]:
+        """Async version of speak."""
+        if not self.is_active or not self.session_id:
+            return {"error": "Session is not active"}
+        
+        return await self.heygen_service.astreaming_avatar_speak(
+            session_id=self.session_id,
+            text=text
+        )
+    
+    async def astop(self) -> Dict[str, Any]:
+        """Async version of stop."""
+        if not self.is_active or not self.session_id:
+            return {"error": "Session is not active"}
+        
+        result = await self.heygen_service.astop_streaming_avatar(self.session_id)
         
+        self._stopped()
         return result
     
     def get_ice_servers(self) -> Dict[str, Any]:
@@ -405,6 +541,28 @@ class StreamingAvatarSession:
             return {"error": "Session is not active"}
         
         return self.heygen_service.get_streaming_ice_servers(self.session_id)
+    
+    async def aget_ice_servers(self) -> Dict[str, Any]:
+        """Async version of get_ice_servers."""
+        if not self.is_active or not self.session_id:
+            return {"error": "Session is not active"}
+        
+        return await self.heygen_service.aget_streaming_ice_servers(self.session_id)
+    
+    # Helper methods
+    
+    def _started(self, result: Dict[str, Any], avatar_id: Optional[str]):
+        """Record a successful start."""
+        if "error" not in result:
+            self.session_id = result.get("data", {}).get("session_id")
+            self.avatar_id = avatar_id
+            self.is_active = True
+    
+    def _stopped(self):
+        """Forget the stopped session."""
+        self.is_active = False
+        self.session_id = None
+        self.avatar_id = None
 
 
 # Global service instance
@@ -0,0 +1,141 @@
+"""Shared HTTP sessions with keep-alive connection pools and default timeouts."""
+import asyncio
+import inspect
+import weakref
+from typing import Callable, Dict, Generic, Optional, Tuple, TypeVar, Union
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+
+
+T = TypeVar("T")
+
+
+class PooledSession(requests.Session):
+    """requests.Session that applies a default timeout to every request."""
+    
+    def __init__(self, timeout: Union[float, Tuple[float, float]]):
+        """
+        Initialize the session.
+        
+        Args:
+            timeout: Default (connect, read) timeout in seconds, used when a
+                request does not pass its own
+        """
+        super().__init__()
+        self.timeout = timeout
+    
+    def request(self, method, url, **kwargs):
+        """Send a request, adding the default timeout if none was given."""
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def create_session(
+    headers: Optional[Dict[str, str]] = None,
+    pool_maxsize: Optional[int] = None,
+    connect_timeout: Optional[float] = None,
+    read_timeout: Optional[float] = None,
+) -> PooledSession:
+    """
+    Create a session that keeps connections to each host open between calls.
+    
+    Reusing a session skips the TCP and TLS handshake on every request after
+    the first. Sessions are safe to share between request threads for the
+    simple calls the services make.
+    
+    Args:
+        headers: Headers sent with every request (e.g. precomputed auth)
+        pool_maxsize: Open connections kept per host (defaults to HTTP_POOL_MAXSIZE)
+        connect_timeout: Seconds to wait for a connection (defaults to HTTP_CONNECT_TIMEOUT)
+        read_timeout: Seconds to wait for response data (defaults to HTTP_READ_TIMEOUT)
+    
+    Returns:
+        Configured session
+    """
+    session = PooledSession(timeout=(
+        connect_timeout if connect_timeout is not None else Config.HTTP_CONNECT_TIMEOUT,
+        read_timeout if read_timeout is not None else Config.HTTP_READ_TIMEOUT,
+    ))
+    
+    maxsize = pool_maxsize or Config.HTTP_POOL_MAXSIZE
+    # Each service talks to one or two hosts, so only a few per-host pools are needed
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=maxsize, pool_block=False)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+def create_async_client(
+    headers: Optional[Dict[str, str]] = None,
+    max_connections: Optional[int] = None,
+    connect_timeout: Optional[float] = None,
+    read_timeout: Optional[float] = None,
+) -> httpx.AsyncClient:
+    """
+    Create the asyncio counterpart of create_session, with the same defaults.
+    
+    Args:
+        headers: Headers sent with every request
+        max_connections: Open connections kept (defaults to HTTP_POOL_MAXSIZE)
+        connect_timeout: Seconds to wait for a connection (defaults to HTTP_CONNECT_TIMEOUT)
+        read_timeout: Seconds to wait for response data (defaults to HTTP_READ_TIMEOUT)
+    
+    Returns:
+        Configured client; use it only from the event loop it was first used on
+    """
+    maxsize = max_connections or Config.HTTP_POOL_MAXSIZE
+    return httpx.AsyncClient(
+        headers=headers,
+        limits=httpx.Limits(max_connections=maxsize, max_keepalive_connections=maxsize),
+        timeout=httpx.Timeout(
+            read_timeout if read_timeout is not None else Config.HTTP_READ_TIMEOUT,
+            connect=connect_timeout if connect_timeout is not None else Config.HTTP_CONNECT_TIMEOUT,
+        ),
+    )
+
+
+class PerLoop(Generic[T]):
+    """
+    Lazily creates one async client per event loop.
+    
+    httpx connections belong to the event loop that opened them, so a client
+    must not be shared between loops (e.g. the server's loop and asyncio.run
+    in a script).
+    """
+    
+    def __init__(self, factory: Callable[[], T]):
+        """
+        Initialize the holder.
+        
+        Args:
+            factory: Creates a client; called from the loop that will use it
+        """
+        self.factory = factory
+        self._instances: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, T]" = weakref.WeakKeyDictionary()
+    
+    def get(self) -> T:
+        """Get the running loop's client, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        instance = self._instances.get(loop)
+        if instance is None:
+            instance = self._instances[loop] = self.factory()
+        return instance
+    
+    async def aclose(self):
+        """Close the running loop's client, if one was created."""
+        instance = self._instances.pop(asyncio.get_running_loop(), None)
+        if instance is None:
+            return
+        
+        close = getattr(instance, "aclose", None) or getattr(instance, "close", None)
+        if close is not None:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
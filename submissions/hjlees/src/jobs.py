@@ -0,0 +1,298 @@
+"""Background jobs for slow vendor calls (conversational AI start/stop)."""
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from change_feed import change_feed
+from config import Config
+from models import Job, JobStatus
+from serialization import dumps
+from sqlite_util import ThreadConnections
+
+
+class SQLiteJobStore:
+    """
+    Job status kept in a SQLite file, so any worker process can answer a poll.
+    
+    Jobs still run in the worker that accepted them. The store shares their
+    status, and each pending or running job holds a claim on its (kind, key)
+    so that no other worker starts the same job while it is in flight.
+    """
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        job TEXT NOT NULL,
+        done INTEGER NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs (updated_at);
+    
+    CREATE TABLE IF NOT EXISTS job_claims (
+        kind TEXT NOT NULL,
+        key TEXT NOT NULL,
+        job_id TEXT NOT NULL,
+        claimed_at REAL NOT NULL,
+        PRIMARY KEY (kind, key)
+    );
+    """
+    
+    def __init__(
+        self,
+        path: str = "jobs.db",
+        retention_seconds: float = 600,
+        claim_seconds: float = 300,
+        busy_timeout_ms: int = 5000,
+    ):
+        """
+        Open (and create if needed) the store.
+        
+        Args:
+            path: Database file shared by all workers, or ":memory:" for a
+                store private to this process
+            retention_seconds: How long finished jobs are kept
+            claim_seconds: Age after which the claim of an unfinished job
+                lapses (its worker is assumed to have died)
+            busy_timeout_ms: How long a writer waits for another worker's lock
+        """
+        self.retention_seconds = retention_seconds
+        self.claim_seconds = claim_seconds
+        self._connection = ThreadConnections(path, "jobs", busy_timeout_ms, schema=self.SCHEMA)
+    
+    def save(self, job: Job):
+        """Insert or update a job and delete expired finished ones."""
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, job, done, updated_at) VALUES (?, ?, ?, ?)",
+                (job.id, job.model_dump_json(), int(job.done), now),
+            )
+            conn.execute("DELETE FROM jobs WHERE done = 1 AND updated_at < ?", (now - self.retention_seconds,))
+    
+    def claim(self, job: Job) -> Optional[Job]:
+        """
+        Save a new job and claim its (kind, key), unless another job holds it.
+        
+        Args:
+            job: The pending job
+        
+        Returns:
+            None if the claim was taken, otherwise the job in flight that holds it
+        """
+        now = time.time()
+        with self._connection() as conn:
+            # Claims of finished, forgotten or abandoned jobs no longer count
+            conn.execute(
+                "DELETE FROM job_claims WHERE kind = ? AND key = ? AND (claimed_at < ?"
+                " OR job_id NOT IN (SELECT id FROM jobs WHERE done = 0))",
+                (job.kind, job.key, now - self.claim_seconds),
+            )
+            try:
+                conn.execute(
+                    "INSERT INTO job_claims (kind, key, job_id, claimed_at) VALUES (?, ?, ?, ?)",
+                    (job.kind, job.key, job.id, now),
+                )
+            except sqlite3.IntegrityError:
+                # In flight on another worker (or another thread of this one)
+                job_id = conn.execute(
+                    "SELECT job_id FROM job_claims WHERE kind = ? AND key = ?", (job.kind, job.key)
+                ).fetchone()[0]
+                row = conn.execute("SELECT job FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                return Job.model_validate_json(row[0])
+            
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, job, done, updated_at) VALUES (?, ?, ?, ?)",
+                (job.id, job.model_dump_json(), int(job.done), now),
+            )
+        return None
+    
+    def release(self, job: Job):
+        """Drop a finished job's claim."""
+        with self._connection() as conn:
+            conn.execute(
+                "DELETE FROM job_claims WHERE kind = ? AND key = ? AND job_id = ?", (job.kind, job.key, job.id)
+            )
+    
+    def load(self, job_id: str) -> Optional[Job]:
+        """Get a job by ID."""
+        row = self._connection().execute("SELECT job FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.model_validate_json(row[0]) if row else None
+
+
+class JobRunner:
+    """
+    Runs jobs on a small thread pool so request threads return immediately.
+    
+    Jobs are idempotent per (kind, key): submitting a job while an identical
+    one is pending or running returns the existing job (across worker
+    processes too, with a shared store). Jobs on the same key
+    (e.g. a start and a stop for one channel) run one at a time.
+    """
+    
+    def __init__(
+        self,
+        max_workers: int = 4,
+        retention_seconds: float = 600,
+        store: Optional[SQLiteJobStore] = None,
+    ):
+        """
+        Initialize the runner.
+        
+        Args:
+            max_workers: Jobs run concurrently
+            retention_seconds: How long finished jobs stay available for polling
+            store: Shared store that job status is also written to, for polls
+                reaching another worker process (None keeps it in this process)
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.retention_seconds = retention_seconds
+        self.store = store
+        self.jobs: Dict[str, Job] = {}
+        # (kind, key) -> ID of the pending or running job
+        self.active: Dict[Tuple[str, str], str] = {}
+        # key -> lock that jobs on the key run under, and the number of unfinished
+        # jobs using it (the entry is dropped when the last one finishes)
+        self.key_locks: Dict[str, threading.Lock] = {}
+        self.key_jobs: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        # Called with a copy of the job whenever its status changes
+        self.listeners: List[Callable[[Job], None]] = []
+    
+    def add_listener(self, listener: Callable[[Job], None]):
+        """Call listener with a copy of each job whenever it changes status."""
+        self.listeners.append(listener)
+    
+    def submit(self, kind: str, key: str, func: Callable[[], Dict[str, Any]]) -> Tuple[Job, bool]:
+        """
+        Run func in the background, unless the same job is already in flight.
+        
+        Args:
+            kind: Job kind (e.g. "start")
+            key: What the job acts on (e.g. the channel name)
+            func: Does the work; returns a result dict, which counts as a
+                failure if it has an "error" key
+        
+        Returns:
+            Tuple of (job, created); created is False if an in-flight job was returned
+        """
+        # Checked and registered under one hold of the lock, so two concurrent
+        # submits in this process always get the same job
+        with self.lock:
+            self._purge()
+            
+            existing_id = self.active.get((kind, key))
+            if existing_id is not None:
+                return self.jobs[existing_id].model_copy(), False
+            
+            job = Job(kind=kind, key=key)
+            if self.store is not None:
+                # The shared claim also catches the same job submitted to another worker
+                existing = self.store.claim(job)
+                if existing is not None:
+                    return existing, False
+            
+            self.jobs[job.id] = job
+            self.active[(kind, key)] = job.id
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+            self.key_jobs[key] = self.key_jobs.get(key, 0) + 1
+            snapshot = job.model_copy()
+        
+        self.executor.submit(self._run, job, func, key_lock)
+        return snapshot, True
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get a copy of a job by ID, looking in the shared store for other workers' jobs."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                return job.model_copy()
+        
+        return self.store.load(job_id) if self.store is not None else None
+    
+    def active_job(self, kind: str, key: str) -> Optional[Job]:
+        """Get a copy of the pending or running job of a kind on a key, if any."""
+        with self.lock:
+            job_id = self.active.get((kind, key))
+            return self.jobs[job_id].model_copy() if job_id is not None else None
+    
+    # Helper methods
+    
+    def _run(self, job: Job, func: Callable[[], Dict[str, Any]], key_lock: threading.Lock):
+        """Run a job, holding its key's lock so jobs on the same key do not overlap."""
+        try:
+            with key_lock:
+                self._update(job, status=JobStatus.RUNNING)
+                try:
+                    result = func()
+                    if isinstance(result, dict) and "error" in result:
+                        self._update(job, status=JobStatus.FAILED, result=result, error=str(result["error"]))
+                    else:
+                        self._update(job, status=JobStatus.SUCCEEDED, result=result)
+                except Exception as e:
+                    print(f"❌ Job {job.kind} {job.key} failed: {e}")
+                    self._update(job, status=JobStatus.FAILED, error=str(e))
+        finally:
+            with self.lock:
+                self.key_jobs[job.key] -= 1
+                if not self.key_jobs[job.key]:
+                    del self.key_jobs[job.key]
+                    del self.key_locks[job.key]
+    
+    def _update(self, job: Job, **changes):
+        """Apply changes to a job and notify listeners."""
+        with self.lock:
+            for field, value in changes.items():
+                setattr(job, field, value)
+            job.updated_at = datetime.utcnow()
+            if job.done and self.active.get((job.kind, job.key)) == job.id:
+                del self.active[(job.kind, job.key)]
+            snapshot = job.model_copy()
+        
+        if self.store is not None:
+            try:
+                self.store.save(snapshot)
+                if snapshot.done:
+                    self.store.release(snapshot)
+            except Exception as e:
+                print(f"Error saving job {job.id}: {e}")
+        
+        for listener in self.listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f"Error notifying job listener: {e}")
+    
+    def _purge(self):
+        """Forget finished jobs older than retention_seconds (caller holds the lock)."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention_seconds)
+        expired = [job_id for job_id, job in self.jobs.items() if job.done and job.updated_at < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+
+def publish_job(job: Job):
+    """Push a job update to /api/events subscribers."""
+    change_feed.publish(dumps({"job": job.model_dump(mode="json")}).decode("utf-8"))
+
+
+def create_job_store() -> Optional[SQLiteJobStore]:
+    """Create the job store selected by Config.JOB_STORE."""
+    if Config.JOB_STORE == "sqlite":
+        return SQLiteJobStore(
+            Config.JOB_DB_PATH,
+            retention_seconds=Config.JOB_RETENTION_SECONDS,
+            claim_seconds=Config.JOB_CLAIM_SECONDS
+        )
+    return None
+
+
+# Global job runner instance
+job_runner = JobRunner(
+    max_workers=Config.JOB_WORKERS,
+    retention_seconds=Config.JOB_RETENTION_SECONDS,
+    store=create_job_store()
+)
+job_runner.add_listener(publish_job)
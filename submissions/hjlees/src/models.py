@@ -1,10 +1,12 @@
 """Data models for the application."""
 from enum import Enum
-from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, Field
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Union, Dict, Any
+from pydantic import BaseModel, Field, field_validator
 from uuid import UUID, uuid4
 
+from search_index import normalize
+
 
 class TodoPriority(str, Enum):
     """Todo priority levels."""
@@ -34,6 +36,114 @@ class Todo(BaseModel):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+# Priorities from lowest to highest
+PRIORITY_ORDER = [TodoPriority.LOW, TodoPriority.MEDIUM, TodoPriority.HIGH, TodoPriority.URGENT]
+
+
+class TodoSortField(str, Enum):
+    """Fields todos can be sorted by."""
+    CREATED_AT = "created_at"
+    UPDATED_AT = "updated_at"
+    DUE_DATE = "due_date"
+    PRIORITY = "priority"
+    TITLE = "title"
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Normalize a datetime to naive UTC, the form stored datetimes use.
+    
+    Args:
+        value: A naive (assumed UTC) or timezone-aware datetime, or None
+    
+    Returns:
+        The same instant as a naive UTC datetime (None stays None)
+    """
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class TodoFilter(BaseModel):
+    """Filter and sort options for listing todos."""
+    completed: Optional[bool] = None
+    min_priority: Optional[TodoPriority] = None
+    due_after: Optional[datetime] = None  # inclusive
+    due_before: Optional[datetime] = None  # exclusive
+    search: Optional[str] = None
+    sort_by: TodoSortField = TodoSortField.CREATED_AT
+    descending: bool = True
+    
+    @field_validator("due_after", "due_before")
+    @classmethod
+    def _normalize_due_bounds(cls, value: Optional[datetime]) -> Optional[datetime]:
+        """Compare due dates as naive UTC, whatever offset the query used."""
+        return naive_utc(value)
+    
+    @classmethod
+    def for_view(cls, view: str, now: Optional[datetime] = None) -> "TodoFilter":
+        """
+        Build the filter for a named view.
+        
+        Args:
+            view: One of "today", "overdue", "upcoming", "important"
+            now: Reference time (defaults to the current local time)
+        """
+        now = now or datetime.now()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        if view == "today":
+            return cls(completed=False, due_after=today, due_before=today + timedelta(days=1),
+                       sort_by=TodoSortField.DUE_DATE, descending=False)
+        if view == "overdue":
+            return cls(completed=False, due_before=today,
+                       sort_by=TodoSortField.DUE_DATE, descending=False)
+        if view == "upcoming":
+            return cls(completed=False, due_after=today + timedelta(days=1), due_before=today + timedelta(days=8),
+                       sort_by=TodoSortField.DUE_DATE, descending=False)
+        if view == "important":
+            return cls(completed=False, min_priority=TodoPriority.HIGH, sort_by=TodoSortField.PRIORITY)
+        raise ValueError(f"Unknown view '{view}'")
+    
+    def priorities(self) -> Optional[List[TodoPriority]]:
+        """Priorities allowed by min_priority, or None for all."""
+        if self.min_priority is None:
+            return None
+        return PRIORITY_ORDER[PRIORITY_ORDER.index(self.min_priority):]
+    
+    def matches(self, todo: "Todo") -> bool:
+        """Whether a todo passes this filter (for in-memory filtering)."""
+        if self.completed is not None and todo.completed != self.completed:
+            return False
+        priorities = self.priorities()
+        if priorities is not None and todo.priority not in priorities:
+            return False
+        due_date = naive_utc(todo.due_date)
+        if self.due_after is not None and (due_date is None or due_date < self.due_after):
+            return False
+        if self.due_before is not None and (due_date is None or due_date >= self.due_before):
+            return False
+        if self.search:
+            words = normalize(todo.title).split()
+            for token in normalize(self.search).split():
+                if not any(word.startswith(token) for word in words):
+                    return False
+        return True
+    
+    def sort(self, todos: List["Todo"]) -> List["Todo"]:
+        """Sort todos by this filter's sort options (todos without a due date go last)."""
+        if self.sort_by == TodoSortField.PRIORITY:
+            key = lambda todo: PRIORITY_ORDER.index(todo.priority)
+        elif self.sort_by == TodoSortField.TITLE:
+            key = lambda todo: todo.title.lower()
+        elif self.sort_by == TodoSortField.DUE_DATE:
+            with_date = sorted((t for t in todos if t.due_date), key=lambda todo: naive_utc(todo.due_date), reverse=self.descending)
+            return with_date + [t for t in todos if not t.due_date]
+        else:
+            key = lambda todo: getattr(todo, self.sort_by.value)
+        return sorted(todos, key=key, reverse=self.descending)
+
+
 class Reminder(BaseModel):
     """Reminder model."""
     id: str = Field(default_factory=lambda: str(uuid4()))
@@ -44,6 +154,15 @@ class Reminder(BaseModel):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class BatchItemResult(BaseModel):
+    """Outcome of one item in a bulk operation."""
+    index: int  # position of the item in the request
+    success: bool
+    id: Optional[str] = None
+    error: Optional[str] = None
+    item: Optional[Union[Todo, Reminder]] = None
+
+
 class ConversationMessage(BaseModel):
     """Conversation message model."""
     role: str  # "user" or "assistant"
@@ -58,3 +177,27 @@ class AgoraToken(BaseModel):
     uid: int
     expires_in: int  # seconds
 
+
+class JobStatus(str, Enum):
+    """Background job states."""
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job(BaseModel):
+    """Background job (e.g. starting or stopping a conversational AI agent)."""
+    id: str = Field(default_factory=lambda: uuid4().hex)
+    kind: str  # e.g. "start" or "stop"
+    key: str  # what the job acts on (channel name); one active job per kind and key
+    status: JobStatus = JobStatus.PENDING
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    @property
+    def done(self) -> bool:
+        """Whether the job has finished, successfully or not."""
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
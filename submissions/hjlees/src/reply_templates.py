@@ -0,0 +1,73 @@
+"""Spoken reply templates for simple tool calls (skips the second LLM completion)."""
+import re
+from typing import List, Dict, Any, Optional, Tuple
+
+
+# Tool result patterns that are safe to turn into a reply without the LLM.
+# Anything else (errors, "not found", ambiguous matches) goes back to Groq.
+RESULT_PATTERNS = {
+    "create_todo": re.compile(r"^Created todo: (?P<title>.+) \(Priority: (?P<priority>\w+)\)$"),
+    "complete_todo": re.compile(r"^Completed todo: (?P<title>.+)$"),
+    "delete_todo": re.compile(r"^(?:Deleted todo: (?P<title>.+)|Todo deleted successfully)$"),
+    "delete_reminder": re.compile(r"^Reminder deleted successfully$"),
+}
+
+
+def _join(items: List[str]) -> str:
+    """Join items for speech: "a", "a and b", "a, b and c"."""
+    if len(items) == 1:
+        return items[0]
+    return f"{', '.join(items[:-1])} and {items[-1]}"
+
+
+def build_fast_reply(calls: List[Tuple[str, Dict[str, Any], str]]) -> Optional[str]:
+    """
+    Build a spoken reply for a turn that only ran simple mutations.
+    
+    Args:
+        calls: (function_name, function_args, function_response) tuples in call order
+    
+    Returns:
+        The reply text, or None if any call is not eligible for the fast path
+    """
+    if not calls:
+        return None
+    
+    grouped: Dict[str, List[Tuple[Dict[str, Any], Dict[str, str]]]] = {}
+    for function_name, function_args, function_response in calls:
+        pattern = RESULT_PATTERNS.get(function_name)
+        match = pattern.match(function_response or "") if pattern else None
+        if not match:
+            return None
+        grouped.setdefault(function_name, []).append((function_args, match.groupdict()))
+    
+    sentences = []
+    
+    created = grouped.get("create_todo", [])
+    if len(created) == 1:
+        fields = created[0][1]
+        sentences.append(f"Got it, I added {fields['title']} to your todos with {fields['priority']} priority.")
+    elif created:
+        sentences.append(f"Got it, I added {_join([fields['title'] for _, fields in created])} to your todos.")
+    
+    completed = grouped.get("complete_todo", [])
+    if completed:
+        sentences.append(f"Nice work, I marked {_join([fields['title'] for _, fields in completed])} as done.")
+    
+    deleted = grouped.get("delete_todo", [])
+    if deleted:
+        titles = [fields["title"] for _, fields in deleted if fields.get("title")]
+        if len(titles) == len(deleted):
+            sentences.append(f"Done, I deleted {_join(titles)} from your todos.")
+        elif len(deleted) == 1:
+            sentences.append("Done, I deleted that todo.")
+        else:
+            sentences.append(f"Done, I deleted {len(deleted)} todos.")
+    
+    deleted_reminders = grouped.get("delete_reminder", [])
+    if len(deleted_reminders) == 1:
+        sentences.append("Done, I deleted that reminder.")
+    elif deleted_reminders:
+        sentences.append(f"Done, I deleted {len(deleted_reminders)} reminders.")
+    
+    return " ".join(sentences)
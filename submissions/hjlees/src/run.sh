@@ -74,6 +74,10 @@ echo ""
 echo "Press Ctrl+C to stop the server"
 echo ""
 
-# Run the application
-python app.py
+# Run the application (PRODUCTION=1 ./run.sh starts the multi-worker server)
+if [ -n "$PRODUCTION" ]; then
+    gunicorn -c gunicorn.conf.py wsgi:app
+else
+    python app.py
+fi
 
@@ -0,0 +1,116 @@
+"""In-memory inverted index for looking up todos and reminders by spoken text."""
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Set, Tuple
+
+
+NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def normalize(text: str) -> str:
+    """Normalize text for matching: lowercase, no accents or punctuation, single spaces."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = NON_WORD.sub(" ", text.lower())
+    return " ".join(text.split())
+
+
+class TextIndex:
+    """Token inverted index with prefix lookups and ranked matches."""
+    
+    def __init__(self):
+        """Initialize an empty index."""
+        self.texts: Dict[str, str] = {}
+        self.postings: Dict[str, Set[str]] = {}
+        # Sorted tokens, so prefix lookups are a binary search
+        self.vocabulary: List[str] = []
+    
+    def __len__(self) -> int:
+        """Number of indexed documents."""
+        return len(self.texts)
+    
+    def add(self, doc_id: str, text: str):
+        """Index (or re-index) a document's text."""
+        self.remove(doc_id)
+        
+        normalized = normalize(text)
+        self.texts[doc_id] = normalized
+        
+        for token in set(normalized.split()):
+            ids = self.postings.get(token)
+            if ids is None:
+                ids = self.postings[token] = set()
+                insort(self.vocabulary, token)
+            ids.add(doc_id)
+    
+    def remove(self, doc_id: str):
+        """Remove a document from the index."""
+        normalized = self.texts.pop(doc_id, None)
+        if normalized is None:
+            return
+        
+        for token in set(normalized.split()):
+            ids = self.postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(doc_id)
+            if not ids:
+                del self.postings[token]
+                del self.vocabulary[bisect_left(self.vocabulary, token)]
+    
+    def clear(self):
+        """Remove all documents."""
+        self.texts.clear()
+        self.postings.clear()
+        self.vocabulary.clear()
+    
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Find documents containing every query token (as a word or word prefix).
+        
+        Args:
+            query: Text to look for, e.g. a spoken todo title
+            limit: Maximum number of matches to return
+        
+        Returns:
+            (doc_id, score) pairs, best match first. Exact matches score
+            highest, then matches containing the whole phrase, then matches
+            that only contain each token; closer lengths break ties.
+        """
+        normalized = normalize(query)
+        tokens = normalized.split()
+        if not tokens:
+            return []
+        
+        candidates: Optional[Set[str]] = None
+        # Longer tokens usually match fewer documents, so start with them
+        for token in sorted(set(tokens), key=len, reverse=True):
+            ids = self._prefix_ids(token)
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+        
+        scored = []
+        for doc_id in candidates:
+            text = self.texts[doc_id]
+            if text == normalized:
+                score = 3.0
+            elif normalized in text:
+                score = 2.0
+            else:
+                score = 1.0
+            score += len(normalized) / max(len(text), 1)
+            scored.append((doc_id, score))
+        
+        scored.sort(key=lambda match: match[1], reverse=True)
+        return scored[:limit] if limit else scored
+    
+    def _prefix_ids(self, prefix: str) -> Set[str]:
+        """IDs of documents with a token starting with prefix."""
+        ids: Set[str] = set()
+        i = bisect_left(self.vocabulary, prefix)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(prefix):
+            ids |= self.postings[self.vocabulary[i]]
+            i += 1
+        return ids
@@ -0,0 +1,325 @@
+"""Registry of live Agora agent and HeyGen avatar sessions, with idle reaping."""
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import Config
+from sqlite_util import ThreadConnections
+
+
+class SessionStore(ABC):
+    """Where session state is kept: in this process or shared between workers."""
+    
+    @abstractmethod
+    def put(self, kind: str, key: str, state: Dict[str, Any], now: float):
+        """Insert or replace a session."""
+    
+    @abstractmethod
+    def get(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        """Get a session's state."""
+    
+    @abstractmethod
+    def touch(self, kind: str, key: str, now: float) -> bool:
+        """Record activity on a session. Returns False if it does not exist."""
+    
+    @abstractmethod
+    def remove(self, kind: str, key: str) -> bool:
+        """Remove a session. Returns False if it was already gone."""
+    
+    @abstractmethod
+    def remove_idle(self, kind: str, key: str, cutoff: float) -> bool:
+        """Remove a session only if it has had no activity since cutoff. Returns False otherwise."""
+    
+    @abstractmethod
+    def idle(self, cutoff: float) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """Sessions with no activity since cutoff, as (kind, key, state)."""
+    
+    @abstractmethod
+    def count(self, kind: str) -> int:
+        """Number of sessions of a kind."""
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions kept in this process; lost on restart and not shared between workers."""
+    
+    def __init__(self):
+        """Initialize an empty store."""
+        # (kind, key) -> (state, last_active)
+        self.sessions: Dict[Tuple[str, str], Tuple[Dict[str, Any], float]] = {}
+        self.lock = threading.Lock()
+    
+    def put(self, kind: str, key: str, state: Dict[str, Any], now: float):
+        """Insert or replace a session."""
+        with self.lock:
+            self.sessions[(kind, key)] = (state, now)
+    
+    def get(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        """Get a session's state."""
+        with self.lock:
+            entry = self.sessions.get((kind, key))
+            return entry[0] if entry else None
+    
+    def touch(self, kind: str, key: str, now: float) -> bool:
+        """Record activity on a session."""
+        with self.lock:
+            entry = self.sessions.get((kind, key))
+            if entry is None:
+                return False
+            self.sessions[(kind, key)] = (entry[0], now)
+            return True
+    
+    def remove(self, kind: str, key: str) -> bool:
+        """Remove a session."""
+        with self.lock:
+            return self.sessions.pop((kind, key), None) is not None
+    
+    def remove_idle(self, kind: str, key: str, cutoff: float) -> bool:
+        """Remove a session if it is still idle."""
+        with self.lock:
+            entry = self.sessions.get((kind, key))
+            if entry is None or entry[1] >= cutoff:
+                return False
+            del self.sessions[(kind, key)]
+            return True
+    
+    def idle(self, cutoff: float) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """Sessions with no activity since cutoff."""
+        with self.lock:
+            return [
+                (kind, key, state)
+                for (kind, key), (state, last_active) in self.sessions.items()
+                if last_active < cutoff
+            ]
+    
+    def count(self, kind: str) -> int:
+        """Number of sessions of a kind."""
+        with self.lock:
+            return sum(1 for session_kind, _ in self.sessions if session_kind == kind)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions kept in a SQLite file, surviving restarts and shared by every worker using it."""
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sessions (
+        kind TEXT NOT NULL,
+        key TEXT NOT NULL,
+        state TEXT NOT NULL,
+        last_active REAL NOT NULL,
+        PRIMARY KEY (kind, key)
+    );
+    CREATE INDEX IF NOT EXISTS idx_sessions_last_active ON sessions (last_active);
+    """
+    
+    def __init__(self, path: str = "sessions.db", busy_timeout_ms: int = 5000):
+        """
+        Open (and create if needed) the store.
+        
+        Args:
+            path: Database file, or ":memory:" for a store private to this process
+            busy_timeout_ms: How long a writer waits for another worker's lock
+        """
+        self._connection = ThreadConnections(path, "sessions", busy_timeout_ms, schema=self.SCHEMA)
+    
+    def put(self, kind: str, key: str, state: Dict[str, Any], now: float):
+        """Insert or replace a session."""
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (kind, key, state, last_active) VALUES (?, ?, ?, ?)",
+                (kind, key, json.dumps(state), now),
+            )
+    
+    def get(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        """Get a session's state."""
+        row = self._connection().execute(
+            "SELECT state FROM sessions WHERE kind = ? AND key = ?", (kind, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def touch(self, kind: str, key: str, now: float) -> bool:
+        """Record activity on a session."""
+        with self._connection() as conn:
+            return conn.execute(
+                "UPDATE sessions SET last_active = ? WHERE kind = ? AND key = ?", (now, kind, key)
+            ).rowcount > 0
+    
+    def remove(self, kind: str, key: str) -> bool:
+        """Remove a session; only one worker can remove (and so reap) a given session."""
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM sessions WHERE kind = ? AND key = ?", (kind, key)).rowcount > 0
+    
+    def remove_idle(self, kind: str, key: str, cutoff: float) -> bool:
+        """Remove a session if it is still idle; only one worker can claim it."""
+        with self._connection() as conn:
+            return conn.execute(
+                "DELETE FROM sessions WHERE kind = ? AND key = ? AND last_active < ?", (kind, key, cutoff)
+            ).rowcount > 0
+    
+    def idle(self, cutoff: float) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """Sessions with no activity since cutoff."""
+        rows = self._connection().execute(
+            "SELECT kind, key, state FROM sessions WHERE last_active < ?", (cutoff,)
+        ).fetchall()
+        return [(kind, key, json.loads(state)) for kind, key, state in rows]
+    
+    def count(self, kind: str) -> int:
+        """Number of sessions of a kind."""
+        return self._connection().execute("SELECT COUNT(*) FROM sessions WHERE kind = ?", (kind,)).fetchone()[0]
+
+
+class SessionRegistry:
+    """
+    Tracks live sessions by kind ("agora", "heygen") and key, with last activity.
+    
+    A background reaper stops sessions idle for longer than idle_seconds, so
+    remote agents do not keep running (and billing) after a client drops
+    without calling stop.
+    """
+    
+    def __init__(
+        self,
+        store: SessionStore,
+        idle_seconds: float = 1800,
+        reap_interval_seconds: float = 60,
+        max_stop_attempts: int = 5
+    ):
+        """
+        Initialize the registry.
+        
+        Args:
+            store: Where sessions are kept
+            idle_seconds: Inactivity after which a session is stopped (0 disables reaping)
+            reap_interval_seconds: How often the reaper looks for idle sessions
+            max_stop_attempts: Reaps that try to stop a session before it is given up on
+        """
+        self.store = store
+        self.idle_seconds = idle_seconds
+        self.reap_interval_seconds = reap_interval_seconds
+        self.max_stop_attempts = max_stop_attempts
+        # kind -> function that stops a session given its state
+        self.stoppers: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        # kind -> function that cleans up after a session whose stop was given up on
+        self.abandoners: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        self._reaper = None
+        self._lock = threading.Lock()
+    
+    def register_kind(
+        self,
+        kind: str,
+        stop: Callable[[Dict[str, Any]], Any],
+        abandon: Optional[Callable[[Dict[str, Any]], Any]] = None
+    ):
+        """
+        Set how idle sessions of a kind are stopped.
+        
+        Args:
+            kind: Session kind
+            stop: Stops a session given its state
+            abandon: Called with the state once stopping has failed
+                max_stop_attempts times (e.g. to free resources the session held)
+        """
+        self.stoppers[kind] = stop
+        if abandon is not None:
+            self.abandoners[kind] = abandon
+    
+    def put(self, kind: str, key: str, state: Dict[str, Any]):
+        """Add or update a session; counts as activity."""
+        self.store.put(kind, key, state, time.time())
+    
+    def get(self, kind: str, key: str, touch: bool = True) -> Optional[Dict[str, Any]]:
+        """Get a session's state, recording activity on it unless touch is False."""
+        state = self.store.get(kind, key)
+        if state is not None and touch:
+            self.store.touch(kind, key, time.time())
+        return state
+    
+    def touch(self, kind: str, key: str) -> bool:
+        """Record activity on a session. Returns False if it does not exist."""
+        return self.store.touch(kind, key, time.time())
+    
+    def remove(self, kind: str, key: str) -> bool:
+        """Forget a session after it was stopped."""
+        return self.store.remove(kind, key)
+    
+    def count(self, kind: str) -> int:
+        """Number of live sessions of a kind."""
+        return self.store.count(kind)
+    
+    def reap_idle(self) -> int:
+        """
+        Stop and forget every idle session.
+        
+        Returns:
+            Number of sessions reaped
+        """
+        reaped = 0
+        cutoff = time.time() - self.idle_seconds
+        for kind, key, state in self.store.idle(cutoff):
+            # Removing first claims the session, so two workers never stop it twice;
+            # a heartbeat since the idle query makes the claim fail
+            if not self.store.remove_idle(kind, key, cutoff):
+                continue
+            reaped += 1
+            
+            stop = self.stoppers.get(kind)
+            if stop is None:
+                continue
+            try:
+                print(f"🧹 Stopping idle {kind} session {key}")
+                result = stop(state)
+                if isinstance(result, dict) and "error" in result:
+                    raise RuntimeError(result["error"])
+            except Exception as e:
+                print(f"Error stopping idle {kind} session {key}: {e}")
+                self._retry_stop(kind, key, state)
+        return reaped
+    
+    def _retry_stop(self, kind: str, key: str, state: Dict[str, Any]):
+        """Put back a session whose stop failed, so the next reap tries again."""
+        attempts = state.get("stop_attempts", 0) + 1
+        if attempts >= self.max_stop_attempts:
+            print(f"❌ Giving up on stopping {kind} session {key} after {attempts} attempts: {state}")
+            abandon = self.abandoners.get(kind)
+            if abandon is not None:
+                try:
+                    abandon(state)
+                except Exception as e:
+                    print(f"Error abandoning {kind} session {key}: {e}")
+            return
+        
+        # Recorded as idle, so it is picked up again in reap_interval_seconds
+        self.store.put(kind, key, {**state, "stop_attempts": attempts}, time.time() - self.idle_seconds - 1)
+    
+    def start_reaper(self):
+        """Start the background reaper thread (once)."""
+        with self._lock:
+            if self._reaper is not None or self.idle_seconds <= 0:
+                return
+            self._reaper = threading.Thread(target=self._run_reaper, name="session-reaper", daemon=True)
+            self._reaper.start()
+    
+    def _run_reaper(self):
+        """Reap idle sessions every reap_interval_seconds."""
+        while True:
+            time.sleep(self.reap_interval_seconds)
+            try:
+                self.reap_idle()
+            except Exception as e:
+                print(f"Error reaping sessions: {e}")
+
+
+def create_session_store() -> SessionStore:
+    """Create the session store selected by Config.SESSION_STORE."""
+    if Config.SESSION_STORE == "sqlite":
+        return SQLiteSessionStore(Config.SESSION_DB_PATH)
+    return MemorySessionStore()
+
+
+# Global session registry instance
+session_registry = SessionRegistry(
+    create_session_store(),
+    idle_seconds=Config.SESSION_IDLE_SECONDS,
+    reap_interval_seconds=Config.SESSION_REAP_INTERVAL_SECONDS
+)
@@ -5,6 +5,14 @@ from appwrite.services.databases import Databases
 from appwrite.exception import AppwriteException
 from appwrite.permission import Permission
 from appwrite.role import Role
+try:
+    from appwrite.enums.databases_index_type import DatabasesIndexType as IndexType
+    from appwrite.enums.order_by import OrderBy
+    ASC, DESC = OrderBy.ASC, OrderBy.DESC
+except ImportError:
+    # Older Appwrite SDKs
+    from appwrite.enums.index_type import IndexType
+    ASC, DESC = "ASC", "DESC"
 import sys
 import os
 from dotenv import load_dotenv
@@ -119,6 +127,38 @@ def create_attribute(databases, collection_id, attr_name, attr_type, required=Fa
             print(f"  ❌ Error checking attribute '{attr_name}': {e.message}")
             return False
 
+def create_index(databases, collection_id, key, index_type, attributes, orders=None):
+    """Create an index if it doesn't exist."""
+    try:
+        # Try to get the index
+        databases.get_index(
+            database_id=APPWRITE_DATABASE_ID,
+            collection_id=collection_id,
+            key=key
+        )
+        print(f"  ✓ Index '{key}' already exists")
+        return True
+    except AppwriteException as e:
+        if e.code == 404:
+            # Index doesn't exist, create it
+            try:
+                databases.create_index(
+                    database_id=APPWRITE_DATABASE_ID,
+                    collection_id=collection_id,
+                    key=key,
+                    type=index_type,
+                    attributes=attributes,
+                    orders=orders
+                )
+                print(f"  ✓ Created index '{key}' on {', '.join(attributes)}")
+                return True
+            except AppwriteException as ce:
+                print(f"  ❌ Error creating index '{key}': {ce.message}")
+                return False
+        else:
+            print(f"  ❌ Error checking index '{key}': {e.message}")
+            return False
+
 def setup_todos_collection(databases):
     """Setup the todos collection."""
     print("\n📋 Setting up 'todos' collection...")
@@ -140,6 +180,19 @@ def setup_todos_collection(databases):
     for attr_name, attr_type, required, default, size in attributes:
         create_attribute(databases, "todos", attr_name, attr_type, required, default, size)
     
+    # Create indexes for the filters and sorts used by AppwriteClient._todo_queries
+    indexes = [
+        ("completed_created_at", IndexType.KEY, ["completed", "created_at"], [ASC, DESC]),
+        ("created_at", IndexType.KEY, ["created_at"], [DESC]),
+        ("updated_at", IndexType.KEY, ["updated_at"], [DESC]),
+        ("due_date", IndexType.KEY, ["due_date"], [ASC]),
+        ("priority", IndexType.KEY, ["priority", "created_at"], [ASC, DESC]),
+        ("title_search", IndexType.FULLTEXT, ["title"], None),
+    ]
+    
+    for key, index_type, index_attributes, orders in indexes:
+        create_index(databases, "todos", key, index_type, index_attributes, orders)
+    
     print("✓ Todos collection setup complete")
     return True
 
@@ -162,6 +215,16 @@ def setup_reminders_collection(databases):
     for attr_name, attr_type, required, default, size in attributes:
         create_attribute(databases, "reminders", attr_name, attr_type, required, default, size)
     
+    # Create indexes
+    indexes = [
+        ("created_at", IndexType.KEY, ["created_at"], [DESC]),
+        ("reminder_date", IndexType.KEY, ["reminder_date"], [ASC]),
+        ("reminder_text_search", IndexType.FULLTEXT, ["reminder_text"], None),
+    ]
+    
+    for key, index_type, index_attributes, orders in indexes:
+        create_index(databases, "reminders", key, index_type, index_attributes, orders)
+    
     print("✓ Reminders collection setup complete")
     return True
 
@@ -181,7 +244,7 @@ def main():
     
     if success:
         print("\n✅ Appwrite setup completed successfully!")
-        print("\n⏳ Note: It may take a few seconds for the attributes to become available.")
+        print("\n⏳ Note: It may take a few seconds for the attributes and indexes to become available.")
         print("   If you see errors, wait 10-20 seconds and try again.")
     else:
         print("\n⚠️  Setup completed with some errors. Please check the messages above.")
@@ -0,0 +1,269 @@
+"""Sentence-chunked pipelining of streamed LLM output into text-to-speech."""
+import asyncio
+import re
+import base64
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator, Dict, Any, List, Optional, Deque, Tuple
+
+from config import Config
+from tts_service import tts_service, TTSService
+
+
+# Sentence end: terminal punctuation (plus closing quotes/brackets) followed by
+# whitespace, or a line break
+SENTENCE_END = re.compile(r'[.!?…]+["\')\]]*\s+|\n+')
+
+# Abbreviations that end in a period but do not end a sentence
+ABBREVIATIONS = ("mr.", "mrs.", "ms.", "dr.", "st.", "vs.", "e.g.", "i.e.", "etc.", "a.m.", "p.m.")
+
+
+class SentenceChunker:
+    """Splits incrementally streamed text into complete sentences."""
+    
+    def __init__(self, min_chars: int = 20):
+        """
+        Initialize the chunker.
+        
+        Args:
+            min_chars: Sentences shorter than this are merged with the next one
+        """
+        self.min_chars = min_chars
+        self.buffer = ""
+    
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text and return any sentences it completed."""
+        self.buffer += text
+        sentences = []
+        start = 0
+        
+        for match in SENTENCE_END.finditer(self.buffer):
+            candidate = self.buffer[start:match.end()].strip()
+            
+            if not candidate:
+                start = match.end()
+                continue
+            if candidate.split()[-1].lower() in ABBREVIATIONS:
+                continue
+            if len(candidate) < self.min_chars and "\n" not in match.group():
+                continue
+            
+            sentences.append(candidate)
+            start = match.end()
+        
+        self.buffer = self.buffer[start:]
+        return sentences
+    
+    def flush(self) -> Optional[str]:
+        """Return whatever text is left once the stream has ended."""
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return rest or None
+
+
+class SpeechPipeline:
+    """Synthesizes each sentence of a streamed reply as soon as it is complete."""
+    
+    def __init__(self, tts: TTSService, max_workers: int = 3, min_sentence_chars: int = 20, pool_size: int = 32):
+        """
+        Initialize the speech pipeline.
+        
+        Args:
+            tts: Text-to-speech service used for synthesis
+            max_workers: Number of sentences of one reply synthesized concurrently
+            min_sentence_chars: Minimum length of a synthesized chunk
+            pool_size: Threads shared by all replies, i.e. sentences synthesized
+                concurrently across every voice session
+        """
+        self.tts = tts
+        self.max_workers = max_workers
+        self.min_sentence_chars = min_sentence_chars
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="tts-pipeline")
+    
+    def stream(
+        self,
+        events: Iterator[Dict[str, Any]],
+        voice_id: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Add audio to a stream of agent events.
+        
+        Every event from the agent is passed through. Each completed sentence
+        of the reply is sent to TTS right away, and an "audio" event is
+        yielded for it as soon as it and all earlier sentences are ready, so
+        segments always arrive in order. The agent's "done" event is held
+        back until the last segment has been yielded.
+        
+        At most max_workers sentences of the reply are on the shared pool (or
+        done but not yet yielded) at a time, so one long reply cannot queue
+        other sessions' sentences behind its own.
+        
+        Args:
+            events: Event stream from TodoAgent.stream_message
+            voice_id: Optional ElevenLabs voice ID
+        
+        Yields:
+            The agent's events, plus "audio" events with "index", "text" and
+            "audio" (base64 MP3, or None if synthesis was unavailable)
+        """
+        chunker = SentenceChunker(min_chars=self.min_sentence_chars)
+        # [index, sentence, future] in reply order; future is None until submitted
+        pending: Deque[List[Any]] = deque()
+        waiting: Deque[List[Any]] = deque()
+        # Slots taken by submitted sentences whose audio has not been yielded yet
+        in_flight = 0
+        done_event = None
+        next_index = 0
+        
+        def submit_sentence(sentence: str):
+            nonlocal next_index
+            entry = [next_index, sentence, None]
+            pending.append(entry)
+            waiting.append(entry)
+            next_index += 1
+            submit_waiting()
+        
+        def submit_waiting():
+            nonlocal in_flight
+            # Sentences go to the pool in order, while this reply has a free slot;
+            # the head of pending is therefore always submitted once slots free up
+            while waiting and in_flight < self.max_workers:
+                entry = waiting.popleft()
+                entry[2] = self.executor.submit(self._synthesize, entry[1], voice_id)
+                in_flight += 1
+        
+        def drain(block: bool) -> Iterator[Dict[str, Any]]:
+            nonlocal in_flight
+            while pending:
+                submit_waiting()
+                index, sentence, future = pending[0]
+                if not block and not future.done():
+                    return
+                audio = future.result()
+                # The slot is freed here, by the consumer, not by a done callback
+                # that may run after result() has already returned
+                pending.popleft()
+                in_flight -= 1
+                yield {"type": "audio", "index": index, "text": sentence, "audio": audio}
+        
+        try:
+            for event in events:
+                if event["type"] == "done":
+                    done_event = event
+                    continue
+                
+                # Read before yielding: the consumer may pop fields off the event
+                content = event.get("content") if event["type"] == "delta" else None
+                yield event
+                
+                if content:
+                    for sentence in chunker.feed(content):
+                        submit_sentence(sentence)
+                
+                yield from drain(block=False)
+            
+            rest = chunker.flush()
+            if rest:
+                submit_sentence(rest)
+            
+            yield from drain(block=True)
+            
+            if done_event:
+                yield done_event
+        finally:
+            # The client went away: drop sentences that have not started
+            waiting.clear()
+            for _, _, future in pending:
+                if future is not None:
+                    future.cancel()
+    
+    async def astream(
+        self,
+        events: AsyncIterator[Dict[str, Any]],
+        voice_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async version of stream, for TodoAgent.astream_message.
+        
+        Sentences are synthesized as tasks on the event loop rather than on the
+        thread pool; up to max_workers sentences of one reply are in flight.
+        """
+        chunker = SentenceChunker(min_chars=self.min_sentence_chars)
+        pending: Deque[Tuple[int, str, "asyncio.Task[Optional[str]]"]] = deque()
+        limit = asyncio.Semaphore(self.max_workers)
+        done_event = None
+        next_index = 0
+        
+        async def synthesize(sentence: str) -> Optional[str]:
+            async with limit:
+                return await self._asynthesize(sentence, voice_id)
+        
+        def submit_sentence(sentence: str):
+            nonlocal next_index
+            pending.append((next_index, sentence, asyncio.create_task(synthesize(sentence))))
+            next_index += 1
+        
+        try:
+            async for event in events:
+                if event["type"] == "done":
+                    done_event = event
+                    continue
+                
+                content = event.get("content") if event["type"] == "delta" else None
+                yield event
+                
+                if content:
+                    for sentence in chunker.feed(content):
+                        submit_sentence(sentence)
+                
+                while pending and pending[0][2].done():
+                    index, sentence, task = pending.popleft()
+                    yield {"type": "audio", "index": index, "text": sentence, "audio": task.result()}
+            
+            rest = chunker.flush()
+            if rest:
+                submit_sentence(rest)
+            
+            while pending:
+                index, sentence, task = pending.popleft()
+                yield {"type": "audio", "index": index, "text": sentence, "audio": await task}
+            
+            if done_event:
+                yield done_event
+        finally:
+            # The client went away: stop synthesizing sentences nobody will hear
+            for _, _, task in pending:
+                task.cancel()
+    
+    async def _asynthesize(self, text: str, voice_id: Optional[str]) -> Optional[str]:
+        """Async version of _synthesize."""
+        if not self.tts.enabled:
+            return None
+        
+        try:
+            audio = await self.tts.atext_to_speech(text, voice_id=voice_id)
+            return base64.b64encode(audio).decode("ascii")
+        except Exception as e:
+            print(f"Error synthesizing sentence: {e}")
+            return None
+    
+    def _synthesize(self, text: str, voice_id: Optional[str]) -> Optional[str]:
+        """Synthesize one sentence, returning base64 MP3 or None on failure."""
+        if not self.tts.enabled:
+            return None
+        
+        try:
+            audio = self.tts.text_to_speech(text, voice_id=voice_id)
+            return base64.b64encode(audio).decode("ascii")
+        except Exception as e:
+            print(f"Error synthesizing sentence: {e}")
+            return None
+
+
+# Global speech pipeline instance
+speech_pipeline = SpeechPipeline(
+    tts_service,
+    max_workers=Config.TTS_PIPELINE_WORKERS,
+    min_sentence_chars=Config.TTS_MIN_SENTENCE_CHARS,
+    pool_size=Config.TTS_PIPELINE_POOL_SIZE
+)
@@ -0,0 +1,386 @@
+"""Local SQLite storage backend (WAL mode) for todos and reminders."""
+import sqlite3
+import uuid
+from datetime import datetime
+from typing import List, Optional, Tuple, Any
+
+from change_log import SQLiteChangeLog
+from models import (
+    Todo, Reminder, TodoPriority, ReminderImportance, TodoFilter, TodoSortField, PRIORITY_ORDER
+)
+from search_index import normalize, TextIndex
+from sqlite_util import ThreadConnections
+from storage import StorageBackend
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS todos (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    title_search TEXT NOT NULL,
+    description TEXT,
+    completed INTEGER NOT NULL DEFAULT 0,
+    priority TEXT NOT NULL DEFAULT 'medium',
+    priority_rank INTEGER NOT NULL DEFAULT 1,
+    due_date TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_todos_completed_created_at ON todos (completed, created_at);
+CREATE INDEX IF NOT EXISTS idx_todos_created_at ON todos (created_at);
+CREATE INDEX IF NOT EXISTS idx_todos_due_date ON todos (due_date);
+CREATE INDEX IF NOT EXISTS idx_todos_priority ON todos (priority_rank, created_at);
+
+CREATE TABLE IF NOT EXISTS reminders (
+    id TEXT PRIMARY KEY,
+    reminder_text TEXT NOT NULL,
+    text_search TEXT NOT NULL,
+    importance TEXT NOT NULL DEFAULT 'medium',
+    reminder_date TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reminders_created_at ON reminders (created_at);
+CREATE INDEX IF NOT EXISTS idx_reminders_reminder_date ON reminders (reminder_date);
+"""
+
+# SQL sort expression for each sort field; due dates sort after every real date when missing
+SORT_EXPRESSIONS = {
+    TodoSortField.CREATED_AT: "created_at",
+    TodoSortField.UPDATED_AT: "updated_at",
+    TodoSortField.DUE_DATE: "COALESCE(due_date, '9999-12-31')",
+    TodoSortField.PRIORITY: "priority_rank",
+    TodoSortField.TITLE: "title_search",
+}
+
+
+class SQLiteStorage(StorageBackend):
+    """Storage backend keeping todos and reminders in a local SQLite database."""
+    
+    def __init__(self, path: str = "todos.db", busy_timeout_ms: int = 5000):
+        """
+        Open (and create if needed) the database.
+        
+        Args:
+            path: Database file, or ":memory:" for a private in-memory database
+            busy_timeout_ms: How long a writer waits for a lock held by another connection
+        """
+        super().__init__()
+        
+        self._connection = ThreadConnections(
+            path, "todos", busy_timeout_ms, schema=SCHEMA, row_factory=True, synchronous="NORMAL"
+        )
+        
+        # Versions and deltas live in the database, so every worker using it agrees on them
+        self.todo_changes = SQLiteChangeLog("todos", self._connection)
+        self.reminder_changes = SQLiteChangeLog("reminders", self._connection)
+    
+    # Todo operations
+    
+    def create_todo(
+        self,
+        title: str,
+        description: Optional[str] = None,
+        priority: TodoPriority = TodoPriority.MEDIUM,
+        due_date: Optional[datetime] = None,
+    ) -> Todo:
+        """Create a new todo item."""
+        now = datetime.utcnow()
+        todo = Todo(
+            id=uuid.uuid4().hex,
+            title=title,
+            description=description,
+            priority=priority,
+            due_date=due_date,
+            created_at=now,
+            updated_at=now,
+        )
+        
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO todos (id, title, title_search, description, completed, priority, priority_rank,"
+                " due_date, created_at, updated_at) VALUES (?, ?, ?, ?, 0, ?, ?, ?, ?, ?)",
+                (
+                    todo.id, todo.title, normalize(todo.title), todo.description, todo.priority.value,
+                    PRIORITY_ORDER.index(todo.priority), self._iso(todo.due_date),
+                    self._iso(todo.created_at), self._iso(todo.updated_at),
+                ),
+            )
+            self.todo_changes.record_in(conn, todo.id)
+        self.todo_changes.notify()
+        return todo
+    
+    def get_todos(self, completed: Optional[bool] = None) -> List[Todo]:
+        """Get all todos, optionally filtered by completion status."""
+        return self.query_todos(TodoFilter(completed=completed))
+    
+    def query_todos(self, todo_filter: TodoFilter) -> List[Todo]:
+        """Get all todos matching a filter, sorted by its sort options."""
+        where, params = self._todo_where(todo_filter)
+        rows = self._connection().execute(
+            f"SELECT * FROM todos {where} ORDER BY {self._todo_order(todo_filter)}", params
+        ).fetchall()
+        return [self._row_to_todo(row) for row in rows]
+    
+    def list_todos_page(
+        self,
+        completed: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        limit: int = 25,
+        todo_filter: Optional[TodoFilter] = None,
+    ) -> Tuple[List[Todo], Optional[str], int]:
+        """
+        Get one page of todos using keyset pagination.
+        
+        Returns:
+            Tuple of (todos, next_cursor, total); next_cursor is the ID of the
+            last todo, or None on the last page
+        """
+        if todo_filter is None:
+            todo_filter = TodoFilter(completed=completed)
+        elif completed is not None:
+            todo_filter = todo_filter.model_copy(update={"completed": completed})
+        
+        conn = self._connection()
+        where, params = self._todo_where(todo_filter)
+        total = conn.execute(f"SELECT COUNT(*) FROM todos {where}", params).fetchone()[0]
+        
+        if cursor:
+            # Continue after the cursor row in (sort value, id) order
+            expression = SORT_EXPRESSIONS[todo_filter.sort_by]
+            comparison = "<" if todo_filter.descending else ">"
+            keyset = f"({expression}, id) {comparison} (SELECT {expression}, id FROM todos WHERE id = ?)"
+            where = f"{where} AND {keyset}" if where else f"WHERE {keyset}"
+            params = [*params, cursor]
+        
+        rows = conn.execute(
+            f"SELECT * FROM todos {where} ORDER BY {self._todo_order(todo_filter)} LIMIT ?",
+            [*params, limit],
+        ).fetchall()
+        
+        todos = [self._row_to_todo(row) for row in rows]
+        next_cursor = todos[-1].id if len(todos) == limit else None
+        return todos, next_cursor, total
+    
+    def find_todos(self, title: str, completed: Optional[bool] = None) -> List[Todo]:
+        """Find todos by title, best match first."""
+        return self._rank(self.query_todos(TodoFilter(completed=completed, search=title)), title, "title")
+    
+    def get_todo(self, todo_id: str) -> Optional[Todo]:
+        """Get a specific todo by ID."""
+        row = self._connection().execute("SELECT * FROM todos WHERE id = ?", (todo_id,)).fetchone()
+        return self._row_to_todo(row) if row else None
+    
+    def update_todo(
+        self,
+        todo_id: str,
+        title: Optional[str] = None,
+        description: Optional[str] = None,
+        completed: Optional[bool] = None,
+        priority: Optional[TodoPriority] = None,
+        due_date: Optional[datetime] = None,
+    ) -> Optional[Todo]:
+        """Update a todo item."""
+        data = {"updated_at": self._iso(datetime.utcnow())}
+        
+        if title is not None:
+            data["title"] = title
+            data["title_search"] = normalize(title)
+        if description is not None:
+            data["description"] = description
+        if completed is not None:
+            data["completed"] = int(completed)
+        if priority is not None:
+            data["priority"] = priority.value
+            data["priority_rank"] = PRIORITY_ORDER.index(priority)
+        if due_date is not None:
+            data["due_date"] = self._iso(due_date)
+        
+        assignments = ", ".join(f"{column} = ?" for column in data)
+        with self._connection() as conn:
+            updated = conn.execute(
+                f"UPDATE todos SET {assignments} WHERE id = ?", [*data.values(), todo_id]
+            ).rowcount
+            if updated:
+                self.todo_changes.record_in(conn, todo_id)
+        
+        if not updated:
+            print(f"Error updating todo {todo_id}: not found")
+            return None
+        self.todo_changes.notify()
+        return self.get_todo(todo_id)
+    
+    def delete_todo(self, todo_id: str) -> bool:
+        """Delete a todo item."""
+        with self._connection() as conn:
+            deleted = conn.execute("DELETE FROM todos WHERE id = ?", (todo_id,)).rowcount > 0
+            if deleted:
+                self.todo_changes.record_in(conn, todo_id, deleted=True)
+        if deleted:
+            self.todo_changes.notify()
+        return deleted
+    
+    # Reminder operations
+    
+    def create_reminder(
+        self,
+        reminder_text: str,
+        importance: ReminderImportance = ReminderImportance.MEDIUM,
+        reminder_date: Optional[datetime] = None,
+    ) -> Reminder:
+        """Create a new reminder."""
+        now = datetime.utcnow()
+        reminder = Reminder(
+            id=uuid.uuid4().hex,
+            reminder_text=reminder_text,
+            importance=importance,
+            reminder_date=reminder_date,
+            created_at=now,
+            updated_at=now,
+        )
+        
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO reminders (id, reminder_text, text_search, importance, reminder_date,"
+                " created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    reminder.id, reminder.reminder_text, normalize(reminder.reminder_text),
+                    reminder.importance.value, self._iso(reminder.reminder_date),
+                    self._iso(reminder.created_at), self._iso(reminder.updated_at),
+                ),
+            )
+            self.reminder_changes.record_in(conn, reminder.id)
+        self.reminder_changes.notify()
+        return reminder
+    
+    def get_reminders(self) -> List[Reminder]:
+        """Get all reminders, newest first."""
+        rows = self._connection().execute("SELECT * FROM reminders ORDER BY created_at DESC, id DESC").fetchall()
+        return [self._row_to_reminder(row) for row in rows]
+    
+    def list_reminders_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 25,
+    ) -> Tuple[List[Reminder], Optional[str], int]:
+        """Get one page of reminders, newest first. Returns (reminders, next_cursor, total)."""
+        conn = self._connection()
+        total = conn.execute("SELECT COUNT(*) FROM reminders").fetchone()[0]
+        
+        where, params = "", []
+        if cursor:
+            where = "WHERE (created_at, id) < (SELECT created_at, id FROM reminders WHERE id = ?)"
+            params = [cursor]
+        
+        rows = conn.execute(
+            f"SELECT * FROM reminders {where} ORDER BY created_at DESC, id DESC LIMIT ?", [*params, limit]
+        ).fetchall()
+        
+        reminders = [self._row_to_reminder(row) for row in rows]
+        next_cursor = reminders[-1].id if len(reminders) == limit else None
+        return reminders, next_cursor, total
+    
+    def find_reminders(self, reminder_text: str) -> List[Reminder]:
+        """Find reminders by text, best match first."""
+        tokens = normalize(reminder_text).split()
+        if not tokens:
+            return []
+        
+        where = " AND ".join("(' ' || text_search) LIKE ?" for _ in tokens)
+        rows = self._connection().execute(
+            f"SELECT * FROM reminders WHERE {where}", [f"% {token}%" for token in tokens]
+        ).fetchall()
+        return self._rank([self._row_to_reminder(row) for row in rows], reminder_text, "reminder_text")
+    
+    def get_reminder(self, reminder_id: str) -> Optional[Reminder]:
+        """Get a specific reminder by ID."""
+        row = self._connection().execute("SELECT * FROM reminders WHERE id = ?", (reminder_id,)).fetchone()
+        return self._row_to_reminder(row) if row else None
+    
+    def delete_reminder(self, reminder_id: str) -> bool:
+        """Delete a reminder."""
+        with self._connection() as conn:
+            deleted = conn.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,)).rowcount > 0
+            if deleted:
+                self.reminder_changes.record_in(conn, reminder_id, deleted=True)
+        if deleted:
+            self.reminder_changes.notify()
+        return deleted
+    
+    # Helper methods
+    
+    
+    @staticmethod
+    def _todo_where(todo_filter: TodoFilter) -> Tuple[str, List[Any]]:
+        """Translate a todo filter into a WHERE clause and its parameters."""
+        clauses, params = [], []
+        
+        if todo_filter.completed is not None:
+            clauses.append("completed = ?")
+            params.append(int(todo_filter.completed))
+        if todo_filter.min_priority is not None:
+            clauses.append("priority_rank >= ?")
+            params.append(PRIORITY_ORDER.index(todo_filter.min_priority))
+        if todo_filter.due_after is not None:
+            clauses.append("due_date >= ?")
+            params.append(SQLiteStorage._iso(todo_filter.due_after))
+        if todo_filter.due_before is not None:
+            clauses.append("due_date < ?")
+            params.append(SQLiteStorage._iso(todo_filter.due_before))
+        if todo_filter.search:
+            # Each token must start a word of the normalized title
+            for token in normalize(todo_filter.search).split():
+                clauses.append("(' ' || title_search) LIKE ?")
+                params.append(f"% {token}%")
+        
+        return ("WHERE " + " AND ".join(clauses) if clauses else ""), params
+    
+    @staticmethod
+    def _todo_order(todo_filter: TodoFilter) -> str:
+        """ORDER BY clause for a todo filter (ID breaks ties, for stable pages)."""
+        direction = "DESC" if todo_filter.descending else "ASC"
+        return f"{SORT_EXPRESSIONS[todo_filter.sort_by]} {direction}, id {direction}"
+    
+    @staticmethod
+    def _rank(items: List[Any], text: str, text_field: str) -> List[Any]:
+        """Order matches like the in-memory index does: best match first, newest first on ties."""
+        index = TextIndex()
+        by_id = {}
+        for item in items:
+            index.add(item.id, getattr(item, text_field))
+            by_id[item.id] = item
+        
+        ranked = [(score, by_id[item_id]) for item_id, score in index.search(text)]
+        ranked.sort(key=lambda match: (match[0], match[1].created_at), reverse=True)
+        return [item for _, item in ranked]
+    
+    @staticmethod
+    def _iso(value: Optional[datetime]) -> Optional[str]:
+        """Store datetimes as ISO strings, like the Appwrite collections do."""
+        return value.isoformat() if value else None
+    
+    @staticmethod
+    def _row_to_todo(row: sqlite3.Row) -> Todo:
+        """Convert a database row to a Todo model (ISO strings are parsed by pydantic)."""
+        return Todo.model_validate({
+            "id": row["id"],
+            "title": row["title"],
+            "description": row["description"],
+            "completed": bool(row["completed"]),
+            "priority": row["priority"],
+            "due_date": row["due_date"] or None,
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        })
+    
+    @staticmethod
+    def _row_to_reminder(row: sqlite3.Row) -> Reminder:
+        """Convert a database row to a Reminder model (ISO strings are parsed by pydantic)."""
+        return Reminder.model_validate({
+            "id": row["id"],
+            "reminder_text": row["reminder_text"],
+            "importance": row["importance"],
+            "reminder_date": row["reminder_date"] or None,
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        })
@@ -0,0 +1,101 @@
+"""SQLite connections shared by the local stores (todos, sessions, conversations, jobs, UIDs)."""
+import sqlite3
+import threading
+import uuid
+from typing import Optional
+
+
+def database_path(path: str, name: str) -> str:
+    """
+    Get the path to open for a store's database.
+    
+    Args:
+        path: Database file, or ":memory:" for a database private to this process
+        name: Store name, used to name an in-memory database
+    
+    Returns:
+        The file path, or for ":memory:" the URI of a named shared-cache
+        database, so every thread's connection sees the same data
+    """
+    if path == ":memory:":
+        return f"file:luna-{name}-{uuid.uuid4().hex}?mode=memory&cache=shared"
+    return path
+
+
+def connect(
+    path: str,
+    busy_timeout_ms: int = 5000,
+    row_factory: bool = False,
+    synchronous: Optional[str] = None
+) -> sqlite3.Connection:
+    """
+    Open a connection with WAL journaling.
+    
+    Args:
+        path: Path from database_path
+        busy_timeout_ms: How long a writer waits for a lock held by another connection
+        row_factory: Return rows as sqlite3.Row instead of tuples
+        synchronous: PRAGMA synchronous level (None keeps SQLite's default)
+    
+    Returns:
+        The connection, usable from any thread
+    """
+    conn = sqlite3.connect(path, uri=path.startswith("file:"), check_same_thread=False)
+    if row_factory:
+        conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    if synchronous:
+        conn.execute(f"PRAGMA synchronous = {synchronous}")
+    return conn
+
+
+class ThreadConnections:
+    """
+    One connection per thread to a store's database.
+    
+    Calling the holder returns the calling thread's connection. WAL lets
+    readers on other threads (and processes) run alongside a writer.
+    """
+    
+    def __init__(
+        self,
+        path: str,
+        name: str,
+        busy_timeout_ms: int = 5000,
+        schema: Optional[str] = None,
+        row_factory: bool = False,
+        synchronous: Optional[str] = None
+    ):
+        """
+        Open the database and create its schema.
+        
+        Args:
+            path: Database file, or ":memory:" for a database private to this process
+            name: Store name, used to name an in-memory database
+            busy_timeout_ms: How long a writer waits for a lock held by another connection
+            schema: Script run once to create tables and indexes
+            row_factory: Return rows as sqlite3.Row instead of tuples
+            synchronous: PRAGMA synchronous level (None keeps SQLite's default)
+        """
+        self.path = database_path(path, name)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.row_factory = row_factory
+        self.synchronous = synchronous
+        self._local = threading.local()
+        
+        # Also keeps an in-memory database alive for the lifetime of the holder
+        self.schema_connection = self.connect()
+        if schema:
+            self.schema_connection.executescript(schema)
+    
+    def connect(self) -> sqlite3.Connection:
+        """Open a new connection with the holder's settings."""
+        return connect(self.path, self.busy_timeout_ms, self.row_factory, self.synchronous)
+    
+    def __call__(self) -> sqlite3.Connection:
+        """Get this thread's connection."""
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = self._local.connection = self.connect()
+        return conn
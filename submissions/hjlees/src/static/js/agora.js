@@ -5,6 +5,7 @@ let localAudioTrack = null;
 let localVideoTrack = null;
 let remoteUsers = {};
 let conversationalAIActive = false;
+let agentHeartbeat = null;
 
 // Speech recognition
 let recognition = null;
@@ -17,6 +18,10 @@ let isSpeaking = false;
 let currentAudio = null;
 let speechSynthesisUtterance = null;
 
+// Voice turns share one conversation so Luna keeps context between them
+const voiceSessionId = 'voice_' + Date.now();
+let speechTurn = 0;
+
 // Initialize Agora voice chat
 document.addEventListener('DOMContentLoaded', () => {
     const startVoiceBtn = document.getElementById('startVoiceBtn');
@@ -89,6 +94,7 @@ async function startVoiceChat() {
         
         // Set up event listeners
         agoraClient.on('user-published', handleUserPublished);
+        agoraClient.on('token-privilege-will-expire', () => renewAgoraToken(channelName, tokenData.uid));
         agoraClient.on('user-unpublished', handleUserUnpublished);
         
         // Join the channel (token can be null for testing mode)
@@ -139,14 +145,25 @@ async function startWithAvatarAgent(channelName) {
             })
         });
         
-        const agentData = await agentResponse.json();
+        let agentData = await agentResponse.json();
         
         if (agentData.error) {
             throw new Error(agentData.error + (agentData.hint ? '\n\n' + agentData.hint : ''));
         }
         
+        // The agent starts in a background job unless one is already running
+        if (agentData.job_id) {
+            const job = await waitForJob(agentData.job_id);
+            if (job.status === 'failed') {
+                const hint = job.result && job.result.hint;
+                throw new Error(job.error + (hint ? '\n\n' + hint : ''));
+            }
+            agentData = job.result;
+        }
+        
         console.log('✅ Agora Conversational AI agent started:', agentData);
         conversationalAIActive = true;
+        agentHeartbeat = startSessionHeartbeat('agora', channelName);
         
         // Get token for the user to join the channel
         const tokenResponse = await fetch('/api/agora/token', {
@@ -170,6 +187,8 @@ async function startWithAvatarAgent(channelName) {
         // Initialize Agora client for user to join
         agoraClient = AgoraRTC.createClient({ mode: 'rtc', codec: 'vp8' });
         
+        agoraClient.on('token-privilege-will-expire', () => renewAgoraToken(channelName, tokenData.uid));
+        
         // Set up event listeners for avatar video
         agoraClient.on('user-published', async (user, mediaType) => {
             await agoraClient.subscribe(user, mediaType);
@@ -242,6 +261,8 @@ async function stopVoiceChat() {
                 })
             });
             conversationalAIActive = false;
+            clearInterval(agentHeartbeat);
+            agentHeartbeat = null;
             console.log('✅ Stopped Conversational AI agent');
         }
         
@@ -360,30 +381,34 @@ function initializeSpeechRecognition() {
 
 // Process voice input through AI agent
 async function processVoiceInput(text) {
+    // Audio segments are played in order as they stream in; a barge-in
+    // bumps speechTurn so anything still queued for this turn is skipped
+    const turn = ++speechTurn;
+    let playback = Promise.resolve();
+    let failed = false;
+    
     try {
-        // Send to chat API
-        const response = await fetch('/api/chat', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                message: text,
-                session_id: 'voice_' + Date.now()
-            })
-        });
+        await streamChat(text, voiceSessionId, (event, data) => {
+            if (event === 'audio') {
+                playback = playback.then(() => playSpeechSegment(data, turn));
+            } else if (event === 'done') {
+                console.log('🤖 Luna says:', data.response);
+            } else if (event === 'error') {
+                console.error('AI response error:', data.error);
+                failed = true;
+            }
+        }, API.chatVoice);
         
-        const data = await response.json();
+        await playback;
         
-        if (data.error) {
-            console.error('AI response error:', data.error);
+        if (failed) {
             await speakResponse('Sorry, I encountered an error. Please try again.');
-        } else {
-            console.log('🤖 Luna says:', data.response);
-            await speakResponse(data.response);
         }
         
-        updateVoiceStatus('Listening...', 'success');
+        if (turn === speechTurn) {
+            isSpeaking = false;
+            updateVoiceStatus('Listening...', 'success');
+        }
         
     } catch (error) {
         console.error('Error processing voice input:', error);
@@ -392,6 +417,47 @@ async function processVoiceInput(text) {
     }
 }
 
+// Play one sentence of a streamed reply (ElevenLabs audio, or browser TTS fallback)
+async function playSpeechSegment(segment, turn) {
+    if (turn !== speechTurn) return;
+    
+    isSpeaking = true;
+    updateVoiceStatus('Speaking...', 'info');
+    
+    try {
+        if (segment.audio) {
+            const bytes = Uint8Array.from(atob(segment.audio), c => c.charCodeAt(0));
+            const audioUrl = URL.createObjectURL(new Blob([bytes], { type: 'audio/mpeg' }));
+            currentAudio = new Audio(audioUrl);
+            
+            await new Promise((resolve) => {
+                currentAudio.onended = resolve;
+                currentAudio.onerror = resolve;
+                currentAudio.onpause = resolve;
+                currentAudio.play().catch(resolve);
+            });
+            
+            URL.revokeObjectURL(audioUrl);
+            currentAudio = null;
+        } else if ('speechSynthesis' in window) {
+            speechSynthesisUtterance = new SpeechSynthesisUtterance(segment.text);
+            speechSynthesisUtterance.lang = 'en-US';
+            speechSynthesisUtterance.rate = 0.9;
+            speechSynthesisUtterance.pitch = 1.0;
+            
+            await new Promise((resolve) => {
+                speechSynthesisUtterance.onend = resolve;
+                speechSynthesisUtterance.onerror = resolve;
+                window.speechSynthesis.speak(speechSynthesisUtterance);
+            });
+            
+            speechSynthesisUtterance = null;
+        }
+    } catch (error) {
+        console.error('Error playing speech segment:', error);
+    }
+}
+
 // Play greeting message
 async function playGreeting(text) {
     await speakResponse(text);
@@ -405,13 +471,8 @@ async function speakResponse(text) {
         
         // Try ElevenLabs TTS first
         try {
-            const response = await fetch('/api/tts', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ text })
-            });
+            // GET, so the browser cache answers phrases it has already played
+            const response = await fetch(`/api/tts?${new URLSearchParams({ text })}`);
             
             if (response.ok) {
                 const audioBlob = await response.blob();
@@ -511,8 +572,9 @@ function interruptSpeech() {
         speechSynthesisUtterance = null;
     }
     
-    // Reset state
+    // Reset state and drop any queued sentences of the interrupted reply
     isSpeaking = false;
+    speechTurn++;
     
     // Update UI immediately
     updateVoiceStatus('Processing...', 'warning');
@@ -543,6 +605,57 @@ async function handleUserPublished(user, mediaType) {
     }
 }
 
+async function waitForJob(jobId, timeoutMs = 60000) {
+    // Poll a background job until it succeeds or fails
+    const deadline = Date.now() + timeoutMs;
+    
+    while (Date.now() < deadline) {
+        const response = await fetch(`/api/jobs/${jobId}`);
+        const job = await response.json();
+        
+        if (job.error && !job.status) {
+            throw new Error(job.error);
+        }
+        if (job.status === 'succeeded' || job.status === 'failed') {
+            return job;
+        }
+        
+        await new Promise(resolve => setTimeout(resolve, 500));
+    }
+    
+    throw new Error('Timed out waiting for the agent to start');
+}
+
+async function renewAgoraToken(channelName, uid) {
+    // Agora fires token-privilege-will-expire shortly before the token expires
+    try {
+        const response = await fetch('/api/agora/token/renew', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                channel_name: channelName,
+                uid: uid,
+                role: 1
+            })
+        });
+        
+        const data = await response.json();
+        
+        if (data.error) {
+            throw new Error(data.error);
+        }
+        
+        if (agoraClient && data.token) {
+            await agoraClient.renewToken(data.token);
+            console.log('🔑 Agora token renewed');
+        }
+    } catch (error) {
+        console.error('Error renewing Agora token:', error);
+    }
+}
+
 function handleUserUnpublished(user, mediaType) {
     console.log('User unpublished:', user.uid, mediaType);
     
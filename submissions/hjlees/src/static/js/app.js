@@ -3,9 +3,12 @@
 // API endpoints
 const API = {
     chat: '/api/chat',
+    chatStream: '/api/chat/stream',
+    chatVoice: '/api/chat/voice',
     chatReset: '/api/chat/reset',
     todos: '/api/todos',
     reminders: '/api/reminders',
+    events: '/api/events',
     tts: '/api/tts',
 };
 
@@ -14,7 +17,10 @@ const state = {
     currentTab: 'chat',
     sessionId: generateSessionId(),
     todos: [],
-    reminders: []
+    reminders: [],
+    // Collection versions of the loaded lists, for ?since= delta requests
+    todosVersion: null,
+    remindersVersion: null
 };
 
 // Initialize app
@@ -23,6 +29,7 @@ document.addEventListener('DOMContentLoaded', () => {
     initializeChat();
     initializeTodos();
     initializeReminders();
+    initializeChangeFeed();
 });
 
 // Tab management
@@ -79,29 +86,32 @@ async function sendMessage() {
     showLoading(true);
     
     try {
-        const response = await fetch(API.chat, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                message: message,
-                session_id: state.sessionId
-            })
-        });
+        let contentDiv = null;
+        let text = '';
         
-        const data = await response.json();
-        
-        if (data.error) {
-            addMessageToChat('assistant', `Error: ${data.error}`);
-        } else {
-            addMessageToChat('assistant', data.response);
-            
-            // Optionally play TTS
-            if (shouldPlayTTS()) {
-                playTTS(data.response);
+        await streamChat(message, state.sessionId, (event, data) => {
+            if (event === 'delta') {
+                // Show the reply as soon as the first token arrives
+                if (!contentDiv) {
+                    contentDiv = addMessageToChat('assistant', '');
+                    showLoading(false);
+                }
+                text += data.content;
+                updateChatMessage(contentDiv, text);
+            } else if (event === 'done') {
+                if (!contentDiv) {
+                    contentDiv = addMessageToChat('assistant', '');
+                }
+                updateChatMessage(contentDiv, data.response);
+                
+                // Optionally play TTS
+                if (shouldPlayTTS() && data.response) {
+                    playTTS(data.response);
+                }
+            } else if (event === 'error') {
+                addMessageToChat('assistant', `Error: ${data.error}`);
             }
-        }
+        });
     } catch (error) {
         console.error('Error sending message:', error);
         addMessageToChat('assistant', 'Sorry, I encountered an error. Please try again.');
@@ -129,6 +139,62 @@ function addMessageToChat(role, content) {
     
     // Scroll to bottom
     messagesDiv.scrollTop = messagesDiv.scrollHeight;
+    
+    return contentDiv;
+}
+
+function updateChatMessage(contentDiv, content) {
+    contentDiv.innerHTML = `<strong>Luna:</strong> ${content}`;
+    
+    const messagesDiv = document.getElementById('chatMessages');
+    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+}
+
+// Stream a chat reply from /api/chat/stream (or another SSE chat endpoint),
+// calling onEvent(event, data) for every Server-Sent Event as it arrives
+async function streamChat(message, sessionId, onEvent, url = API.chatStream) {
+    const response = await fetch(url, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+            message: message,
+            session_id: sessionId
+        })
+    });
+    
+    if (!response.ok || !response.body) {
+        const data = await response.json().catch(() => ({}));
+        onEvent('error', { error: data.error || `HTTP ${response.status}` });
+        return;
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            raw.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            
+            if (data) onEvent(event, JSON.parse(data));
+        }
+    }
 }
 
 async function resetChat() {
@@ -137,7 +203,13 @@ async function resetChat() {
     showLoading(true);
     
     try {
-        await fetch(API.chatReset, { method: 'POST' });
+        await fetch(API.chatReset, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ session_id: state.sessionId })
+        });
         
         // Clear chat UI
         const messagesDiv = document.getElementById('chatMessages');
@@ -175,17 +247,76 @@ function initializeTodos() {
     });
 }
 
+// Real-time updates: changes made anywhere (other tabs, the voice agent)
+// are pushed over /api/events and merged into the loaded lists
+function initializeChangeFeed() {
+    if (!window.EventSource) return;
+    
+    const events = new EventSource(API.events);
+    
+    events.addEventListener('open', () => {
+        // Catch up on anything missed while disconnected
+        if (state.todosVersion) loadTodos();
+        if (state.remindersVersion) loadReminders();
+    });
+    
+    events.addEventListener('change', (event) => {
+        const data = JSON.parse(event.data);
+        
+        if (data.resync) {
+            if (state.todosVersion) {
+                state.todosVersion = null;
+                loadTodos();
+            }
+            if (state.remindersVersion) {
+                state.remindersVersion = null;
+                loadReminders();
+            }
+        } else if (data.collection === 'todos' && state.todosVersion) {
+            if (data.full) {
+                state.todosVersion = null;
+                loadTodos();
+            } else {
+                state.todos = applyDelta(state.todos, data.todos, data, true);
+                state.todosVersion = data.version;
+                renderTodos(state.todos);
+            }
+        } else if (data.collection === 'reminders' && state.remindersVersion) {
+            if (data.full) {
+                state.remindersVersion = null;
+                loadReminders();
+            } else {
+                state.reminders = applyDelta(state.reminders, data.reminders, data, true);
+                state.remindersVersion = data.version;
+                renderReminders(state.reminders);
+            }
+        }
+    });
+    
+    events.addEventListener('error', () => {
+        // The browser gives up on non-200 answers (e.g. 503 when the server
+        // has too many streams open), so try again later ourselves
+        if (events.readyState === EventSource.CLOSED) {
+            setTimeout(initializeChangeFeed, 30000);
+        }
+    });
+}
+
 async function loadTodos() {
     showLoading(true);
     
     try {
-        const response = await fetch(API.todos);
+        const url = state.todosVersion
+            ? `${API.todos}?since=${encodeURIComponent(state.todosVersion)}`
+            : API.todos;
+        const response = await fetch(url);
         const data = await response.json();
         
         if (data.error) {
             console.error('Error loading todos:', data.error);
         } else {
-            state.todos = data.todos;
+            state.todos = applyDelta(state.todos, data.todos, data, Boolean(state.todosVersion));
+            state.todosVersion = data.version;
             renderTodos(state.todos);
         }
     } catch (error) {
@@ -195,6 +326,19 @@ async function loadTodos() {
     }
 }
 
+function applyDelta(items, changed, data, isDelta) {
+    // Full lists replace what we have; deltas are merged in, newest first
+    if (!isDelta || data.full) {
+        return changed;
+    }
+    
+    const replaced = new Set([...data.deleted, ...changed.map(item => item.id)]);
+    return items
+        .filter(item => !replaced.has(item.id))
+        .concat(changed)
+        .sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
+}
+
 function renderTodos(todos) {
     const todosList = document.getElementById('todosList');
     
@@ -249,13 +393,17 @@ async function loadReminders() {
     showLoading(true);
     
     try {
-        const response = await fetch(API.reminders);
+        const url = state.remindersVersion
+            ? `${API.reminders}?since=${encodeURIComponent(state.remindersVersion)}`
+            : API.reminders;
+        const response = await fetch(url);
         const data = await response.json();
         
         if (data.error) {
             console.error('Error loading reminders:', data.error);
         } else {
-            state.reminders = data.reminders;
+            state.reminders = applyDelta(state.reminders, data.reminders, data, Boolean(state.remindersVersion));
+            state.remindersVersion = data.version;
             renderReminders(state.reminders);
         }
     } catch (error) {
@@ -301,13 +449,8 @@ function renderReminders(reminders) {
 // TTS functionality
 async function playTTS(text) {
     try {
-        const response = await fetch(API.tts, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ text })
-        });
+        // GET, so the browser cache answers phrases it has already played
+        const response = await fetch(`${API.tts}?${new URLSearchParams({ text })}`);
         
         if (response.ok) {
             const audioBlob = await response.blob();
@@ -335,6 +478,21 @@ function showLoading(show) {
     }
 }
 
+// Keep a server-side session from being reaped as idle while it is in use
+const SESSION_HEARTBEAT_MS = 60000;
+
+function startSessionHeartbeat(type, id) {
+    return setInterval(() => {
+        fetch('/api/sessions/heartbeat', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ type: type, id: id })
+        }).catch(error => console.error('Error sending session heartbeat:', error));
+    }, SESSION_HEARTBEAT_MS);
+}
+
 function generateSessionId() {
     return 'session_' + Date.now() + '_' + Math.random().toString(36).substr(2, 9);
 }
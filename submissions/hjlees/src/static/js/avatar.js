@@ -1,6 +1,7 @@
 // HeyGen Video Avatar integration
 
 let avatarSessionId = null;
+let avatarHeartbeat = null;
 let peerConnection = null;
 let greetingSent = false;
 
@@ -225,6 +226,7 @@ async function startAvatarSession() {
         }
         
         avatarSessionId = data.data.session_id;
+        avatarHeartbeat = startSessionHeartbeat('heygen', avatarSessionId);
         
         // Show technical details immediately
         displayTechDetails();
@@ -242,6 +244,8 @@ async function startAvatarSession() {
         console.error('Error starting avatar session:', error);
         alert('Failed to start avatar session: ' + error.message);
         updateAvatarStatus('Not Active', 'secondary');
+        clearInterval(avatarHeartbeat);
+        avatarHeartbeat = null;
         avatarSessionId = null;
     } finally {
         showLoading(false);
@@ -285,6 +289,8 @@ async function stopAvatarSession() {
         document.getElementById('startAvatarBtn').classList.remove('d-none');
         document.getElementById('stopAvatarBtn').classList.add('d-none');
         
+        clearInterval(avatarHeartbeat);
+        avatarHeartbeat = null;
         avatarSessionId = null;
         greetingSent = false;
         
@@ -0,0 +1,227 @@
+"""Storage backend interface for todos and reminders."""
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple, Callable
+
+from change_log import ChangeLog
+from models import Todo, Reminder, TodoPriority, ReminderImportance, TodoFilter, BatchItemResult
+
+
+class StorageBackend(ABC):
+    """Operations every todo/reminder store provides (see database.AppwriteClient)."""
+    
+    def __init__(self):
+        """Initialize the change logs behind ETags and delta sync."""
+        self.todo_changes = ChangeLog()
+        self.reminder_changes = ChangeLog()
+    
+    def invalidate_cache(self):
+        """Drop any cached data so the next reads go to the store."""
+    
+    def todos_version(self) -> str:
+        """Version token of the todo collection; changes whenever a todo does."""
+        return self.todo_changes.token()
+    
+    def reminders_version(self) -> str:
+        """Version token of the reminder collection; changes whenever a reminder does."""
+        return self.reminder_changes.token()
+    
+    # Todo operations
+    
+    @abstractmethod
+    def create_todo(
+        self,
+        title: str,
+        description: Optional[str] = None,
+        priority: TodoPriority = TodoPriority.MEDIUM,
+        due_date: Optional[datetime] = None,
+    ) -> Todo:
+        """Create a new todo item."""
+    
+    @abstractmethod
+    def get_todos(self, completed: Optional[bool] = None) -> List[Todo]:
+        """Get all todos, newest first, optionally filtered by completion status."""
+    
+    @abstractmethod
+    def query_todos(self, todo_filter: TodoFilter) -> List[Todo]:
+        """Get all todos matching a filter, sorted by its sort options."""
+    
+    @abstractmethod
+    def list_todos_page(
+        self,
+        completed: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        limit: int = 25,
+        todo_filter: Optional[TodoFilter] = None,
+    ) -> Tuple[List[Todo], Optional[str], int]:
+        """Get one page of todos. Returns (todos, next_cursor, total)."""
+    
+    @abstractmethod
+    def find_todos(self, title: str, completed: Optional[bool] = None) -> List[Todo]:
+        """Find todos by title, best match first."""
+    
+    @abstractmethod
+    def get_todo(self, todo_id: str) -> Optional[Todo]:
+        """Get a specific todo by ID."""
+    
+    @abstractmethod
+    def update_todo(
+        self,
+        todo_id: str,
+        title: Optional[str] = None,
+        description: Optional[str] = None,
+        completed: Optional[bool] = None,
+        priority: Optional[TodoPriority] = None,
+        due_date: Optional[datetime] = None,
+    ) -> Optional[Todo]:
+        """Update a todo item. Returns None if it does not exist."""
+    
+    def complete_todo(self, todo_id: str) -> Optional[Todo]:
+        """Mark a todo as completed."""
+        return self.update_todo(todo_id, completed=True)
+    
+    @abstractmethod
+    def delete_todo(self, todo_id: str) -> bool:
+        """Delete a todo item. Returns False if it could not be deleted."""
+    
+    # Reminder operations
+    
+    @abstractmethod
+    def create_reminder(
+        self,
+        reminder_text: str,
+        importance: ReminderImportance = ReminderImportance.MEDIUM,
+        reminder_date: Optional[datetime] = None,
+    ) -> Reminder:
+        """Create a new reminder."""
+    
+    @abstractmethod
+    def get_reminders(self) -> List[Reminder]:
+        """Get all reminders, newest first."""
+    
+    @abstractmethod
+    def list_reminders_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 25,
+    ) -> Tuple[List[Reminder], Optional[str], int]:
+        """Get one page of reminders, newest first. Returns (reminders, next_cursor, total)."""
+    
+    @abstractmethod
+    def find_reminders(self, reminder_text: str) -> List[Reminder]:
+        """Find reminders by text, best match first."""
+    
+    @abstractmethod
+    def get_reminder(self, reminder_id: str) -> Optional[Reminder]:
+        """Get a specific reminder by ID."""
+    
+    @abstractmethod
+    def delete_reminder(self, reminder_id: str) -> bool:
+        """Delete a reminder. Returns False if it could not be deleted."""
+    
+    # Bulk todo operations
+    
+    def create_todos(self, items: List[Dict[str, Any]]) -> List[BatchItemResult]:
+        """
+        Create several todos.
+        
+        Args:
+            items: create_todo keyword arguments for each todo
+        
+        Returns:
+            One result per item, in request order
+        """
+        return self._run_batch(lambda item: self.create_todo(**item), items, [None] * len(items))
+    
+    def update_todos(self, updates: List[Dict[str, Any]]) -> List[BatchItemResult]:
+        """
+        Update several todos.
+        
+        Args:
+            updates: update_todo keyword arguments for each todo, including "todo_id"
+        
+        Returns:
+            One result per update, in request order
+        """
+        return self._run_batch(
+            lambda update: self.update_todo(**update),
+            updates,
+            [update.get("todo_id") for update in updates],
+            "Todo not found or could not be updated"
+        )
+    
+    def complete_todos(self, todo_ids: List[str]) -> List[BatchItemResult]:
+        """Mark several todos as completed."""
+        return self._run_batch(self.complete_todo, todo_ids, todo_ids, "Todo not found or could not be updated")
+    
+    def delete_todos(self, todo_ids: List[str]) -> List[BatchItemResult]:
+        """Delete several todos."""
+        return self._run_batch(self.delete_todo, todo_ids, todo_ids, "Todo not found or could not be deleted")
+    
+    def delete_completed_todos(self) -> List[BatchItemResult]:
+        """Delete every completed todo."""
+        return self.delete_todos([todo.id for todo in self.get_todos(completed=True)])
+    
+    # Bulk reminder operations
+    
+    def create_reminders(self, items: List[Dict[str, Any]]) -> List[BatchItemResult]:
+        """Create several reminders from create_reminder keyword arguments."""
+        return self._run_batch(lambda item: self.create_reminder(**item), items, [None] * len(items))
+    
+    def delete_reminders(self, reminder_ids: List[str]) -> List[BatchItemResult]:
+        """Delete several reminders."""
+        return self._run_batch(
+            self.delete_reminder, reminder_ids, reminder_ids, "Reminder not found or could not be deleted"
+        )
+    
+    # Helper methods
+    
+    def _run_batch(
+        self,
+        operation: Callable[[Any], Any],
+        items: List[Any],
+        item_ids: List[Optional[str]],
+        failure_message: str = "Operation failed",
+    ) -> List[BatchItemResult]:
+        """
+        Run a single-item operation for every item.
+        
+        Args:
+            operation: Called with each item; returns the resulting todo or
+                reminder, True on success, or None/False on failure
+            items: Items to process
+            item_ids: Document ID of each item, if known up front
+            failure_message: Error reported when operation returns None/False
+        
+        Returns:
+            One result per item, in the order of items
+        """
+        results = []
+        
+        for index, (value, item_id) in enumerate(zip(self._execute_batch(operation, items), item_ids)):
+            if isinstance(value, Exception):
+                print(f"Error in bulk operation (item {index}): {value}")
+                results.append(BatchItemResult(index=index, success=False, id=item_id, error=str(value)))
+            elif not value:
+                results.append(BatchItemResult(index=index, success=False, id=item_id, error=failure_message))
+            elif value is True:
+                results.append(BatchItemResult(index=index, success=True, id=item_id))
+            else:
+                results.append(BatchItemResult(index=index, success=True, id=value.id, item=value))
+        
+        return results
+    
+    def _execute_batch(self, operation: Callable[[Any], Any], items: List[Any]) -> List[Any]:
+        """
+        Run operation for every item, returning each result or the exception it raised.
+        
+        Runs the items one after another; backends with slow round trips
+        override this to run them concurrently.
+        """
+        outcomes = []
+        for item in items:
+            try:
+                outcomes.append(operation(item))
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
@@ -0,0 +1,258 @@
+"""Content-addressed cache of synthesized speech, in memory and on disk."""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import Config
+
+# Temporary files older than this were left by a crashed write, not one in progress
+STALE_TMP_SECONDS = 600
+
+
+def audio_cache_key(text: str, voice_id: str, model: str, settings: Dict[str, Any]) -> str:
+    """
+    Key of the audio for a text, voice, model and voice settings.
+    
+    Any change to one of them (even a slider setting) produces another key,
+    so cached audio never has to be invalidated.
+    """
+    material = json.dumps([text, voice_id, model, settings], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Two-tier LRU cache of MP3 audio by key.
+    
+    The memory tier serves repeated phrases (greetings, confirmations)
+    without I/O. The disk tier keeps audio across restarts and is shared by
+    every worker process pointing at the same directory; files are written
+    atomically and evicted oldest-used first.
+    """
+    
+    def __init__(
+        self,
+        memory_max_bytes: int = 32 * 1024 * 1024,
+        disk_dir: str = "",
+        disk_max_bytes: int = 512 * 1024 * 1024
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            memory_max_bytes: Size of the memory tier (0 disables it)
+            disk_dir: Directory of the disk tier ("" disables it)
+            disk_max_bytes: Size of the disk tier
+        """
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.lock = threading.Lock()
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "bytes_served": 0,
+        }
+        
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._remove_stale_tmp()
+            self.disk_bytes = sum(size for _, size, _ in self._disk_entries())
+    
+    def get(self, key: str, disk: bool = True) -> Optional[bytes]:
+        """
+        Get cached audio.
+        
+        Args:
+            key: Key from audio_cache_key
+            disk: Also look in the disk tier (pass False to stay off the disk,
+                e.g. on an event loop, and count no miss)
+        
+        Returns:
+            The audio, or None if it is not cached
+        """
+        with self.lock:
+            audio = self.memory.get(key)
+            if audio is not None:
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                self.stats["bytes_served"] += len(audio)
+                return audio
+        
+        if not disk:
+            return None
+        
+        audio = self._read_disk(key)
+        with self.lock:
+            if audio is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["disk_hits"] += 1
+            self.stats["bytes_served"] += len(audio)
+        
+        # Promote to the memory tier so the next hit skips the disk
+        self._put_memory(key, audio)
+        return audio
+    
+    def contains(self, key: str) -> bool:
+        """Whether audio is cached, without counting a hit or miss."""
+        with self.lock:
+            if key in self.memory:
+                return True
+        return bool(self.disk_dir) and os.path.exists(self._path(key))
+    
+    def put(self, key: str, audio: bytes):
+        """Store audio in both tiers."""
+        if not audio:
+            return
+        
+        self._put_memory(key, audio)
+        if self.disk_dir:
+            self._write_disk(key, audio)
+        
+        with self.lock:
+            self.stats["stores"] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, tier sizes and the hit rate."""
+        with self.lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self.memory)
+            stats["memory_bytes"] = self.memory_bytes
+        stats["disk_bytes"] = self.disk_bytes
+        
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+    
+    # Helper methods
+    
+    def _put_memory(self, key: str, audio: bytes):
+        """Add audio to the memory tier, evicting least recently used entries."""
+        if len(audio) > self.memory_max_bytes:
+            return
+        
+        with self.lock:
+            previous = self.memory.pop(key, None)
+            if previous is not None:
+                self.memory_bytes -= len(previous)
+            
+            self.memory[key] = audio
+            self.memory_bytes += len(audio)
+            
+            while self.memory_bytes > self.memory_max_bytes:
+                _, evicted = self.memory.popitem(last=False)
+                self.memory_bytes -= len(evicted)
+                self.stats["evictions"] += 1
+    
+    def _path(self, key: str) -> str:
+        """File of a key in the disk tier."""
+        return os.path.join(self.disk_dir, f"{key}.mp3")
+    
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        """Read audio from the disk tier, marking it as recently used."""
+        if not self.disk_dir:
+            return None
+        
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            # The modification time is the file's last use, for LRU eviction
+            os.utime(path)
+            return audio
+        except OSError:
+            return None
+    
+    def _write_disk(self, key: str, audio: bytes):
+        """Write audio to the disk tier and evict old files if it is full."""
+        path = self._path(key)
+        try:
+            # Another worker may already have cached the same audio
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        
+        try:
+            # Write to a temporary file and rename, so readers never see partial audio
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing TTS cache file: {e}")
+            return
+        
+        with self.lock:
+            # Only the size change counts when an existing file was overwritten
+            self.disk_bytes += len(audio) - replaced
+            over_budget = self.disk_bytes > self.disk_max_bytes
+        
+        if over_budget:
+            self._evict_disk()
+    
+    def _evict_disk(self):
+        """Delete least recently used files until the disk tier is within 90% of its size."""
+        self._remove_stale_tmp()
+        
+        # Rescanning also counts files written by other workers
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.disk_max_bytes * 0.9
+        
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self.lock:
+                self.stats["evictions"] += 1
+        
+        with self.lock:
+            self.disk_bytes = total
+    
+    def _remove_stale_tmp(self):
+        """Delete temporary files left behind by writes that crashed."""
+        cutoff = time.time() - STALE_TMP_SECONDS
+        for path, _, modified in self._disk_entries(suffix=".tmp"):
+            if modified < cutoff:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+    
+    def _disk_entries(self, suffix: str = ".mp3") -> List[Tuple[str, int, float]]:
+        """(path, size, last use) of every file in the disk tier with a suffix."""
+        entries = []
+        with os.scandir(self.disk_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(suffix):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+
+# Global audio cache instance
+audio_cache = AudioCache(
+    memory_max_bytes=int(Config.TTS_CACHE_MEMORY_MB * 1024 * 1024),
+    disk_dir=Config.TTS_CACHE_DIR,
+    disk_max_bytes=int(Config.TTS_CACHE_DISK_MB * 1024 * 1024)
+)
@@ -1,25 +1,123 @@
 """Text-to-Speech service using ElevenLabs."""
-from elevenlabs import ElevenLabs
-from typing import Optional
+from collections import deque
+from elevenlabs import AsyncElevenLabs, ElevenLabs
+from typing import Any, AsyncIterator, Dict, Optional
+import asyncio
 import io
+import threading
+import time
 
 from config import Config
+from http_transport import PerLoop
+from tts_cache import AudioCache, audio_cache, audio_cache_key
+
+
+class LatencyStats:
+    """Time to first audio byte of the most recent streams."""
+    
+    def __init__(self, window: int = 500):
+        """
+        Initialize the stats.
+        
+        Args:
+            window: Number of recent samples percentiles are computed over
+        """
+        self.samples: deque = deque(maxlen=window)
+        self.count = 0
+        self.last_ms: Optional[float] = None
+        self.lock = threading.Lock()
+    
+    def record(self, seconds: float):
+        """Add a first-byte latency sample."""
+        ms = round(seconds * 1000, 1)
+        with self.lock:
+            self.samples.append(ms)
+            self.count += 1
+            self.last_ms = ms
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Sample count, last value, mean, p50, p95 and max in milliseconds."""
+        with self.lock:
+            samples = sorted(self.samples)
+            stats = {"count": self.count, "last_ms": self.last_ms}
+        
+        if not samples:
+            return stats
+        
+        def percentile(p: float) -> float:
+            return samples[min(len(samples) - 1, int(p * len(samples)))]
+        
+        stats.update({
+            "window": len(samples),
+            "mean_ms": round(sum(samples) / len(samples), 1),
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "max_ms": samples[-1]
+        })
+        return stats
 
 
 class TTSService:
     """Text-to-Speech service using ElevenLabs."""
     
-    def __init__(self):
-        """Initialize ElevenLabs client."""
+    def __init__(self, cache: Optional[AudioCache] = None):
+        """
+        Initialize ElevenLabs client.
+        
+        Args:
+            cache: Cache of synthesized audio (None disables caching)
+        """
+        self.cache = cache
+        self.voice_id = Config.ELEVENLABS_VOICE_ID
+        self.model = Config.ELEVENLABS_MODEL or "eleven_turbo_v2_5"
+        self.output_format = Config.TTS_OUTPUT_FORMAT
+        # Time from request to the first audio byte of streams not served from the cache
+        self.first_byte_latency = LatencyStats()
+        
         if Config.ELEVENLABS_API_KEY and Config.ELEVENLABS_API_KEY != "your-elevenlabs-api-key":
             self.client = ElevenLabs(api_key=Config.ELEVENLABS_API_KEY)
-            self.voice_id = Config.ELEVENLABS_VOICE_ID
-            self.model = Config.ELEVENLABS_MODEL or "eleven_turbo_v2_5"
+            # Async clients for the ASGI app, one per event loop
+            self.async_clients = PerLoop(lambda: AsyncElevenLabs(api_key=Config.ELEVENLABS_API_KEY))
             self.enabled = True
         else:
             self.client = None
+            self.async_clients = None
             self.enabled = False
     
+    def cache_key(
+        self,
+        text: str,
+        voice_id: Optional[str] = None,
+        model: Optional[str] = None,
+        stability: float = 0.5,
+        similarity_boost: float = 0.75,
+        style: float = 0.0,
+        use_speaker_boost: bool = True,
+        streamed: bool = False
+    ) -> str:
+        """
+        Key of the audio text_to_speech (or, if streamed, text_to_speech_stream)
+        would return for the same arguments (also its ETag).
+        
+        Streamed audio is synthesized with latency optimizations, which trade
+        quality (and at level 4 text normalization) for speed, so it is kept
+        apart from converted audio and from streams at another level.
+        """
+        settings = {
+            "output_format": self.output_format,
+            "stability": stability,
+            "similarity_boost": similarity_boost,
+            "style": style,
+            "use_speaker_boost": use_speaker_boost
+        }
+        if streamed:
+            settings["optimize_streaming_latency"] = Config.TTS_STREAM_LATENCY
+        return audio_cache_key(text, voice_id or self.voice_id, model or self.model, settings)
+    
+    def is_cached(self, key: str) -> bool:
+        """Whether audio for a cache_key is cached."""
+        return self.cache is not None and self.cache.contains(key)
+    
     def text_to_speech(
         self,
         text: str,
@@ -50,6 +148,13 @@ class TTSService:
         
         voice_id = voice_id or self.voice_id
         model = model or self.model
+        key = self.cache_key(text, voice_id, model, stability, similarity_boost, style, use_speaker_boost)
+        
+        # Repeated phrases are served from the cache without an API call
+        if self.cache is not None:
+            audio_data = self.cache.get(key)
+            if audio_data is not None:
+                return audio_data
         
         try:
             # Generate audio using ElevenLabs (newer API)
@@ -57,6 +162,7 @@ class TTSService:
                 voice_id=voice_id,
                 text=text,
                 model_id=model,
+                output_format=self.output_format,
                 voice_settings={
                     "stability": stability,
                     "similarity_boost": similarity_boost,
@@ -68,6 +174,8 @@ class TTSService:
             # Collect audio chunks
             audio_data = b"".join(audio_generator)
             
+            if self.cache is not None:
+                self.cache.put(key, audio_data)
             return audio_data
             
         except Exception as e:
@@ -87,6 +195,10 @@ class TTSService:
         """
         Convert text to speech audio with streaming.
         
+        Uses ElevenLabs' streaming endpoint with TTS_STREAM_LATENCY
+        optimizations, so the first chunk can be played before the rest of
+        the sentence is synthesized. Chunks are TTS_STREAM_CHUNK_BYTES long.
+        
         Args:
             text: The text to convert to speech
             voice_id: ElevenLabs voice ID (defaults to config)
@@ -104,13 +216,80 @@ class TTSService:
         
         voice_id = voice_id or self.voice_id
         model = model or self.model
+        key = self.cache_key(
+            text, voice_id, model, stability, similarity_boost, style, use_speaker_boost, streamed=True
+        )
+        
+        if self.cache is not None:
+            audio_data = self.cache.get(key)
+            if audio_data is not None:
+                yield audio_data
+                return
         
         try:
-            # Generate audio using ElevenLabs with streaming (newer API)
-            audio_generator = self.client.text_to_speech.convert(
+            started = time.monotonic()
+            # ElevenLabs' streaming endpoint sends audio as it is generated
+            audio_generator = self.client.text_to_speech.stream(
+                voice_id,
+                text=text,
+                model_id=model,
+                output_format=self.output_format,
+                optimize_streaming_latency=Config.TTS_STREAM_LATENCY,
+                voice_settings={
+                    "stability": stability,
+                    "similarity_boost": similarity_boost,
+                    "style": style,
+                    "use_speaker_boost": use_speaker_boost
+                },
+                request_options={"chunk_size": Config.TTS_STREAM_CHUNK_BYTES}
+            )
+            
+            # Stream audio chunks, keeping a copy for the cache
+            chunks = []
+            for chunk in audio_generator:
+                if not chunks:
+                    self.first_byte_latency.record(time.monotonic() - started)
+                chunks.append(chunk)
+                yield chunk
+            
+            # Only complete audio is cached (not a stream the client abandoned)
+            if self.cache is not None:
+                self.cache.put(key, b"".join(chunks))
+                
+        except Exception as e:
+            print(f"Error streaming speech: {e}")
+            raise
+    
+    async def atext_to_speech(
+        self,
+        text: str,
+        voice_id: Optional[str] = None,
+        model: Optional[str] = None,
+        stability: float = 0.5,
+        similarity_boost: float = 0.75,
+        style: float = 0.0,
+        use_speaker_boost: bool = True
+    ) -> bytes:
+        """Non-blocking text_to_speech: awaits ElevenLabs instead of holding a thread."""
+        if not self.enabled or not self.async_clients:
+            raise Exception("ElevenLabs is not configured")
+        
+        voice_id = voice_id or self.voice_id
+        model = model or self.model
+        key = self.cache_key(text, voice_id, model, stability, similarity_boost, style, use_speaker_boost)
+        
+        if self.cache is not None:
+            # Memory hits are served on the loop; the disk tier is read on a thread
+            audio_data = self.cache.get(key, disk=False) or await asyncio.to_thread(self.cache.get, key)
+            if audio_data is not None:
+                return audio_data
+        
+        try:
+            audio_generator = self.async_clients.get().text_to_speech.convert(
                 voice_id=voice_id,
                 text=text,
                 model_id=model,
+                output_format=self.output_format,
                 voice_settings={
                     "stability": stability,
                     "similarity_boost": similarity_boost,
@@ -119,9 +298,69 @@ class TTSService:
                 }
             )
             
-            # Stream audio chunks
-            for chunk in audio_generator:
+            audio_data = b"".join([chunk async for chunk in audio_generator])
+            
+            if self.cache is not None:
+                await asyncio.to_thread(self.cache.put, key, audio_data)
+            return audio_data
+            
+        except Exception as e:
+            print(f"Error generating speech: {e}")
+            raise
+    
+    async def atext_to_speech_stream(
+        self,
+        text: str,
+        voice_id: Optional[str] = None,
+        model: Optional[str] = None,
+        stability: float = 0.5,
+        similarity_boost: float = 0.75,
+        style: float = 0.0,
+        use_speaker_boost: bool = True
+    ) -> AsyncIterator[bytes]:
+        """Non-blocking text_to_speech_stream: yields audio chunks as ElevenLabs sends them."""
+        if not self.enabled or not self.async_clients:
+            raise Exception("ElevenLabs is not configured")
+        
+        voice_id = voice_id or self.voice_id
+        model = model or self.model
+        key = self.cache_key(
+            text, voice_id, model, stability, similarity_boost, style, use_speaker_boost, streamed=True
+        )
+        
+        if self.cache is not None:
+            # Memory hits are served on the loop; the disk tier is read on a thread
+            audio_data = self.cache.get(key, disk=False) or await asyncio.to_thread(self.cache.get, key)
+            if audio_data is not None:
+                yield audio_data
+                return
+        
+        try:
+            started = time.monotonic()
+            audio_generator = self.async_clients.get().text_to_speech.stream(
+                voice_id,
+                text=text,
+                model_id=model,
+                output_format=self.output_format,
+                optimize_streaming_latency=Config.TTS_STREAM_LATENCY,
+                voice_settings={
+                    "stability": stability,
+                    "similarity_boost": similarity_boost,
+                    "style": style,
+                    "use_speaker_boost": use_speaker_boost
+                },
+                request_options={"chunk_size": Config.TTS_STREAM_CHUNK_BYTES}
+            )
+            
+            chunks = []
+            async for chunk in audio_generator:
+                if not chunks:
+                    self.first_byte_latency.record(time.monotonic() - started)
+                chunks.append(chunk)
                 yield chunk
+            
+            if self.cache is not None:
+                await asyncio.to_thread(self.cache.put, key, b"".join(chunks))
                 
         except Exception as e:
             print(f"Error streaming speech: {e}")
@@ -155,5 +394,5 @@ class TTSService:
 
 
 # Global TTS service instance
-tts_service = TTSService()
+tts_service = TTSService(cache=audio_cache if Config.TTS_CACHE_ENABLED else None)
 
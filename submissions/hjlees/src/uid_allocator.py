@@ -0,0 +1,118 @@
+"""Registry of Agora RTC UIDs in use by agents and avatars, per channel."""
+import random
+import sqlite3
+import time
+from typing import List
+
+from config import Config
+from sqlite_util import ThreadConnections
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS agent_uids (
+    channel TEXT NOT NULL,
+    uid INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (channel, uid)
+);
+CREATE INDEX IF NOT EXISTS idx_agent_uids_expires_at ON agent_uids (expires_at);
+"""
+
+
+class UidAllocator:
+    """
+    Hands out RTC UIDs that no other agent in the channel is using.
+    
+    UIDs are claimed by inserting them into a SQLite table keyed on
+    (channel, uid), so two concurrent starts, even in different worker
+    processes sharing the database file, can never claim the same UID.
+    """
+    
+    def __init__(
+        self,
+        path: str = "agora_uids.db",
+        uid_min: int = 100000,
+        uid_max: int = 999999999,
+        lease_seconds: float = 86400,
+        busy_timeout_ms: int = 5000,
+    ):
+        """
+        Open (and create if needed) the registry.
+        
+        Args:
+            path: Database file shared by all workers, or ":memory:" for a
+                registry private to this process
+            uid_min: Smallest UID handed out
+            uid_max: Largest UID handed out
+            lease_seconds: UIDs not released by then (e.g. after a crash) are reused
+            busy_timeout_ms: How long a writer waits for another worker's lock
+        """
+        self.uid_min = uid_min
+        self.uid_max = uid_max
+        self.lease_seconds = lease_seconds
+        self._random = random.SystemRandom()
+        self._connection = ThreadConnections(path, "uids", busy_timeout_ms, schema=SCHEMA)
+    
+    def allocate(self, channel_name: str, count: int = 1) -> List[int]:
+        """
+        Claim distinct UIDs in a channel.
+        
+        Args:
+            channel_name: Channel the UIDs will join
+            count: Number of UIDs to claim (e.g. 2 for an agent and its avatar)
+        
+        Returns:
+            The claimed UIDs
+        
+        Raises:
+            RuntimeError: If no free UID could be found
+        """
+        now = time.time()
+        uids: List[int] = []
+        attempts = 0
+        
+        with self._connection() as conn:
+            conn.execute("DELETE FROM agent_uids WHERE expires_at < ?", (now,))
+            
+            while len(uids) < count:
+                attempts += 1
+                if attempts > count * 100:
+                    raise RuntimeError(f"No free RTC UID in channel {channel_name}")
+                
+                uid = self._random.randint(self.uid_min, self.uid_max)
+                try:
+                    conn.execute(
+                        "INSERT INTO agent_uids (channel, uid, expires_at) VALUES (?, ?, ?)",
+                        (channel_name, uid, now + self.lease_seconds),
+                    )
+                except sqlite3.IntegrityError:
+                    # Taken by another agent in this channel; try another
+                    continue
+                uids.append(uid)
+        
+        return uids
+    
+    def release(self, channel_name: str, uids: List[int]):
+        """Return UIDs to the pool once their agent has left the channel."""
+        with self._connection() as conn:
+            conn.executemany(
+                "DELETE FROM agent_uids WHERE channel = ? AND uid = ?",
+                [(channel_name, uid) for uid in uids],
+            )
+    
+    def in_use(self, channel_name: str) -> List[int]:
+        """UIDs currently claimed in a channel."""
+        rows = self._connection().execute(
+            "SELECT uid FROM agent_uids WHERE channel = ? AND expires_at >= ? ORDER BY uid",
+            (channel_name, time.time()),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+
+# Global UID allocator instance
+uid_allocator = UidAllocator(
+    path=Config.AGORA_UID_REGISTRY_PATH,
+    uid_min=Config.AGORA_UID_MIN,
+    uid_max=Config.AGORA_UID_MAX,
+    lease_seconds=Config.AGORA_UID_LEASE_SECONDS
+)